@@ -1,10 +1,12 @@
 import streamlit as st
-import yfinance as yf
-import pandas as pd
-import ta
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
+from data import get_stock_data
+from indicators import require
+
+DASHBOARD_REQUIRES = ("MA20", "MA50", "RSI", "MACD", "MACD_signal", "ATR", "Upper_ATR", "Lower_ATR", "VWAP")
+
 st.set_page_config(layout="wide")
 
 st.title("📈 Trading Dashboard - Professional Mode")
@@ -13,50 +15,17 @@ ticker_input = st.text_input("Masukkan kode saham (contoh: BBCA):", "BBCA")
 
 if ticker_input:
 
-    ticker = ticker_input.upper() + ".JK"
-    df = yf.download(ticker, period="6mo", auto_adjust=True)
-
-    # Pastikan kolom jadi 1D
-    df = df.copy()
-
-    if isinstance(df.columns, pd.MultiIndex):
-        df.columns = df.columns.get_level_values(0)
-
-    df['Close'] = df['Close'].squeeze()
-    df['High'] = df['High'].squeeze()
-    df['Low'] = df['Low'].squeeze()
-    df['Volume'] = df['Volume'].squeeze()
-
+    # harga dari panel file bersama (memmap) / PriceStore, sama seperti bot & CLI
+    df, ticker = get_stock_data(ticker_input, period="6mo")
 
-    if df.empty:
+    if df is None or df.empty:
         st.error("Data tidak ditemukan.")
     else:
 
         # ======================
         # INDICATORS
         # ======================
-        df['MA20'] = df['Close'].rolling(20).mean()
-        df['MA50'] = df['Close'].rolling(50).mean()
-        df['RSI'] = ta.momentum.RSIIndicator(close=df['Close'], window=14).rsi()
-
-        macd = ta.trend.MACD(close=df['Close'])
-        df['MACD'] = macd.macd()
-        df['MACD_signal'] = macd.macd_signal()
-
-
-        macd = ta.trend.MACD(df['Close'])
-        df['MACD'] = macd.macd()
-        df['MACD_signal'] = macd.macd_signal()
-
-        df['ATR'] = ta.volatility.AverageTrueRange(
-            df['High'], df['Low'], df['Close']
-        ).average_true_range()
-
-        df['Upper_ATR'] = df['Close'] + df['ATR']
-        df['Lower_ATR'] = df['Close'] - df['ATR']
-
-        # VWAP
-        df['VWAP'] = (df['Close'] * df['Volume']).cumsum() / df['Volume'].cumsum()
+        df = require(df, DASHBOARD_REQUIRES)
 
         support = df['Low'][-30:].min()
         resistance = df['High'][-30:].max()
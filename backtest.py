@@ -1,14 +1,579 @@
 # backtest.py
+from __future__ import annotations
+
+import os
+import time
+import warnings
+from dataclasses import dataclass, field
+from typing import Callable
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+import kernels
+from indicators import require
+from store import PricePanel
+from strategy import calculate_score_panel
+
+BACKTEST_REQUIRES = ("Close", "MA20", "MA50")
+
 
 def simple_backtest(df):
 
-    df['Signal'] = 0
-    df.loc[df['MA20'] > df['MA50'], 'Signal'] = 1
-    df['Position'] = df['Signal'].shift(1)
+    df = require(df, BACKTEST_REQUIRES)
 
-    df['Return'] = df['Close'].pct_change()
-    df['Strategy_Return'] = df['Return'] * df['Position']
+    # kolom sinyal tidak ditulis ke df pemanggil
+    signal = (df['MA20'] > df['MA50']).astype("float64")
+    position = signal.shift(1)
 
-    cumulative_return = (1 + df['Strategy_Return']).cumprod()
+    strategy_return = df['Close'].pct_change() * position
+    cumulative_return = (1 + strategy_return).cumprod()
 
     return cumulative_return.iloc[-1]
+
+
+# =====================================================
+# PARAMETER SWEEP (VECTORIZED)
+# Aturan: long kalau MA fast > MA slow, opsional difilter RSI di dalam
+# band (lo, hi) dan MACD > signal (sama seperti calculate_score).
+# Semua kombinasi x semua ticker dihitung sekaligus lewat broadcasting:
+#   (fast, slow, rsi_band, macd_filter, ticker, bar)
+# Ticker diproses per chunk supaya cube tidak melebihi SWEEP_MAX_CELLS.
+# =====================================================
+DEFAULT_FAST = tuple(range(5, 101, 5))
+DEFAULT_SLOW = tuple(range(10, 201, 10))
+SWEEP_AXES = ("fast", "slow", "rsi_band", "macd_filter", "ticker")
+
+
+@dataclass
+class SweepResult:
+    """
+    Cube hasil sweep, shape (fast, slow, rsi_band, macd_filter, ticker).
+    Kombinasi fast >= slow bernilai NaN.
+    """
+    tickers: list[str]
+    fast: tuple[int, ...]
+    slow: tuple[int, ...]
+    rsi_bands: tuple
+    macd_filter: tuple[bool, ...]
+    total_return: np.ndarray  # fraksi, 0.05 = +5%
+    max_drawdown: np.ndarray  # fraksi negatif, -0.1 = -10%
+    hit_rate: np.ndarray      # trade untung / total trade (NaN kalau tidak ada trade)
+    trades: np.ndarray
+    exposure: np.ndarray      # fraksi bar dengan posisi terbuka
+    elapsed: float
+
+    METRICS = ("total_return", "max_drawdown", "hit_rate", "trades", "exposure")
+
+    def summary(self, agg=np.nanmedian) -> dict[str, np.ndarray]:
+        """
+        Agregat per kombinasi (default median antar ticker), shape (fast, slow, rsi_band, macd_filter).
+        """
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            return {m: agg(getattr(self, m), axis=-1) for m in self.METRICS}
+
+    def best(self, metric: str = "total_return", n: int = 10, agg=np.nanmedian) -> list[dict]:
+        """
+        n kombinasi terbaik menurut agregat metric (max_drawdown: paling dangkal).
+        """
+        summ = self.summary(agg)
+        flat = np.where(np.isnan(summ[metric]), -np.inf, summ[metric]).ravel()
+        order = np.argsort(-flat, kind="stable")[:n]
+        out = []
+        for k in order:
+            if not np.isfinite(flat[k]):
+                break
+            f, s, r, m = np.unravel_index(k, summ[metric].shape)
+            row = {
+                "fast": self.fast[f],
+                "slow": self.slow[s],
+                "rsi_band": self.rsi_bands[r],
+                "macd_filter": self.macd_filter[m],
+            }
+            row.update({name: float(v[f, s, r, m]) for name, v in summ.items()})
+            out.append(row)
+        return out
+
+
+def _max_cells() -> int:
+    env_n = os.getenv("SWEEP_MAX_CELLS")
+    return int(env_n) if env_n and env_n.isdigit() else 2_000_000
+
+
+def _ffill(a: np.ndarray) -> np.ndarray:
+    """
+    Forward-fill NaN di sumbu waktu (NaN di depan bar pertama tetap NaN).
+    """
+    idx = np.where(np.isnan(a), 0, np.arange(a.shape[1]))
+    np.maximum.accumulate(idx, axis=1, out=idx)
+    return np.take_along_axis(a, idx, axis=1)
+
+
+def _log_returns(close: np.ndarray) -> np.ndarray:
+    # close di-ffill supaya return setelah hari tanpa bar tetap terhitung
+    c = _ffill(close)
+    r = np.zeros_like(c)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        r[:, 1:] = np.log(c[:, 1:] / c[:, :-1])
+    return np.where(np.isfinite(r), r, 0.0)
+
+
+def _filters(close, rsi_bands, macd_filter) -> np.ndarray:
+    """
+    Mask filter (rsi_band, macd_filter, ticker, bar).
+    """
+    n, T = close.shape
+    rsi = kernels.rsi(close) if any(b is not None for b in rsi_bands) else None
+    if any(macd_filter):
+        line, sig = kernels.macd(close)
+        with np.errstate(invalid="ignore"):
+            macd_up = line > sig
+    always = np.ones((n, T), dtype=bool)
+
+    bands = []
+    for band in rsi_bands:
+        if band is None:
+            bands.append(always)
+            continue
+        lo, hi = band
+        with np.errstate(invalid="ignore"):
+            bands.append((rsi > lo) & (rsi < hi))
+    macds = [macd_up if m else always for m in macd_filter]
+    return np.stack(bands)[:, None] & np.stack(macds)[None, :]
+
+
+def _evaluate(signal: np.ndarray, logret: np.ndarray, fee: float) -> dict[str, np.ndarray]:
+    """
+    signal (..., ticker, bar) bool -> metrik (..., ticker). Posisi = sinyal
+    kemarin (seperti simple_backtest), fee dipotong tiap kali posisi berubah.
+    """
+    lead, T = signal.shape[:-1], signal.shape[-1]
+    sig = signal.reshape(-1, T)
+    rows = sig.shape[0]
+
+    pos = np.zeros_like(sig)
+    pos[:, 1:] = sig[:, :-1]
+    prev = np.zeros_like(pos)
+    prev[:, 1:] = pos[:, :-1]
+
+    ret = np.broadcast_to(logret, signal.shape).reshape(-1, T)
+    strat = np.where(pos, ret, 0.0)
+    if fee:
+        strat -= (pos != prev) * -np.log1p(-fee)
+
+    equity = np.cumsum(strat, axis=1)  # log equity
+    peak = np.maximum.accumulate(np.maximum(equity, 0.0), axis=1)
+    max_dd = np.expm1((equity - peak).min(axis=1))
+
+    # trade: entry = posisi dibuka, exit = bar terakhir posisi (posisi terbuka di akhir ikut dihitung).
+    # Entry & exit per baris berpasangan berurutan, jadi cukup bandingkan elemen ke-k.
+    entry = pos & ~prev
+    exit_ = pos.copy()
+    exit_[:, :-1] &= ~pos[:, 1:]
+    before = np.zeros_like(equity)
+    before[:, 1:] = equity[:, :-1]
+
+    trade_row = np.nonzero(exit_)[0]
+    won = equity[exit_] > before[entry]
+    trades = np.bincount(trade_row, minlength=rows)
+    wins = np.bincount(trade_row, weights=won, minlength=rows)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        hit_rate = np.where(trades > 0, wins / trades, np.nan)
+
+    metrics = {
+        "total_return": np.expm1(equity[:, -1]),
+        "max_drawdown": max_dd,
+        "hit_rate": hit_rate,
+        "trades": trades.astype("float64"),
+        "exposure": pos.mean(axis=1),
+    }
+    return {m: v.reshape(lead) for m, v in metrics.items()}
+
+
+def sweep_backtest(
+    panel: PricePanel,
+    fast=DEFAULT_FAST,
+    slow=DEFAULT_SLOW,
+    rsi_bands=(None,),
+    macd_filter=(False,),
+    fee: float = 0.0,
+) -> SweepResult:
+    """
+    Backtest semua kombinasi parameter untuk semua ticker di panel sekaligus.
+    rsi_bands: tuple (lo, hi) atau None (tanpa filter RSI); calculate_score pakai (40, 65).
+    macd_filter: True = wajib MACD > signal.
+    fee: biaya per transaksi (fraksi, mis. 0.0015).
+    """
+    t0 = time.perf_counter()
+    fast, slow = tuple(int(w) for w in fast), tuple(int(w) for w in slow)
+    rsi_bands, macd_filter = tuple(rsi_bands), tuple(bool(m) for m in macd_filter)
+    n, T = panel.close.shape
+    shape = (len(fast), len(slow), len(rsi_bands), len(macd_filter))
+
+    out = {m: np.full(shape + (n,), np.nan) for m in SweepResult.METRICS}
+    # hanya pasangan fast < slow yang dihitung; sisanya tetap NaN
+    pf, ps = np.nonzero(np.asarray(fast)[:, None] < np.asarray(slow)[None, :])
+    per_ticker = len(pf) * len(rsi_bands) * len(macd_filter) * max(T, 1)
+    chunk = max(1, _max_cells() // max(per_ticker, 1))
+
+    # indikator dihitung sekali untuk seluruh panel (kernel vectorized di sumbu ticker)
+    ma = {w: kernels.sma(panel.close, w) for w in set(fast) | set(slow)}
+    ma_fast = np.stack([ma[w] for w in fast])
+    ma_slow = np.stack([ma[w] for w in slow])
+    filt = _filters(panel.close, rsi_bands, macd_filter)  # (rsi_band, macd_filter, ticker, bar)
+    logret = _log_returns(panel.close)
+
+    for i in range(0, n, chunk):
+        rows = slice(i, i + chunk)
+        with np.errstate(invalid="ignore"):
+            cross = ma_fast[pf, rows] > ma_slow[ps, rows]  # (pasangan, ticker, bar)
+        signal = cross[:, None, None] & filt[None, :, :, rows]
+        for m, v in _evaluate(signal, logret[rows], fee).items():
+            out[m][pf, ps, :, :, rows] = v
+
+    return SweepResult(
+        tickers=list(panel.tickers),
+        fast=fast,
+        slow=slow,
+        rsi_bands=rsi_bands,
+        macd_filter=macd_filter,
+        elapsed=round(time.perf_counter() - t0, 3),
+        **out,
+    )
+
+
+def load_panel(tickers: list[str] | None = None, period: str = "1y") -> PricePanel:
+    """
+    Panel harga dari PriceStore / Yahoo (default seluruh universe IDX).
+    """
+    from data import get_all_idx_tickers, get_stock_data_bulk
+
+    tickers = get_all_idx_tickers() if tickers is None else tickers
+    return PricePanel.from_frames(get_stock_data_bulk(tickers, period=period))
+
+
+def format_sweep(result: SweepResult, metric: str = "total_return", n: int = 10) -> str:
+    lines = [
+        f"📐 Sweep {len(result.fast)}x{len(result.slow)}x{len(result.rsi_bands)}x{len(result.macd_filter)}"
+        f" kombinasi, {len(result.tickers)} ticker ({result.elapsed}s)\n"
+    ]
+    for i, r in enumerate(result.best(metric, n), 1):
+        band = "-" if r["rsi_band"] is None else f"{r['rsi_band'][0]}-{r['rsi_band'][1]}"
+        lines.append(
+            f"{i}. MA{r['fast']}/MA{r['slow']} RSI {band} MACD {'ya' if r['macd_filter'] else '-'}"
+            f" | Return {r['total_return'] * 100:.2f}% | DD {r['max_drawdown'] * 100:.2f}%"
+            f" | Hit {r['hit_rate'] * 100:.0f}% | Trade {r['trades']:.0f}"
+        )
+    return "\n".join(lines)
+
+
+# =====================================================
+# REPLAY SCANNER (PORTFOLIO BACKTEST)
+# Filter & urutan tiap scan di scanner.SCANS dievaluasi untuk semua
+# tanggal sekaligus dari panel harga (array ticker x tanggal). Tiap
+# `hold` bar portofolio diganti ke top-N hari itu (equal weight, beli
+# di close hari ranking, jual di close hari rebalance berikutnya).
+#
+# PE historis tidak tersedia: PE sekarang dipakai untuk semua tanggal.
+# Hasil scan berbasis PE jadi mengandung look-ahead (stats["pe_lookahead"]).
+# Jangan pakai PE x close_t / close terakhir: itu memasukkan harga masa
+# depan langsung ke ranking.
+# =====================================================
+def _trailing_nanmax(a: np.ndarray, window: int) -> np.ndarray:
+    # seperti support_resistance: max window bar terakhir, window parsial di awal histori
+    padded = np.concatenate([np.full((a.shape[0], window - 1), np.nan), a], axis=1)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return np.nanmax(sliding_window_view(padded, window, axis=1), axis=2)
+
+
+def replay_indicators(panel: PricePanel) -> dict[str, np.ndarray]:
+    """
+    Indikator per ticker per tanggal yang tidak bergantung ambang scan (dihitung sekali).
+    """
+    close = panel.close
+    macd, macd_signal = kernels.macd(close)
+    return {
+        "close_ff": _ffill(close),
+        "ma20": kernels.sma(close, 20),
+        "ma50": kernels.sma(close, 50),
+        "rsi": kernels.rsi(close),
+        "macd": macd,
+        "macd_signal": macd_signal,
+        "resistance": _trailing_nanmax(panel.high, 30),
+    }
+
+
+def replay_features(
+    panel: PricePanel,
+    fundamentals: dict[str, dict] | None = None,
+    *,
+    indicators: dict | None = None,
+    rsi_band=(40, 65),
+    res_ratio: float = 0.98,
+) -> dict[str, np.ndarray]:
+    """
+    Fitur scanner per ticker per tanggal (semua array ticker x tanggal).
+    fundamentals: {ticker: {"pe", "roe", ...}} (mis. dari get_fundamentals_bulk).
+    rsi_band / res_ratio: ambang calculate_score.
+    """
+    close = panel.close
+    n, T = close.shape
+    ind = indicators if indicators is not None else replay_indicators(panel)
+
+    # calculate_score_panel menilai kolom terakhir -> tiap (ticker, tanggal) dijadikan 1 baris
+    flat = [ind[k].reshape(-1, 1) for k in ("ma20", "ma50", "macd", "macd_signal", "rsi")]
+    score, probability = calculate_score_panel(
+        *flat, close.reshape(-1, 1), ind["resistance"].ravel(), rsi_band=rsi_band, res_ratio=res_ratio
+    )
+
+    fundamentals = fundamentals or {}
+    pe_now = np.array([_num(fundamentals.get(t, {}).get("pe")) for t in panel.tickers])
+    roe_now = np.array([_num(fundamentals.get(t, {}).get("roe")) for t in panel.tickers])
+
+    return {
+        "close": close,
+        "close_ff": ind["close_ff"],
+        "has_price": ~np.isnan(close),
+        "n_bars": np.cumsum(~np.isnan(close), axis=1),
+        "ma20": ind["ma20"],
+        "ma50": ind["ma50"],
+        "resistance": ind["resistance"],
+        "tech_score": score.reshape(n, T),
+        "probability": probability.reshape(n, T),
+        "pe": np.broadcast_to(pe_now[:, None], (n, T)),
+        "roe": np.broadcast_to(roe_now[:, None], (n, T)),
+        "name_rank": np.broadcast_to(np.argsort(np.argsort(panel.tickers))[:, None], (n, T)),
+    }
+
+
+def _num(x) -> float:
+    try:
+        return float(x) if x is not None else np.nan
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _pe_score(pe: np.ndarray) -> np.ndarray:
+    # sama dengan scanner._pe_score
+    return np.select([pe < 10, pe < 15, pe < 20], [4, 3, 2], 1)
+
+
+@dataclass
+class ReplaySpec:
+    """
+    select(f, **params) -> mask lolos filter; key(f) -> tuple array, sama dengan
+    tuple key di scanner.SCANS (kecil = peringkat atas). Sisanya seri diurutkan
+    posisi ticker di panel (seperti sort stabil di scanner).
+    """
+    select: Callable
+    key: Callable
+    needs_pe: bool = False
+
+
+REPLAY_SCANS: dict[str, ReplaySpec] = {
+    "fundamental": ReplaySpec(
+        select=lambda f: f["has_price"] & ~np.isnan(f["pe"]),
+        key=lambda f: (f["pe"], np.where(np.isnan(f["roe"]), 1e9, -f["roe"])),
+        needs_pe=True,
+    ),
+    "technical": ReplaySpec(
+        select=lambda f: f["has_price"] & (f["tech_score"] == 4),
+        key=lambda f: (-f["probability"], f["name_rank"]),
+    ),
+    "combo": ReplaySpec(
+        select=lambda f: f["has_price"] & ~np.isnan(f["pe"]),
+        key=lambda f: (-(_pe_score(f["pe"]) + f["tech_score"]), f["pe"]),
+        needs_pe=True,
+    ),
+    "undervalued": ReplaySpec(
+        select=lambda f, pe_max=20.0, min_score=2: (
+            f["has_price"] & (f["n_bars"] >= 60) & (f["tech_score"] >= min_score)
+            & (f["ma20"] > f["ma50"]) & (f["close"] > f["ma20"]) & (f["pe"] <= pe_max)
+        ),
+        key=lambda f: (f["pe"], -f["tech_score"]),
+        needs_pe=True,
+    ),
+    "breakout": ReplaySpec(
+        select=lambda f, near_resistance=0.95, min_score=2: (
+            f["has_price"] & (f["n_bars"] >= 60) & (f["tech_score"] >= min_score)
+            & (f["close"] >= f["resistance"] * near_resistance)
+        ),
+        key=lambda f: (-f["probability"], -f["tech_score"]),
+    ),
+}
+
+
+def _top_n_mask(key: np.ndarray, top_n: int, tiebreak: tuple = ()) -> np.ndarray:
+    """
+    key (tanggal x ticker), inf = tidak lolos -> mask top_n key terkecil per tanggal.
+    argpartition mencari nilai ke-N; yang seri di batas diurutkan lexsort atas
+    tiebreak (key berikutnya di tuple scanner), sisanya urut posisi ticker.
+    """
+    D, n = key.shape
+    if top_n <= 0 or n == 0:
+        return np.zeros((D, n), dtype=bool)
+    k = min(top_n, n) - 1
+    kth = np.argpartition(key, k, axis=1)[:, k]
+    thr = key[np.arange(D), kth][:, None]
+
+    below = key < thr
+    ties = (key == thr) & np.isfinite(key)
+    room = top_n - below.sum(axis=1, keepdims=True)
+    mask = below | (ties & (np.cumsum(ties, axis=1) <= room))
+    if tiebreak:
+        # hanya tanggal yang seri di batas melebihi sisa slot
+        for d in np.flatnonzero(ties.sum(axis=1) > room[:, 0]):
+            cand = np.flatnonzero(ties[d])
+            order = np.lexsort([t[d, cand] for t in reversed(tiebreak)])  # stabil -> seri penuh urut posisi
+            mask[d, cand] = False
+            mask[d, cand[order[:room[d, 0]]]] = True
+    return mask
+
+
+def _hold_equity(close_ff: np.ndarray, picks: np.ndarray, rebalance: np.ndarray, fee: float):
+    """
+    Equity harian portofolio equal weight. picks (rebalance x ticker) dipegang
+    dari close rebalance[k] sampai close rebalance[k+1] (blok terakhir sampai bar akhir).
+    Return (equity per bar, return per blok).
+    """
+    n, T = close_ff.shape
+    block = np.searchsorted(rebalance, np.arange(T), side="left") - 1  # blok yang sedang dipegang di bar d
+    active = block >= 0
+    b = np.where(active, block, 0)
+
+    held = picks[b].T  # (ticker x bar)
+    base = close_ff[:, rebalance[b]]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ratio = np.where(held, close_ff / base, 0.0)
+    count = held.sum(axis=0)
+    value = np.where(count > 0, ratio.sum(axis=0) / np.maximum(count, 1) * (1 - fee), 1.0)
+    value = np.where(active, value, 1.0)
+
+    ends = np.append(rebalance[1:], T - 1)
+    block_ret = value[ends] - 1
+    start_equity = np.concatenate([[1.0], np.cumprod(1 + block_ret)])
+    equity = np.where(active, start_equity[b] * value, 1.0)
+    return equity, np.where(picks.any(axis=1), block_ret, np.nan)
+
+
+def _equity_stats(equity: np.ndarray, block_ret: np.ndarray) -> dict:
+    peak = np.maximum.accumulate(equity)
+    traded = block_ret[~np.isnan(block_ret)]
+    return {
+        "total_return": float(equity[-1] - 1),
+        "max_drawdown": float((equity / peak - 1).min()),
+        "hit_rate": float((traded > 0).mean()) if len(traded) else None,
+        "blocks": int(len(block_ret)),
+    }
+
+
+@dataclass
+class ReplayResult:
+    name: str
+    dates: np.ndarray              # tanggal bar (datetime64)
+    equity: np.ndarray             # equity portofolio, 1.0 = modal awal
+    benchmark: np.ndarray          # equal weight semua ticker yang punya harga
+    rebalance_dates: np.ndarray
+    picks: list[list[str]]         # ticker yang dipegang per rebalance
+    stats: dict = field(default_factory=dict)
+
+
+def replay_scan(
+    panel: PricePanel,
+    name: str,
+    *,
+    top_n: int = 10,
+    hold: int = 5,
+    warmup: int = 60,
+    fee: float = 0.0,
+    features: dict | None = None,
+    fundamentals: dict[str, dict] | None = None,
+    **params,
+) -> ReplayResult:
+    """
+    Replay satu scan (nama di REPLAY_SCANS / scanner.SCANS) atas seluruh histori panel.
+    params diteruskan ke filter (mis. near_resistance=0.9 untuk breakout).
+    fee: biaya per rebalance (fraksi dari nilai portofolio).
+    """
+    t0 = time.perf_counter()
+    spec = REPLAY_SCANS[name]
+    f = features if features is not None else replay_features(panel, fundamentals)
+    T = panel.close.shape[1]
+    rebalance = np.arange(min(warmup, max(T - 1, 0)), max(T - 1, 0), max(hold, 1))
+    if len(rebalance) == 0:
+        raise ValueError(f"Histori terlalu pendek untuk replay ({T} bar, warmup {warmup})")
+
+    # ranking hanya di tanggal rebalance (tanggal x ticker)
+    at = {k: (v[:, rebalance] if isinstance(v, np.ndarray) and v.ndim == 2 else v) for k, v in f.items()}
+    with np.errstate(invalid="ignore"):
+        ok = spec.select(at, **params)
+        primary, *tiebreak = (k.T for k in spec.key(at))
+        key = np.where(ok.T, primary, np.inf)
+    key = np.where(np.isnan(key), np.inf, key)
+    picks = _top_n_mask(key, top_n, tuple(tiebreak))
+
+    equity, block_ret = _hold_equity(f["close_ff"], picks, rebalance, fee)
+    bench, _ = _hold_equity(f["close_ff"], at["has_price"].T, rebalance, fee)
+
+    stats = _equity_stats(equity, block_ret)
+    stats["benchmark_return"] = float(bench[-1] - 1)
+    stats["avg_picks"] = round(float(picks.sum(axis=1).mean()), 2)
+    stats["pe_lookahead"] = spec.needs_pe
+    stats["duration_s"] = round(time.perf_counter() - t0, 3)
+
+    return ReplayResult(
+        name=name,
+        dates=panel.dates,
+        equity=equity,
+        benchmark=bench,
+        rebalance_dates=panel.dates[rebalance],
+        picks=[[panel.tickers[i] for i in np.flatnonzero(row)] for row in picks],
+        stats=stats,
+    )
+
+
+def replay_scans(panel: PricePanel, names=None, *, fundamentals=None, params=None, **kwargs) -> dict[str, ReplayResult]:
+    """
+    Replay beberapa scan dengan fitur yang dihitung sekali.
+    params: {nama_scan: {param: nilai}}; kwargs lain (top_n, hold, ...) untuk semua scan.
+    """
+    names = list(REPLAY_SCANS) if names is None else list(names)
+    features = replay_features(panel, fundamentals)
+    params = params or {}
+    return {n: replay_scan(panel, n, features=features, **kwargs, **params.get(n, {})) for n in names}
+
+
+def load_fundamentals(tickers: list[str], fetch_missing: bool = False) -> dict[str, dict]:
+    from data import get_fundamentals_bulk
+
+    return get_fundamentals_bulk(tickers, fetch_missing=fetch_missing)
+
+
+def format_replay(results: dict[str, ReplayResult]) -> str:
+    lines = []
+    for r in results.values():
+        s = r.stats
+        hit = "-" if s["hit_rate"] is None else f"{s['hit_rate'] * 100:.0f}%"
+        lines.append(
+            f"{r.name} | Return {s['total_return'] * 100:.2f}% (EW {s['benchmark_return'] * 100:.2f}%)"
+            f" | DD {s['max_drawdown'] * 100:.2f}% | Hit {hit} | Pick {s['avg_picks']}"
+            + (" | PE sekarang (look-ahead)" if s["pe_lookahead"] else "")
+        )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import sys
+
+    # python backtest.py [period]         -> sweep MA 20x20 (+ filter calculate_score) seluruh universe
+    # python backtest.py replay [period]  -> replay semua scan, top 10, rebalance tiap 5 bar
+    args = sys.argv[1:]
+    mode = args.pop(0) if args and args[0] in ("sweep", "replay") else "sweep"
+    panel = load_panel(period=args[0] if args else "1y")
+    if mode == "replay":
+        print(format_replay(replay_scans(panel, fundamentals=load_fundamentals(panel.tickers))))
+    else:
+        res = sweep_backtest(panel, rsi_bands=(None, (40, 65)), macd_filter=(False, True))
+        print(format_sweep(res))
@@ -1,46 +1,599 @@
 # data.py
 from __future__ import annotations
 
+import os
 import time
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from io import StringIO
 
 import pandas as pd
-import requests
-import yfinance as yf
+
+import net
+
+from store import (
+    OHLCV,
+    FundamentalStore,
+    PanelFile,
+    PricePanel,
+    PriceStore,
+    covers_last_session,
+    last_trading_date,
+    load_json,
+    normalize_ohlcv,
+    period_start,
+    save_json,
+)
 
 
 # =========================
-# PRICE DATA (yfinance)
+# TICKER HEALTH (negative cache)
+# Ticker yang gagal (tidak ada harga, suspend / bar terakhir basi, tanpa PE)
+# dicatat per alasan dengan jadwal cek ulang exponential backoff:
+# 6 jam, 12 jam, 1 hari, ... maks 7 hari (env HEALTH_BACKOFF_HOURS / HEALTH_MAX_BACKOFF_DAYS).
+# no_price baru di-skip setelah 2x gagal berturut-turut.
+# Berhasil sekali -> catatan alasan itu dihapus.
 # =========================
-def get_stock_data(ticker: str, period: str = "6mo"):
+HEALTH_REASONS = ("no_price", "stale", "no_pe")
+_HEALTH_FILE = "ticker_health.json"
+# jumlah gagal berturut-turut sebelum ticker benar-benar di-skip:
+# respons throttled bisa kosong untuk sebagian ticker, jadi 1x miss belum cukup
+_HEALTH_CONFIRM = {"no_price": 2}
+
+
+def _health_backoff(fails: int) -> float:
+    env_h = os.getenv("HEALTH_BACKOFF_HOURS")
+    env_d = os.getenv("HEALTH_MAX_BACKOFF_DAYS")
+    base = float(env_h) * 3600 if env_h and env_h.isdigit() else 6 * 3600.0
+    cap = float(env_d) * 86400 if env_d and env_d.isdigit() else 7 * 86400.0
+    return min(cap, base * 2 ** max(0, fails - 1))
+
+
+def _stale_days() -> int:
+    """
+    Bar terakhir lebih tua dari ini (hari kalender sebelum sesi terakhir) -> "stale" (env HEALTH_STALE_DAYS, default 7).
+    """
+    env_d = os.getenv("HEALTH_STALE_DAYS")
+    return int(env_d) if env_d and env_d.isdigit() else 7
+
+
+class TickerHealth:
+    """
+    Index kesehatan ticker, disimpan di cache/ticker_health.json:
+    {ticker: {alasan: {"fails", "first", "last", "retry_at"}}}.
+    """
+
+    def __init__(self, name: str = _HEALTH_FILE):
+        self.name = name
+        self._lock = threading.Lock()
+        self._items: dict[str, dict[str, dict]] = load_json(name) or {}
+        self._dirty = False
+
+    def known_bad(self, tickers: list[str], reasons=HEALTH_REASONS, now: float | None = None) -> dict[str, str]:
+        """
+        {ticker: alasan pertama (urutan reasons) yang masih dalam backoff}.
+        """
+        now = now or time.time()
+        out = {}
+        with self._lock:
+            for t in tickers:
+                entry = self._items.get(t)
+                if not entry:
+                    continue
+                for reason in reasons:
+                    e = entry.get(reason)
+                    if e is not None and now < e["retry_at"]:
+                        out[t] = reason
+                        break
+        return out
+
+    def fail(self, ticker: str, reason: str, now: float | None = None) -> None:
+        now = now or time.time()
+        with self._lock:
+            e = self._items.setdefault(ticker, {}).get(reason) or {"fails": 0, "first": now}
+            e["fails"] += 1
+            e["last"] = now
+            confirmed = e["fails"] - _HEALTH_CONFIRM.get(reason, 1) + 1
+            e["retry_at"] = now + _health_backoff(confirmed) if confirmed > 0 else now
+            self._items[ticker][reason] = e
+            self._dirty = True
+
+    def ok(self, ticker: str, reason: str) -> None:
+        with self._lock:
+            entry = self._items.get(ticker)
+            if entry and entry.pop(reason, None) is not None:
+                if not entry:
+                    del self._items[ticker]
+                self._dirty = True
+
+    def reset(self, tickers: list[str] | None = None) -> int:
+        """
+        Hapus catatan (semua, atau ticker tertentu). Return jumlah ticker yang dihapus.
+        """
+        with self._lock:
+            drop = list(self._items) if tickers is None else [t for t in tickers if t in self._items]
+            for t in drop:
+                del self._items[t]
+            self._dirty = self._dirty or bool(drop)
+        self.flush()
+        return len(drop)
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            snapshot = {t: {r: dict(e) for r, e in entry.items()} for t, entry in self._items.items()}
+            self._dirty = False
+        save_json(self.name, snapshot)
+
+    def stats(self, now: float | None = None) -> dict[str, int]:
+        """
+        Jumlah ticker yang sedang di-skip per alasan.
+        """
+        now = now or time.time()
+        out = {r: 0 for r in HEALTH_REASONS}
+        with self._lock:
+            for entry in self._items.values():
+                for reason, e in entry.items():
+                    if now < e["retry_at"]:
+                        out[reason] = out.get(reason, 0) + 1
+        return out
+
+
+_TICKER_HEALTH: TickerHealth | None = None
+_TICKER_HEALTH_LOCK = threading.Lock()
+
+
+def ticker_health() -> TickerHealth:
+    global _TICKER_HEALTH
+    with _TICKER_HEALTH_LOCK:
+        if _TICKER_HEALTH is None:
+            _TICKER_HEALTH = TickerHealth()
+        return _TICKER_HEALTH
+
+
+def _note_price_health(health: TickerHealth, symbol: str, df: pd.DataFrame | None) -> None:
+    # df = hasil akhir (sudah dipotong period); None / kosong = tidak ada harga
+    if df is None or df.empty:
+        health.fail(symbol, "no_price")
+        return
+    health.ok(symbol, "no_price")
+    cutoff = last_trading_date() - pd.Timedelta(days=_stale_days())
+    if df.index[-1] < cutoff:
+        health.fail(symbol, "stale")
+    else:
+        health.ok(symbol, "stale")
+
+
+# =========================
+# PRICE DATA (yfinance + PriceStore lokal)
+# =========================
+# semua request ke Yahoo lewat limiter net.py dengan nama host ini
+YAHOO_HOST = "yahoo"
+
+
+def _yf():
+    # yfinance cukup berat di-import -> baru dimuat saat fetch pertama
+    import yfinance
+    return yfinance
+
+_PRICE_STORE: PriceStore | None = None
+
+
+def _price_store() -> PriceStore:
+    global _PRICE_STORE
+    if _PRICE_STORE is None:
+        _PRICE_STORE = PriceStore()
+    return _PRICE_STORE
+
+
+def _price_refresh_seconds() -> float:
+    """
+    Umur maksimum data tersimpan sebelum dicek bar baru (env PRICE_REFRESH_SECONDS, default 15 menit).
+    """
+    env_s = os.getenv("PRICE_REFRESH_SECONDS")
+    return float(env_s) if env_s and env_s.isdigit() else 900.0
+
+
+def _slice_period(df: pd.DataFrame, start: pd.Timestamp | None) -> pd.DataFrame:
+    if start is None:
+        return df
+    # index terurut -> slice posisi (view, bukan copy hasil boolean mask)
+    return df.iloc[df.index.searchsorted(start):]
+
+
+# =========================
+# PANEL FILE (memmap bersama, ditulis 1 updater: python data.py update-panel)
+# Bot, CLI, dan dashboard membaca harga dari sini dulu: tanpa network
+# dan tanpa copy (semua proses berbagi page cache yang sama). Kalau panel
+# belum ada, tidak mencakup period, atau basi -> PriceStore + Yahoo.
+# PANEL_OFFLINE=1 -> panel selalu dipakai & universe tidak di-refresh.
+# =========================
+_PANEL = {"version": None, "loaded": None, "checked": 0.0}
+_PANEL_LOCK = threading.Lock()
+_PANEL_CHECK_SECONDS = 5.0
+
+
+def _panel_offline() -> bool:
+    return os.getenv("PANEL_OFFLINE", "0") == "1"
+
+
+def _panel_file() -> tuple[PricePanel, dict] | None:
+    """
+    Panel versi aktif (dibuka ulang hanya kalau updater menulis versi baru).
+    """
+    now = time.time()
+    with _PANEL_LOCK:
+        if now - _PANEL["checked"] >= _PANEL_CHECK_SECONDS:
+            _PANEL["checked"] = now
+            pf = PanelFile()
+            version = pf.version()
+            if version != _PANEL["version"]:
+                _PANEL["loaded"] = pf.open(version) if version else None
+                _PANEL["version"] = version
+        return _PANEL["loaded"]
+
+
+def _panel_fresh(info: dict) -> bool:
+    if _panel_offline():
+        return True
+    if time.time() - info["written_at"] < _price_refresh_seconds():
+        return True
+    # di luar jam bursa panel yang berisi sesi terakhir tidak perlu dicek ulang
+    return covers_last_session(info["written_at"])
+
+
+def _panel_frame(symbol: str, start: pd.Timestamp | None) -> pd.DataFrame | None:
+    loaded = _panel_file()
+    if loaded is None:
+        return None
+    panel, info = loaded
+    if not (PriceStore.covers(info, start) and _panel_fresh(info)):
+        return None
+    df = panel.frame(symbol)
+    if df is None:
+        return None
+    df = _slice_period(df, start)
+    return df if not df.empty else None
+
+
+def update_panel_file(tickers: list[str] | None = None, period: str | None = None) -> str:
+    """
+    Ambil harga universe (PriceStore + Yahoo) lalu tulis versi panel baru.
+    Dijalankan oleh 1 proses updater saja (env PANEL_PERIOD, default 1y).
+    """
+    period = period or os.getenv("PANEL_PERIOD", "1y")
+    tickers = get_all_idx_tickers() if tickers is None else tickers
+    frames = get_stock_data_bulk(tickers, period=period, use_panel=False)
+    version = PanelFile().write(PricePanel.from_frames(frames), period_start(period))
+    with _PANEL_LOCK:
+        _PANEL["checked"] = 0.0
+    return version
+
+
+def _compact(df: pd.DataFrame, compact: bool):
+    return OHLCV.from_frame(df) if compact else df
+
+
+def get_stock_data(ticker: str, period: str = "6mo", compact: bool = False):
     """
     Return (df, ticker_full)
-    df: OHLCV dataframe
+    df: OHLCV dataframe (compact=True -> store.OHLCV ringkas)
     ticker_full: e.g. "BBCA.JK"
+
+    Data disimpan di PriceStore; kalau sudah ada, hanya bar setelah tanggal
+    terakhir yang di-download lalu di-append.
+    Tidak memakai negative cache (permintaan eksplisit selalu dicek); hasil
+    download penuh ikut dicatat di ticker_health().
     """
-    ticker_full = ticker.strip().upper() + ".JK"
-    stock = yf.Ticker(ticker_full)
-    df = stock.history(period=period)
+    symbol = ticker.strip().upper()
+    ticker_full = symbol + ".JK"
+    start = period_start(period)
+
+    df = _panel_frame(symbol, start)
+    if df is not None:
+        return _compact(df, compact), ticker_full
+
+    store = _price_store()
+
+    def cached(df):
+        df = _slice_period(df, start)
+        return (_compact(df, compact), ticker_full) if not df.empty else (None, ticker_full)
+
+    fallback = None
+    loaded = store.load(symbol)
+    if loaded is not None and store.covers(loaded[1], start) and not loaded[0].empty:
+        df, info = loaded
+        if store.is_fresh(info, _price_refresh_seconds()):
+            return cached(df)
+        try:
+            new_bars = net.call(YAHOO_HOST, _yf().Ticker(ticker_full).history, start=PriceStore.overlap_start(df))
+        except Exception:
+            # gagal jaringan: pakai data lama, jangan tandai segar
+            return cached(df)
+        if not PriceStore.readjusted(df, new_bars):
+            merged = store.append(symbol, new_bars)
+            return cached(merged if merged is not None else df)
+        # split / dividen: histori tersimpan sudah tidak cocok -> download ulang penuh
+        fallback = df
+
+    stock = _yf().Ticker(ticker_full)
+    df = net.call(YAHOO_HOST, stock.history, period=period)
+    health = ticker_health()
 
     if df is None or df.empty:
+        if fallback is not None:
+            return cached(fallback)
+        health.fail(symbol, "no_price")
+        health.flush()
         return None, ticker_full
 
-    return df, ticker_full
+    df = normalize_ohlcv(df)
+    store.save(symbol, df, start)
+    _note_price_health(health, symbol, df)
+    health.flush()
+    return _compact(df, compact), ticker_full
+
+
+def _download_chunk(tickers_full: list[str], **kwargs) -> pd.DataFrame | None:
+    # 1 chunk = banyak request ke Yahoo; biaya token = jumlah ticker,
+    # konkurensi internal yfinance dibatasi sesuai limit host
+    raw = net.call(
+        YAHOO_HOST,
+        _yf().download,
+        tickers_full,
+        group_by="ticker",
+        auto_adjust=True,
+        threads=net.host_concurrency(YAHOO_HOST),
+        progress=False,
+        cost=len(tickers_full),
+        **kwargs,
+    )
+    if raw is None or raw.empty:
+        return None
+    return raw
 
 
-def get_fundamental(ticker: str) -> dict:
+def _slice_ticker(raw: pd.DataFrame, ticker_full: str) -> pd.DataFrame | None:
+    if isinstance(raw.columns, pd.MultiIndex):
+        if ticker_full not in raw.columns.get_level_values(0):
+            return None
+        df = raw[ticker_full]
+    else:
+        df = raw
+
+    df = df.dropna(how="all")
+    if df.empty or df["Close"].isna().all():
+        return None
+
+    # copy biar add_indicators tidak nulis ke view dari frame gabungan
+    return normalize_ohlcv(df.copy())
+
+
+def get_stock_data_bulk(
+    tickers: list[str],
+    period: str = "6mo",
+    chunk_size: int | None = None,
+    use_panel: bool = True,
+    compact: bool = False,
+) -> dict[str, pd.DataFrame]:
     """
-    Fundamental via yfinance info.
+    Download harga banyak ticker sekaligus (1 request multi-ticker per chunk).
+    Ticker yang ada di panel file (segar) atau PriceStore (segar) tidak
+    menyentuh jaringan sama sekali; yang basi hanya mengambil bar baru.
+    Return {ticker: df}; ticker tanpa data tidak dimasukkan ke dict.
+    compact=True: nilai dict berupa store.OHLCV (dipakai scanner).
+    Hasil tiap ticker (ada harga / kosong / bar terakhir basi) dicatat di ticker_health().
     """
-    stock = yf.Ticker(ticker.strip().upper() + ".JK")
-    info = stock.info or {}
+    if chunk_size is None:
+        env_chunk = os.getenv("BULK_CHUNK_SIZE")
+        chunk_size = int(env_chunk) if env_chunk and env_chunk.isdigit() else 200
+
+    symbols = [t.strip().upper() for t in tickers]
+    start = period_start(period)
+    store = _price_store()
+    max_age = _price_refresh_seconds()
+    health = ticker_health()
+
+    out: dict[str, pd.DataFrame | None] = {}
+    stale: dict[str, pd.DataFrame] = {}
+    missing: list[str] = []
+
+    def finish(t: str, df: pd.DataFrame, note: bool = True):
+        # langsung dipotong (dan diringkas) per ticker: histori penuh
+        # float64 tidak menumpuk sampai akhir loop
+        df = _slice_period(df, start)
+        if note:
+            _note_price_health(health, t, df)
+        return None if df.empty else _compact(df, compact)
+
+    for t in symbols:
+        panel_df = _panel_frame(t, start) if use_panel else None
+        if panel_df is not None:
+            out[t] = finish(t, panel_df)
+            continue
+        loaded = store.load(t)
+        if loaded is None or loaded[0].empty or not store.covers(loaded[1], start):
+            missing.append(t)
+        elif store.is_fresh(loaded[1], max_age):
+            out[t] = finish(t, loaded[0])
+        else:
+            stale[t] = loaded[0]
+
+    # incremental: download dari bar overlap paling lama di chunk
+    stale_syms = list(stale)
+    for i in range(0, len(stale_syms), chunk_size):
+        chunk = stale_syms[i:i + chunk_size]
+        since = min(PriceStore.overlap_start(stale[t]) for t in chunk)
+        try:
+            raw = _download_chunk([t + ".JK" for t in chunk], start=since.strftime("%Y-%m-%d"))
+        except Exception:
+            raw = None
+
+        for t in chunk:
+            new_bars = _slice_ticker(raw, t + ".JK") if raw is not None else None
+            if raw is None:
+                # gagal jaringan: pakai data lama, jangan tandai segar
+                out[t] = finish(t, stale[t], note=False)
+                continue
+            if PriceStore.readjusted(stale[t], new_bars):
+                # split / dividen -> download ulang penuh bersama ticker missing;
+                # kalau gagal, data lama tetap dipakai
+                out[t] = finish(t, stale[t], note=False)
+                missing.append(t)
+                continue
+            merged = store.append(t, new_bars)
+            out[t] = finish(t, merged if merged is not None else stale[t])
+
+    for i in range(0, len(missing), chunk_size):
+        chunk = missing[i:i + chunk_size]
+        # canary: 1 ticker yang sudah terbukti punya data ikut di-download,
+        # supaya chunk berisi ticker mati saja tetap bisa dibedakan dari throttling
+        canary = next((c for c in symbols if out.get(c) is not None and c not in chunk), None)
+        request = chunk + ([canary] if canary else [])
+        try:
+            raw = _download_chunk([t + ".JK" for t in request], period=period)
+        except Exception:
+            raw = None
+        if raw is None:
+            # gagal jaringan / throttling (yfinance sering balas frame kosong,
+            # bukan exception) bukan bukti ticker mati -> tidak dicatat
+            continue
+
+        frames = {t: _slice_ticker(raw, t + ".JK") for t in request}
+        # no_price hanya dicatat kalau response yang sama membawa data asli ticker lain
+        chunk_ok = any(df is not None for df in frames.values())
+        frames.pop(canary, None)
+        for t, df in frames.items():
+            if df is None:
+                if chunk_ok:
+                    health.fail(t, "no_price")
+                continue
+            store.save(t, df, start)
+            out[t] = finish(t, df)
+
+    health.flush()
+    return {t: out[t] for t in symbols if out.get(t) is not None}
+
+
+# =========================
+# FUNDAMENTAL (yfinance .info + FundamentalStore lokal)
+# =========================
+_FUNDAMENTAL_FIELDS = ["trailingPE", "returnOnEquity"]
+_FUNDAMENTAL_STORE: FundamentalStore | None = None
+_REFRESH_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="fund-refresh")
+_REFRESH_PENDING: set[str] = set()
+_REFRESH_LOCK = threading.Lock()
+
+
+def _fundamental_store() -> FundamentalStore:
+    global _FUNDAMENTAL_STORE
+    if _FUNDAMENTAL_STORE is None:
+        _FUNDAMENTAL_STORE = FundamentalStore()
+    return _FUNDAMENTAL_STORE
+
+
+def _fetch_info(symbol: str) -> dict:
+    info = net.call(YAHOO_HOST, lambda: _yf().Ticker(symbol + ".JK").info) or {}
+    _fundamental_store().put(symbol, info)
+    health = ticker_health()
+    if info.get("trailingPE") is None:
+        health.fail(symbol, "no_pe")
+    else:
+        health.ok(symbol, "no_pe")
+    health.flush()
+    return info
+
+
+def _try_fetch_info(symbol: str) -> None:
+    try:
+        _fetch_info(symbol)
+    except Exception:
+        pass
+
+
+def _refresh_in_background(symbol: str) -> None:
+    with _REFRESH_LOCK:
+        if symbol in _REFRESH_PENDING:
+            return
+        _REFRESH_PENDING.add(symbol)
+
+    def _job():
+        try:
+            _try_fetch_info(symbol)
+        finally:
+            with _REFRESH_LOCK:
+                _REFRESH_PENDING.discard(symbol)
+
+    _REFRESH_POOL.submit(_job)
+
+
+def _fundamental_from_record(record: dict) -> dict:
+    values = {field: value for field, (value, _ts) in record.items()}
     return {
-        "pe": info.get("trailingPE"),
-        "roe": info.get("returnOnEquity"),
+        "pe": values.get("trailingPE"),
+        "roe": values.get("returnOnEquity"),
+        "info": values,
     }
 
 
+def get_fundamental(ticker: str) -> dict:
+    """
+    Fundamental via yfinance info, di-cache di SQLite.
+    Cache basi tetap dipakai dan di-refresh di background.
+    """
+    symbol = ticker.strip().upper()
+    record = _fundamental_store().get_many([symbol]).get(symbol)
+
+    if record is None:
+        info = _fetch_info(symbol)
+        return {
+            "pe": info.get("trailingPE"),
+            "roe": info.get("returnOnEquity"),
+            "info": info,
+        }
+
+    if FundamentalStore.is_stale(record, _FUNDAMENTAL_FIELDS):
+        _refresh_in_background(symbol)
+    return _fundamental_from_record(record)
+
+
+def get_fundamentals_bulk(tickers: list[str], fetch_missing: bool = False, recheck: bool = False) -> dict[str, dict]:
+    """
+    Bulk read fundamental dari cache lokal: {ticker: {"pe", "roe", "info"}}.
+    Entry basi dikembalikan apa adanya dan di-refresh di background, kecuali
+    ticker tanpa PE yang masih dalam backoff ticker_health().
+    recheck=True -> ticker tanpa PE itu justru di-fetch ulang sekarang.
+    fetch_missing=True -> ticker yang belum pernah di-cache diambil langsung.
+    """
+    symbols = [t.strip().upper() for t in tickers]
+    no_pe = ticker_health().known_bad(symbols, ("no_pe",))
+    if recheck and no_pe:
+        # paralel; konkurensi tetap dibatasi limiter host Yahoo
+        with ThreadPoolExecutor(max_workers=net.host_concurrency(YAHOO_HOST)) as pool:
+            list(pool.map(_try_fetch_info, no_pe))
+        no_pe = {}
+    records = _fundamental_store().get_many(symbols)
+
+    out: dict[str, dict] = {}
+    for t in symbols:
+        record = records.get(t)
+        if record is None:
+            if fetch_missing:
+                try:
+                    out[t] = get_fundamental(t)
+                except Exception:
+                    pass
+            continue
+
+        if FundamentalStore.is_stale(record, _FUNDAMENTAL_FIELDS) and t not in no_pe:
+            _refresh_in_background(t)
+        out[t] = _fundamental_from_record(record)
+
+    return out
+
+
 # =========================
 # UNIVERSE TICKERS (Realtime-ish)
 # Source: StockAnalysis (IDX list)
@@ -57,7 +610,9 @@ _HEADERS = {
     "Accept-Language": "en-US,en;q=0.9",
 }
 
-_UNIVERSE_CACHE = {"ts": 0.0, "tickers": []}
+_UNIVERSE_CACHE = {"ts": 0.0, "tickers": [], "refreshing": False}
+_UNIVERSE_LOCK = threading.Lock()
+_UNIVERSE_SNAPSHOT = "universe.json"
 
 
 def _normalize_ticker(raw: str) -> str | None:
@@ -87,7 +642,7 @@ def _unique_preserve_order(items: list[str]) -> list[str]:
 
 
 def _get_universe_from_stockanalysis() -> list[str]:
-    r = requests.get(STOCKANALYSIS_IDX_LIST_URL, headers=_HEADERS, timeout=30)
+    r = net.http_get(STOCKANALYSIS_IDX_LIST_URL, headers=_HEADERS, timeout=30)
     r.raise_for_status()
 
     # pandas.read_html butuh lxml; pakai StringIO biar warning FutureWarning hilang
@@ -131,15 +686,82 @@ def _get_universe_from_stockanalysis() -> list[str]:
     return tickers
 
 
+def _refresh_universe() -> list[str]:
+    tickers = _get_universe_from_stockanalysis()
+    now = time.time()
+    _UNIVERSE_CACHE["ts"] = now
+    _UNIVERSE_CACHE["tickers"] = tickers
+    save_json(_UNIVERSE_SNAPSHOT, {"ts": now, "tickers": tickers})
+    return tickers
+
+
+def _refresh_universe_in_background() -> None:
+    with _UNIVERSE_LOCK:
+        if _UNIVERSE_CACHE["refreshing"]:
+            return
+        _UNIVERSE_CACHE["refreshing"] = True
+
+    def _job():
+        try:
+            _refresh_universe()
+        except Exception:
+            # StockAnalysis lambat / berubah: tetap pakai snapshot terakhir
+            pass
+        finally:
+            _UNIVERSE_CACHE["refreshing"] = False
+
+    threading.Thread(target=_job, name="universe-refresh", daemon=True).start()
+
+
 def get_all_idx_tickers(cache_seconds: int = 600) -> list[str]:
     """
     Ambil seluruh ticker IDX (update otomatis), cache default 10 menit.
+    Snapshot terakhir disimpan di disk dan langsung dipakai; kalau sudah
+    basi, refresh jalan di background. Scrape sinkron hanya kalau belum
+    pernah ada snapshot sama sekali.
     """
-    now = time.time()
-    if _UNIVERSE_CACHE["tickers"] and (now - _UNIVERSE_CACHE["ts"] < cache_seconds):
-        return _UNIVERSE_CACHE["tickers"]
-
-    tickers = _get_universe_from_stockanalysis()
-    _UNIVERSE_CACHE["ts"] = now
-    _UNIVERSE_CACHE["tickers"] = tickers
-    return tickers
\ No newline at end of file
+    if not _UNIVERSE_CACHE["tickers"]:
+        snap = load_json(_UNIVERSE_SNAPSHOT)
+        if isinstance(snap, dict) and snap.get("tickers"):
+            _UNIVERSE_CACHE["ts"] = float(snap.get("ts", 0.0))
+            _UNIVERSE_CACHE["tickers"] = list(snap["tickers"])
+
+    if not _UNIVERSE_CACHE["tickers"]:
+        # belum ada snapshot: ticker panel file dipakai dulu, scrape di background
+        loaded = _panel_file()
+        if loaded is not None:
+            _UNIVERSE_CACHE["tickers"] = list(loaded[0].tickers)
+
+    if not _UNIVERSE_CACHE["tickers"]:
+        return _refresh_universe()
+
+    if time.time() - _UNIVERSE_CACHE["ts"] >= cache_seconds and not _panel_offline():
+        _refresh_universe_in_background()
+
+    return _UNIVERSE_CACHE["tickers"]
+
+
+if __name__ == "__main__":
+    import sys
+
+    # python data.py update-panel [period] [interval_detik]
+    #   -> tulis panel memmap sekali, atau berulang tiap interval_detik
+    # python data.py health [reset [TICKER ...]]
+    #   -> jumlah ticker yang sedang di-skip per alasan / hapus catatannya
+    cmd = sys.argv[1] if len(sys.argv) > 1 else None
+    if cmd == "health":
+        if len(sys.argv) > 2 and sys.argv[2] == "reset":
+            tickers = [t.upper() for t in sys.argv[3:]] or None
+            print(f"dihapus: {ticker_health().reset(tickers)}")
+        print(ticker_health().stats())
+        sys.exit()
+    if cmd != "update-panel":
+        sys.exit("pemakaian: python data.py update-panel [period] [interval_detik] | health [reset [TICKER ...]]")
+    period = sys.argv[2] if len(sys.argv) > 2 else None
+    interval = float(sys.argv[3]) if len(sys.argv) > 3 else 0
+    while True:
+        t0 = time.time()
+        print(f"panel {update_panel_file(period=period)} ({time.time() - t0:.1f}s)")
+        if interval <= 0:
+            break
+        time.sleep(max(0.0, interval - (time.time() - t0)))
@@ -1,65 +1,303 @@
 # grafik.py
 
-import matplotlib.pyplot as plt
-
-
-def tampilkan_grafik(df, ticker_full, support, resistance):
-
-    fig, axes = plt.subplots(
-        nrows=2,
-        ncols=2,
-        figsize=(16,10),
-        sharex=True
-    )
-
-    # =====================================================
-    # PANEL 1 (KIRI ATAS) - HARGA
-    # =====================================================
-    axes[0,0].plot(df['Close'], label='Harga', color='blue')
-    axes[0,0].plot(df['MA20'], label='MA20', color='orange')
-    axes[0,0].plot(df['MA50'], label='MA50', color='green')
-
-    upper_atr = df['Close'] + df['ATR']
-    lower_atr = df['Close'] - df['ATR']
-
-    axes[0,0].plot(upper_atr, linestyle='--', color='gray', alpha=0.6, label='Upper ATR')
-    axes[0,0].plot(lower_atr, linestyle='--', color='gray', alpha=0.6, label='Lower ATR')
-
-    axes[0,0].axhline(support, linestyle='--', color='lime', label='Support')
-    axes[0,0].axhline(resistance, linestyle='--', color='red', label='Resistance')
-
-    axes[0,0].set_title(f"{ticker_full} - Harga")
-    axes[0,0].legend()
-    axes[0,0].grid(True)
-
-    # =====================================================
-    # PANEL 2 (KANAN ATAS) - VOLUME
-    # =====================================================
-    axes[0,1].bar(df.index, df['Volume'], color='gray')
-    axes[0,1].set_title("Volume")
-    axes[0,1].grid(True)
-
-    # =====================================================
-    # PANEL 3 (KIRI BAWAH) - MACD
-    # =====================================================
-    axes[1,0].plot(df['MACD'], label='MACD', color='blue')
-    axes[1,0].plot(df['MACD_signal'], label='Signal Line', color='orange')
-    axes[1,0].axhline(0, linestyle='--', color='black', alpha=0.5)
-    axes[1,0].set_title("MACD")
-    axes[1,0].legend()
-    axes[1,0].grid(True)
-
-    # =====================================================
-    # PANEL 4 (KANAN BAWAH) - RSI
-    # =====================================================
-    axes[1,1].plot(df['RSI'], label='RSI', color='purple')
-    axes[1,1].axhline(70, linestyle='--', color='red')
-    axes[1,1].axhline(30, linestyle='--', color='green')
-    axes[1,1].set_title("RSI")
-    axes[1,1].legend()
-    axes[1,1].grid(True)
-
-    plt.tight_layout()
-    plt.savefig("chart.png", dpi=150)
-    plt.close()
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
+import numpy as np
+
+from indicators import require
+from store import as_frame, cache_dir
+
+GRAFIK_REQUIRES = ("Close", "Volume", "MA20", "MA50", "ATR", "MACD", "MACD_signal", "RSI")
+
+DPI = 150
+_BAR_WIDTH = 0.8  # hari (sama dengan default ax.bar untuk sumbu tanggal)
+
+
+# =====================================================
+# TEMPLATE FIGURE (dibangun sekali per worker, artist di-update in place)
+# matplotlib baru di-import saat template pertama dibuat (startup bot lebih cepat)
+# =====================================================
+class _ChartTemplate:
+
+    def __init__(self):
+        import matplotlib.dates as mdates
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        self.mdates = mdates
+        self.fig = Figure(figsize=(16,10), dpi=DPI)
+        FigureCanvasAgg(self.fig)
+        axes = self.fig.subplots(nrows=2, ncols=2, sharex=True)
+        self.axes = axes
+        axes[0,0].xaxis_date()
+
+        # =====================================================
+        # PANEL 1 (KIRI ATAS) - HARGA
+        # =====================================================
+        ax = axes[0,0]
+        self.close, = ax.plot([], [], label='Harga', color='blue')
+        self.ma20, = ax.plot([], [], label='MA20', color='orange')
+        self.ma50, = ax.plot([], [], label='MA50', color='green')
+        self.upper_atr, = ax.plot([], [], linestyle='--', color='gray', alpha=0.6, label='Upper ATR')
+        self.lower_atr, = ax.plot([], [], linestyle='--', color='gray', alpha=0.6, label='Lower ATR')
+        self.support = ax.axhline(0, linestyle='--', color='lime', label='Support')
+        self.resistance = ax.axhline(0, linestyle='--', color='red', label='Resistance')
+        self.price_title = ax.set_title("")
+        ax.legend()
+        ax.grid(True)
+
+        # =====================================================
+        # PANEL 2 (KANAN ATAS) - VOLUME
+        # =====================================================
+        axes[0,1].set_title("Volume")
+        axes[0,1].grid(True)
+        self.bars = []
+
+        # =====================================================
+        # PANEL 3 (KIRI BAWAH) - MACD
+        # =====================================================
+        ax = axes[1,0]
+        self.macd, = ax.plot([], [], label='MACD', color='blue')
+        self.macd_signal, = ax.plot([], [], label='Signal Line', color='orange')
+        ax.axhline(0, linestyle='--', color='black', alpha=0.5)
+        ax.set_title("MACD")
+        ax.legend()
+        ax.grid(True)
+
+        # =====================================================
+        # PANEL 4 (KANAN BAWAH) - RSI
+        # =====================================================
+        ax = axes[1,1]
+        self.rsi, = ax.plot([], [], label='RSI', color='purple')
+        ax.axhline(70, linestyle='--', color='red')
+        ax.axhline(30, linestyle='--', color='green')
+        ax.set_title("RSI")
+        ax.legend()
+        ax.grid(True)
+
+    def _update_bars(self, x, volume):
+        ax = self.axes[0,1]
+        if len(self.bars) != len(x):
+            # jumlah bar berubah (period lain) -> bangun ulang sekali
+            for rect in self.bars:
+                rect.remove()
+            self.bars = list(ax.bar(x, volume, width=_BAR_WIDTH, color='gray'))
+            return
+        for rect, xi, v in zip(self.bars, x, volume):
+            rect.set_x(xi - _BAR_WIDTH / 2)
+            rect.set_height(v)
+
+    def render(self, df, ticker_full, support, resistance) -> bytes:
+        x = self.mdates.date2num(df.index.to_pydatetime())
+        close = df['Close'].to_numpy()
+        atr = df['ATR'].to_numpy()
+
+        self.close.set_data(x, close)
+        self.ma20.set_data(x, df['MA20'].to_numpy())
+        self.ma50.set_data(x, df['MA50'].to_numpy())
+        self.upper_atr.set_data(x, close + atr)
+        self.lower_atr.set_data(x, close - atr)
+        self.support.set_ydata([support, support])
+        self.resistance.set_ydata([resistance, resistance])
+        self.price_title.set_text(f"{ticker_full} - Harga")
+
+        self._update_bars(x, np.nan_to_num(df['Volume'].to_numpy()))
+        self.macd.set_data(x, df['MACD'].to_numpy())
+        self.macd_signal.set_data(x, df['MACD_signal'].to_numpy())
+        self.rsi.set_data(x, df['RSI'].to_numpy())
+
+        for ax in self.axes.flat:
+            ax.relim()
+            ax.autoscale_view()
+
+        self.fig.tight_layout()
+        buf = io.BytesIO()
+        self.fig.savefig(buf, format="png")
+        return buf.getvalue()
+
+
+# =====================================================
+# RENDER POOL
+# Tiap worker punya 1 template sendiri; jumlah worker membatasi
+# jumlah figure yang hidup di memori (env CHART_WORKERS, default 2).
+# =====================================================
+_LOCAL = threading.local()
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+
+def _render_pool() -> ThreadPoolExecutor:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            env_n = os.getenv("CHART_WORKERS")
+            workers = int(env_n) if env_n and env_n.isdigit() and int(env_n) > 0 else 2
+            _POOL = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="chart")
+        return _POOL
+
+
+def _render(df, ticker_full, support, resistance) -> bytes:
+    tpl = getattr(_LOCAL, "template", None)
+    if tpl is None:
+        tpl = _LOCAL.template = _ChartTemplate()
+    return tpl.render(df, ticker_full, support, resistance)
+
+
+# =====================================================
+# CHART CACHE
+# key = (ticker_full, period, timestamp bar terakhir, close terakhir).
+# Close ikut di key karena bar hari ini bisa masih berjalan saat bursa buka.
+# Memori: LRU dibatasi total byte (CHART_CACHE_MB, default 64).
+# Disk (opsional, CHART_CACHE_DISK=1): cache/charts, dibatasi CHART_CACHE_DISK_MB (default 256).
+# =====================================================
+def _env_mb(name, default):
+    v = os.getenv(name)
+    return (int(v) if v and v.isdigit() else default) * 1024 * 1024
+
+
+class ChartCache:
+
+    def __init__(self, max_bytes, disk_dir=None, disk_max_bytes=0):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._items = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _path(self, key):
+        name = hashlib.sha1(repr(key).encode()).hexdigest()
+        return os.path.join(self.disk_dir, f"{name}.png")
+
+    def _remember(self, key, png):
+        # dipanggil dengan _lock dipegang
+        if key in self._items:
+            self._bytes -= len(self._items.pop(key))
+        self._items[key] = png
+        self._bytes += len(png)
+        while self._bytes > self.max_bytes and len(self._items) > 1:
+            _, old = self._items.popitem(last=False)
+            self._bytes -= len(old)
+
+    def get(self, key):
+        with self._lock:
+            png = self._items.get(key)
+            if png is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return png
+
+        if self.disk_dir:
+            try:
+                with open(self._path(key), "rb") as f:
+                    png = f.read()
+            except OSError:
+                png = None
+            if png is not None:
+                with self._lock:
+                    self._remember(key, png)
+                    self.disk_hits += 1
+                return png
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, png):
+        with self._lock:
+            self._remember(key, png)
+        if self.disk_dir:
+            path = self._path(key)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(png)
+            os.replace(tmp, path)
+            self._trim_disk()
+
+    def _trim_disk(self):
+        files = []
+        for entry in os.scandir(self.disk_dir):
+            if entry.name.endswith(".png"):
+                st = entry.stat()
+                files.append((st.st_mtime, st.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                "items": len(self._items),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+            }
+
+
+_CACHE = None
+
+
+def chart_cache() -> ChartCache:
+    global _CACHE
+    with _POOL_LOCK:
+        if _CACHE is None:
+            disk = os.getenv("CHART_CACHE_DISK", "0") == "1"
+            _CACHE = ChartCache(
+                _env_mb("CHART_CACHE_MB", 64),
+                disk_dir=os.path.join(cache_dir(), "charts") if disk else None,
+                disk_max_bytes=_env_mb("CHART_CACHE_DISK_MB", 256),
+            )
+        return _CACHE
+
+
+def chart_key(df, ticker_full, period):
+    return (ticker_full, period, int(df.index[-1].value), float(df['Close'].iloc[-1]))
+
+
+def render_chart(df, ticker_full, support, resistance, period="6mo") -> bytes:
+    """
+    Render grafik 4 panel jadi PNG (bytes) lewat render pool.
+    Grafik yang sama (ticker, period, bar terakhir) diambil dari chart cache.
+    Aman dipanggil dari banyak thread sekaligus.
+    """
+    df = as_frame(df)
+    cache = chart_cache()
+    key = chart_key(df, ticker_full, period)
+    png = cache.get(key)
+    if png is not None:
+        return png
+
+    df = require(df, GRAFIK_REQUIRES)
+    png = _render_pool().submit(_render, df, ticker_full, support, resistance).result()
+    cache.put(key, png)
+    return png
+
+
+def tampilkan_grafik(df, ticker_full, support, resistance, out="chart.png", period="6mo"):
+    """
+    Render grafik lalu tulis ke out (path file atau file-like, mis. BytesIO).
+    """
+    png = render_chart(df, ticker_full, support, resistance, period=period)
+    if hasattr(out, "write"):
+        out.write(png)
+    else:
+        with open(out, "wb") as f:
+            f.write(png)
+    return png
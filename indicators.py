@@ -1,15 +1,76 @@
 # indicators.py
-import ta
+import kernels
+from store import as_frame
+
+
+# =========================
+# REGISTRY
+# nama kolom -> (kolom yang dibutuhkan, fungsi hitung df -> array)
+# =========================
+BASE_COLUMNS = ("Open", "High", "Low", "Close", "Volume")
+
+INDICATORS = {
+    "MA20": (("Close",), lambda df: kernels.sma(df["Close"], 20)),
+    "MA50": (("Close",), lambda df: kernels.sma(df["Close"], 50)),
+    "MA200": (("Close",), lambda df: kernels.sma(df["Close"], 200)),
+    "RSI": (("Close",), lambda df: kernels.rsi(df["Close"], 14)),
+    "MACD": (("Close",), lambda df: kernels.ema(df["Close"], 12) - kernels.ema(df["Close"], 26)),
+    "MACD_signal": (("MACD",), lambda df: kernels.ema(df["MACD"], 9)),
+    "ATR": (("High", "Low", "Close"), lambda df: kernels.atr(df["High"], df["Low"], df["Close"])),
+    "Upper_ATR": (("Close", "ATR"), lambda df: df["Close"] + df["ATR"]),
+    "Lower_ATR": (("Close", "ATR"), lambda df: df["Close"] - df["ATR"]),
+    "VWAP": (("Close", "Volume"), lambda df: kernels.vwap(df["Close"], df["Volume"])),
+}
+
+
+def needs_indicators(columns) -> bool:
+    """
+    True kalau ada kolom yang harus dihitung (bukan OHLCV / data non-harga).
+    """
+    return any(c in INDICATORS for c in columns)
 
-def add_indicators(df):
 
-    df['MA20'] = df['Close'].rolling(20).mean()
-    df['MA50'] = df['Close'].rolling(50).mean()
+def resolve_order(columns) -> list[str]:
+    """
+    Urutan hitung (dependency dulu) untuk kolom indikator yang diminta.
+    Kolom di luar registry (OHLCV, PE, dsb.) dilewati.
+    """
+    order: list[str] = []
+    visiting: set[str] = set()
 
-    df['RSI'] = ta.momentum.RSIIndicator(df['Close'], window=14).rsi()
+    def visit(col):
+        if col not in INDICATORS or col in order:
+            return
+        if col in visiting:
+            raise ValueError(f"Dependency indikator melingkar di {col}")
+        visiting.add(col)
+        for dep in INDICATORS[col][0]:
+            visit(dep)
+        visiting.discard(col)
+        order.append(col)
 
-    macd = ta.trend.MACD(df['Close'])
-    df['MACD'] = macd.macd()
-    df['MACD_signal'] = macd.macd_signal()
+    for c in columns:
+        visit(c)
+    return order
 
+
+def require(df, columns):
+    """
+    Pastikan kolom yang diminta ada di df. Hanya kolom yang belum ada
+    (termasuk dependency-nya) yang dihitung; kolom yang sudah ada dipakai
+    ulang, jadi tiap kolom maksimal dihitung sekali per frame.
+    df boleh OHLCV ringkas; yang dikembalikan selalu DataFrame (pakai nilai return-nya).
+    """
+    df = as_frame(df)
+    for col in resolve_order(columns):
+        if col not in df.columns:
+            df[col] = INDICATORS[col][1](df)
     return df
+
+
+# kolom yang dipakai scoring standar (calculate_score & scanner)
+CORE_INDICATORS = ("MA20", "MA50", "RSI", "MACD", "MACD_signal")
+
+
+def add_indicators(df):
+    return require(df, CORE_INDICATORS)
@@ -0,0 +1,294 @@
+# kernels.py
+"""
+Kernel indikator NumPy, batched di banyak ticker sekaligus.
+
+Semua fungsi menerima array 1-D (satu ticker) atau 2-D (ticker x bar).
+Ticker dengan histori lebih pendek di-pad NaN di kiri; tiap baris
+dihitung mulai dari bar valid pertamanya, jadi hasilnya sama dengan
+menghitung ticker itu sendirian. Nilai mengikuti library `ta`
+dalam toleransi floating point (cek: python kernels.py / tests/test_kernels.py).
+"""
+from __future__ import annotations
+
+import warnings
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def _as2d(x) -> tuple[np.ndarray, bool]:
+    a = np.asarray(x, dtype="float64")
+    if a.ndim == 1:
+        return a[None, :], True
+    return a, False
+
+
+def _out(a: np.ndarray, squeeze: bool) -> np.ndarray:
+    return a[0] if squeeze else a
+
+
+def _first_valid(a: np.ndarray) -> np.ndarray:
+    valid = ~np.isnan(a)
+    return np.where(valid.any(axis=1), valid.argmax(axis=1), a.shape[1])
+
+
+# =========================
+# ROLLING
+# =========================
+def sma(x, window: int) -> np.ndarray:
+    """
+    Simple moving average (= Series.rolling(window).mean()).
+    """
+    a, sq = _as2d(x)
+    n, T = a.shape
+    out = np.full((n, T), np.nan)
+    if T < window:
+        return _out(out, sq)
+
+    valid = ~np.isnan(a)
+    cs = np.concatenate([np.zeros((n, 1)), np.cumsum(np.where(valid, a, 0.0), axis=1)], axis=1)
+    cnt = np.concatenate([np.zeros((n, 1), dtype="int64"), np.cumsum(valid, axis=1)], axis=1)
+
+    win_sum = cs[:, window:] - cs[:, :-window]
+    win_cnt = cnt[:, window:] - cnt[:, :-window]
+    out[:, window - 1:] = np.where(win_cnt == window, win_sum / window, np.nan)
+    return _out(out, sq)
+
+
+def rolling_max(x, window: int) -> np.ndarray:
+    """
+    Rolling max (= Series.rolling(window).max()); NaN kalau window belum penuh.
+    """
+    a, sq = _as2d(x)
+    out = np.full(a.shape, np.nan)
+    if a.shape[1] >= window:
+        out[:, window - 1:] = sliding_window_view(a, window, axis=1).max(axis=2)
+    return _out(out, sq)
+
+
+def rolling_min(x, window: int) -> np.ndarray:
+    """
+    Rolling min (= Series.rolling(window).min()); NaN kalau window belum penuh.
+    """
+    a, sq = _as2d(x)
+    out = np.full(a.shape, np.nan)
+    if a.shape[1] >= window:
+        out[:, window - 1:] = sliding_window_view(a, window, axis=1).min(axis=2)
+    return _out(out, sq)
+
+
+# =========================
+# EXPONENTIAL
+# =========================
+def ewm(x, alpha: float, min_periods: int) -> np.ndarray:
+    """
+    Exponential moving average rekursif (= Series.ewm(alpha=..., adjust=False).mean()).
+    Loop di sumbu waktu, vectorized di sumbu ticker.
+    """
+    a, sq = _as2d(x)
+    n, T = a.shape
+    out = np.full((n, T), np.nan)
+    state = np.full(n, np.nan)
+    count = np.zeros(n, dtype="int64")
+
+    for t in range(T):
+        xt = a[:, t]
+        valid = ~np.isnan(xt)
+        init = valid & np.isnan(state)
+        state = np.where(init, xt, state)
+        upd = valid & ~init
+        state = np.where(upd, (1.0 - alpha) * state + alpha * xt, state)
+        count += valid
+        out[:, t] = np.where(count >= min_periods, state, np.nan)
+
+    return _out(out, sq)
+
+
+def ema(x, span: int) -> np.ndarray:
+    """
+    EMA gaya `ta` (span, min_periods=span, adjust=False).
+    """
+    return ewm(x, 2.0 / (span + 1.0), span)
+
+
+def rsi(close, window: int = 14) -> np.ndarray:
+    """
+    Wilder RSI (= ta.momentum.RSIIndicator(close, window).rsi()).
+    """
+    c, sq = _as2d(close)
+    pad = np.isnan(c)
+    diff = np.diff(c, axis=1, prepend=np.nan)
+
+    with np.errstate(invalid="ignore"):
+        up = np.where(pad, np.nan, np.where(diff > 0, diff, 0.0))
+        down = np.where(pad, np.nan, np.where(diff < 0, -diff, 0.0))
+
+    alpha = 1.0 / window
+    avg_up = ewm(up, alpha, window)
+    avg_down = ewm(down, alpha, window)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = np.where(avg_down == 0, 100.0, 100.0 - (100.0 / (1.0 + avg_up / avg_down)))
+    return _out(out, sq)
+
+
+def macd(close, fast: int = 12, slow: int = 26, signal: int = 9) -> tuple[np.ndarray, np.ndarray]:
+    """
+    MACD line & signal line (= ta.trend.MACD(close).macd() / .macd_signal()).
+    """
+    c, sq = _as2d(close)
+    line = ema(c, fast) - ema(c, slow)
+    sig = ema(line, signal)
+    return _out(line, sq), _out(sig, sq)
+
+
+# =========================
+# VOLATILITY / VOLUME
+# =========================
+def true_range(high, low, close) -> np.ndarray:
+    h, sq = _as2d(high)
+    l, _ = _as2d(low)
+    c, _ = _as2d(close)
+    prev = np.concatenate([np.full((c.shape[0], 1), np.nan), c[:, :-1]], axis=1)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        tr = np.nanmax(np.stack([h - l, np.abs(h - prev), np.abs(l - prev)]), axis=0)
+    return _out(tr, sq)
+
+
+def atr(high, low, close, window: int = 14) -> np.ndarray:
+    """
+    Average True Range Wilder (= ta.volatility.AverageTrueRange(...).average_true_range()).
+    Seperti `ta`, bar sebelum window pertama bernilai 0.
+    """
+    c, sq = _as2d(close)
+    tr, _ = _as2d(true_range(high, low, close))
+    n, T = c.shape
+
+    start = _first_valid(c)
+    seed_t = start + window - 1
+
+    tr0 = np.where(np.isnan(tr), 0.0, tr)
+    cs = np.concatenate([np.zeros((n, 1)), np.cumsum(tr0, axis=1)], axis=1)
+    rows = np.arange(n)
+    ok = seed_t < T
+    seed_val = np.full(n, np.nan)
+    seed_val[ok] = (cs[rows[ok], seed_t[ok] + 1] - cs[rows[ok], start[ok]]) / window
+
+    out = np.full((n, T), np.nan)
+    state = np.full(n, np.nan)
+    for t in range(T):
+        state = np.where(t == seed_t, seed_val, state)
+        after = t > seed_t
+        state = np.where(after, (state * (window - 1) + tr0[:, t]) / window, state)
+        out[:, t] = np.where(t >= seed_t, state, np.where(t >= start, 0.0, np.nan))
+
+    return _out(out, sq)
+
+
+def vwap(close, volume) -> np.ndarray:
+    """
+    VWAP kumulatif (sama dengan formula di app.py; bar dengan Volume NaN ikut NaN).
+    """
+    c, sq = _as2d(close)
+    v, _ = _as2d(volume)
+    pv = np.where(np.isnan(c) | np.isnan(v), 0.0, c * v)
+    vv = np.where(np.isnan(v), 0.0, v)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = np.cumsum(pv, axis=1) / np.cumsum(vv, axis=1)
+    out[np.isnan(c) | np.isnan(v)] = np.nan
+    return _out(out, sq)
+
+
+# =========================
+# PANEL HELPERS
+# =========================
+def stack_panel(frames: list, column: str, length: int | None = None) -> np.ndarray:
+    """
+    Susun kolom dari beberapa DataFrame / store.OHLCV jadi array (ticker x bar), rata kanan
+    (bar terakhir sejajar) dan di-pad NaN di kiri.
+    """
+    length = length or max((len(df) for df in frames), default=0)
+    out = np.full((len(frames), length), np.nan)
+    for i, df in enumerate(frames):
+        vals = np.asarray(df[column], dtype="float64")[-length:]
+        out[i, length - len(vals):] = vals
+    return out
+
+
+# =========================
+# PARITY CHECK vs pandas rolling / ta
+# =========================
+def check_parity(frames: list, atol: float = 1e-6) -> dict[str, float]:
+    """
+    Bandingkan kernel (dihitung batched 1x untuk semua frame) dengan
+    pandas rolling + `ta` per frame (formula asli add_indicators).
+    Return selisih absolut maksimum per kolom; raise AssertionError
+    kalau ada yang melebihi atol.
+    """
+    import ta
+
+    close = stack_panel(frames, "Close")
+    high = stack_panel(frames, "High")
+    low = stack_panel(frames, "Low")
+
+    ours = {
+        "MA20": sma(close, 20),
+        "MA50": sma(close, 50),
+        "RSI": rsi(close),
+        "ATR": atr(high, low, close),
+    }
+    ours["MACD"], ours["MACD_signal"] = macd(close)
+
+    worst = {k: 0.0 for k in ours}
+    for i, df in enumerate(frames):
+        ref = df[["Open", "High", "Low", "Close", "Volume"]].copy()
+        ref["MA20"] = ref["Close"].rolling(20).mean()
+        ref["MA50"] = ref["Close"].rolling(50).mean()
+        ref["RSI"] = ta.momentum.RSIIndicator(ref["Close"], window=14).rsi()
+        macd_ta = ta.trend.MACD(ref["Close"])
+        ref["MACD"] = macd_ta.macd()
+        ref["MACD_signal"] = macd_ta.macd_signal()
+        ref["ATR"] = ta.volatility.AverageTrueRange(ref["High"], ref["Low"], ref["Close"]).average_true_range()
+        n = len(ref)
+        for col, arr in ours.items():
+            mine = arr[i, -n:]
+            theirs = ref[col].to_numpy(dtype="float64")
+            if not np.array_equal(np.isnan(mine), np.isnan(theirs)):
+                raise AssertionError(f"{col}: posisi NaN beda di frame {i}")
+            both = ~np.isnan(mine)
+            if both.any():
+                worst[col] = max(worst[col], float(np.max(np.abs(mine[both] - theirs[both]))))
+
+    bad = {k: v for k, v in worst.items() if v > atol}
+    if bad:
+        raise AssertionError(f"Kernel tidak cocok dengan ta: {bad}")
+    return worst
+
+
+if __name__ == "__main__":
+    import sys
+
+    import pandas as pd
+
+    # python kernels.py            -> random walk sintetis
+    # python kernels.py BBCA BBRI  -> data asli via get_stock_data
+    if len(sys.argv) > 1:
+        from data import get_stock_data
+
+        frames = [df for df, _ in (get_stock_data(t) for t in sys.argv[1:]) if df is not None]
+    else:
+        rng = np.random.default_rng(0)
+        frames = []
+        for n in (40, 125, 250):
+            idx = pd.bdate_range(end="2024-12-31", periods=n)
+            c = 1000 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+            frames.append(pd.DataFrame({
+                "Open": c, "High": c * (1 + rng.uniform(0, 0.02, n)),
+                "Low": c * (1 - rng.uniform(0, 0.02, n)), "Close": c,
+                "Volume": rng.integers(1e5, 1e7, n).astype(float),
+            }, index=idx))
+
+    for col, diff in check_parity(frames).items():
+        print(f"{col:12s} max |diff| = {diff:.3e}")
+    print("OK")
@@ -0,0 +1,242 @@
+# net.py
+from __future__ import annotations
+
+import os
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+# =========================
+# CONFIG (env)
+# =========================
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def _env_int(name: str, default: int) -> int:
+    v = os.getenv(name)
+    return int(v) if v and v.isdigit() else default
+
+
+def _host_env(host: str, name: str) -> str:
+    # contoh: HTTP_MAX_CONCURRENCY_YAHOO=4
+    return f"{name}_{host.upper().replace('.', '_').replace('-', '_')}"
+
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+# =========================
+# TOKEN BUCKET
+# =========================
+class TokenBucket:
+    """
+    Rate limiter token bucket (thread-safe).
+    acquire(cost) boleh melebihi kapasitas: sisa jadi "hutang" yang dibayar request berikutnya.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+        self.waited_s = 0.0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, cost: float = 1.0) -> float:
+        need = min(cost, self.capacity)
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= need:
+                    self.tokens -= cost
+                    self.waited_s += waited
+                    return waited
+                sleep_s = (need - self.tokens) / self.rate
+            time.sleep(sleep_s)
+            waited += sleep_s
+
+
+# =========================
+# RETRY BUDGET
+# =========================
+class RetryBudget:
+    """
+    Batasi retry ke sebagian kecil dari total request, supaya saat Yahoo/
+    StockAnalysis throttle kita tidak malah melipatgandakan beban.
+    """
+
+    def __init__(self, ratio: float, min_reserve: int):
+        self.ratio = ratio
+        self.min_reserve = min_reserve
+        self.balance = float(min_reserve)
+        self.lock = threading.Lock()
+
+    def deposit(self) -> None:
+        with self.lock:
+            self.balance = min(self.balance + self.ratio, self.min_reserve + 1000 * self.ratio)
+
+    def withdraw(self) -> bool:
+        with self.lock:
+            if self.balance >= 1.0:
+                self.balance -= 1.0
+                return True
+            return False
+
+
+# =========================
+# HOST LIMITS
+# =========================
+class HostLimit:
+    def __init__(self, host: str):
+        self.host = host
+        self.max_concurrency = _env_int(_host_env(host, "HTTP_MAX_CONCURRENCY"), _env_int("HTTP_MAX_CONCURRENCY", 8))
+        rate = _env_float(_host_env(host, "HTTP_RATE_PER_SEC"), _env_float("HTTP_RATE_PER_SEC", 30.0))
+        burst = _env_float(_host_env(host, "HTTP_BURST"), _env_float("HTTP_BURST", 200.0))
+        self.bucket = TokenBucket(rate, burst)
+        self.slots = threading.BoundedSemaphore(self.max_concurrency)
+        self.in_flight = 0
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+
+
+_HOSTS: dict[str, HostLimit] = {}
+_HOSTS_LOCK = threading.Lock()
+_BUDGET = RetryBudget(ratio=_env_float("HTTP_RETRY_BUDGET_RATIO", 0.2), min_reserve=_env_int("HTTP_RETRY_BUDGET_MIN", 10))
+_BUDGET_EXHAUSTED = {"count": 0}
+
+_SESSION: requests.Session | None = None
+_SESSION_LOCK = threading.Lock()
+
+
+def host_limit(host: str) -> HostLimit:
+    with _HOSTS_LOCK:
+        if host not in _HOSTS:
+            _HOSTS[host] = HostLimit(host)
+        return _HOSTS[host]
+
+
+def host_concurrency(host: str) -> int:
+    return host_limit(host).max_concurrency
+
+
+def get_session() -> requests.Session:
+    """
+    Session requests bersama (keep-alive + connection pool).
+    """
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            pool = _env_int("HTTP_POOL_SIZE", 16)
+            s = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool, pool_maxsize=pool)
+            s.mount("https://", adapter)
+            s.mount("http://", adapter)
+            _SESSION = s
+        return _SESSION
+
+
+# =========================
+# CALL WRAPPERS
+# =========================
+def call(host: str, fn, *args, cost: float = 1.0, **kwargs):
+    """
+    Jalankan fn(*args, **kwargs) lewat limiter host: slot konkurensi,
+    token bucket, dan retry exponential backoff (dibatasi retry budget).
+    """
+    lim = host_limit(host)
+    max_retries = _env_int("HTTP_MAX_RETRIES", 3)
+    base_s = _env_float("HTTP_BACKOFF_BASE", 0.5)
+    cap_s = _env_float("HTTP_BACKOFF_MAX", 8.0)
+
+    attempt = 0
+    while True:
+        lim.bucket.acquire(cost)
+        with lim.slots:
+            with _HOSTS_LOCK:
+                lim.in_flight += 1
+                lim.requests += 1
+            _BUDGET.deposit()
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                if attempt >= max_retries:
+                    with _HOSTS_LOCK:
+                        lim.failures += 1
+                    raise
+                if not _BUDGET.withdraw():
+                    with _HOSTS_LOCK:
+                        _BUDGET_EXHAUSTED["count"] += 1
+                        lim.failures += 1
+                    raise
+            finally:
+                with _HOSTS_LOCK:
+                    lim.in_flight -= 1
+
+        with _HOSTS_LOCK:
+            lim.retries += 1
+        attempt += 1
+        time.sleep(min(cap_s, base_s * (2 ** (attempt - 1))) * random.uniform(0.5, 1.0))
+
+
+def http_get(url: str, **kwargs) -> requests.Response:
+    """
+    GET lewat session bersama; status 429/5xx dianggap gagal dan di-retry.
+    """
+    host = urlparse(url).hostname or "default"
+
+    def _get():
+        r = get_session().get(url, **kwargs)
+        if r.status_code in RETRY_STATUS:
+            r.raise_for_status()
+        return r
+
+    return call(host, _get)
+
+
+def net_stats(since: dict | None = None) -> dict:
+    """
+    Statistik pool & limiter per host (untuk meta scanner).
+    since=hasil net_stats() sebelumnya -> counter jadi selisih.
+    """
+    hosts = {}
+    with _HOSTS_LOCK:
+        for name, lim in _HOSTS.items():
+            hosts[name] = {
+                "requests": lim.requests,
+                "retries": lim.retries,
+                "failures": lim.failures,
+                "throttled_s": round(lim.bucket.waited_s, 2),
+                "in_flight": lim.in_flight,
+                "max_concurrency": lim.max_concurrency,
+            }
+
+    if since:
+        for name, h in hosts.items():
+            prev = since.get("hosts", {}).get(name)
+            if prev:
+                for k in ("requests", "retries", "failures", "throttled_s"):
+                    h[k] = round(h[k] - prev[k], 2)
+
+    pool = _env_int("HTTP_POOL_SIZE", 16)
+    return {
+        "pool_size": pool,
+        "retry_budget": round(_BUDGET.balance, 2),
+        "retry_budget_exhausted": _BUDGET_EXHAUSTED["count"] - (since or {}).get("retry_budget_exhausted", 0),
+        "hosts": hosts,
+    }
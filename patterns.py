@@ -1,4 +1,10 @@
 # patterns.py
+import warnings
+
+import numpy as np
+
+from store import as_frame
+
 
 def support_resistance(df):
     support = df['Low'][-30:].min()
@@ -6,7 +12,19 @@ def support_resistance(df):
     return support, resistance
 
 
+def support_resistance_panel(high, low):
+    """
+    Versi panel (ticker x bar) dari support_resistance: min Low / max High 30 bar terakhir.
+    """
+    high = np.asarray(high, dtype="float64")[:, -30:]
+    low = np.asarray(low, dtype="float64")[:, -30:]
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return np.nanmin(low, axis=1), np.nanmax(high, axis=1)
+
+
 def breakout_signal(df):
+    df = as_frame(df)
     resistance = df['High'][-20:].max()
     latest = df.iloc[-1]
 
@@ -1,14 +1,27 @@
 # scanner.py
 from __future__ import annotations
 
+import heapq
+import inspect
+import json
 import os
+import threading
 import time
-from dataclasses import dataclass
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass, field
+from typing import Callable
 
-from data import get_all_idx_tickers, get_fundamental, get_stock_data
-from indicators import add_indicators
-from patterns import support_resistance
-from strategy import calculate_score
+import numpy as np
+
+import kernels
+import singleflight
+from data import get_all_idx_tickers, get_fundamental, get_fundamentals_bulk, get_stock_data_bulk, ticker_health
+from indicators import add_indicators, needs_indicators
+from net import net_stats
+from patterns import support_resistance, support_resistance_panel
+from store import PriceStore, last_trading_date, load_json, save_json, session_open
+from strategy import SCORE_REQUIRES, calculate_score, calculate_score_panel
+from streaming import advance_state
 
 
 # =========================
@@ -83,7 +96,9 @@ def _split_meta_line(meta: dict) -> str:
         f"NoPE: {meta.get('no_pe', 0)} | "
         f"ScoreFail: {meta.get('score_fail', meta.get('score_not_4', 0))} | "
         f"Other: {meta.get('errors')} | "
+        f"Skip: {meta.get('skipped', 0)} | "
         f"Durasi: {meta.get('duration_s')}s"
+        + (f" | Cache: {time.strftime('%H:%M', time.localtime(meta['computed_at']))}" if meta.get("cache_hit") else "")
     )
 
 
@@ -97,198 +112,1193 @@ def _format_empty(title: str, meta: dict, hint: str) -> str:
 
 
 # =========================
-# SCAN: Fundamental Cheapest
+# SCAN ENGINE (1x sweep universe -> snapshot bersama)
 # =========================
-def scan_top10_fundamental_cheapest(
+@dataclass
+class TickerSnapshot:
+    ticker: str
+    has_price: bool = False
+    n_bars: int = 0
+    last_close: float | None = None
+    ma20: float | None = None
+    ma50: float | None = None
+    resistance: float | None = None
+    tech_score: int | None = None
+    probability: float | None = None
+    tech_error: bool = False
+    # fundamental diisi lazy: hanya kalau ada view yang butuh
+    fund_loaded: bool = False
+    fund_error: bool = False
+    pe: float | None = None
+    roe: float | None = None
+    # alasan negative cache (data.ticker_health) kalau ticker tidak di-fetch ulang
+    skip: str | None = None
+
+
+@dataclass
+class ScanSnapshot:
+    period: str
+    universe_total: int
+    rows: list[TickerSnapshot]
+    created_at: float
+    build_s: float
+    # harga disimpan supaya indikator bisa dihitung belakangan kalau ada scan yang butuh
+    prices: dict = field(default_factory=dict, repr=False)
+    technical: bool = False
+    # tanggal bar terbaru di snapshot (ISO); dipakai untuk invalidasi cache hasil
+    data_date: str | None = None
+
+
+# kolom yang dibutuhkan tiap scan; indikator hanya dihitung kalau ada scan yang minta
+_TECH_COLUMNS = SCORE_REQUIRES + ("resistance",)
+SCAN_REQUIRES = {
+    "fundamental": ("Close", "PE", "ROE"),
+    "technical": _TECH_COLUMNS,
+    "combo": _TECH_COLUMNS + ("PE",),
+    "undervalued": _TECH_COLUMNS + ("PE",),
+    "breakout": _TECH_COLUMNS,
+}
+
+
+_SNAPSHOTS: dict[tuple, ScanSnapshot] = {}
+_SNAPSHOT_LOCK = threading.RLock()
+
+# pekerjaan identik yang diminta bersamaan hanya dikerjakan sekali
+_SWEEP_FLIGHT = singleflight.group("scan_sweep")
+_SCAN_FLIGHT = singleflight.group("scan")
+
+
+# alasan health yang membuat harga tidak di-fetch sama sekali
+_PRICE_SKIP = ("no_price", "stale")
+
+
+def _skip_bad_enabled() -> bool:
+    """
+    SCAN_SKIP_BAD=0 -> ticker yang tercatat bermasalah tetap di-fetch tiap scan.
+    """
+    return os.getenv("SCAN_SKIP_BAD", "1") != "0"
+
+
+def _snapshot_ttl() -> float:
+    env_s = os.getenv("SCAN_SNAPSHOT_SECONDS")
+    return float(env_s) if env_s and env_s.isdigit() else 300.0
+
+
+def _fetch_workers(default: int | None = None) -> int:
+    """
+    Jumlah thread fetch paralel (env SCAN_FETCH_WORKERS, default 4).
+    """
+    if default is not None:
+        return max(1, default)
+    env_w = os.getenv("SCAN_FETCH_WORKERS")
+    return max(1, int(env_w)) if env_w and env_w.isdigit() else 4
+
+
+def _cpu_workers(default: int | None = None) -> int:
+    """
+    Jumlah proses untuk hitung indikator (env SCAN_CPU_WORKERS, default 0 = di proses ini).
+    """
+    if default is not None:
+        return max(0, default)
+    env_w = os.getenv("SCAN_CPU_WORKERS")
+    return int(env_w) if env_w and env_w.isdigit() else 0
+
+
+def _price_features(df) -> dict | None:
+    """
+    Indikator + score untuk 1 ticker (jalan di worker process kalau SCAN_CPU_WORKERS > 0).
+    None kalau perhitungan gagal.
+    """
+    try:
+        df = add_indicators(df)
+        _, resistance = support_resistance(df)
+        score, probability = calculate_score(df, resistance)
+        latest = df.iloc[-1]
+        return {
+            "ma20": float(latest["MA20"]),
+            "ma50": float(latest["MA50"]),
+            "resistance": float(resistance),
+            "tech_score": int(score),
+            "probability": float(probability),
+        }
+    except Exception:
+        return None
+
+
+def _incremental_enabled() -> bool:
+    """
+    SCAN_INCREMENTAL=1 -> indikator dari IndicatorState tersimpan (O(1) per bar baru).
+    """
+    return os.getenv("SCAN_INCREMENTAL", "0") == "1"
+
+
+def _price_features_incremental(items: list[tuple[str, object]]) -> list[tuple[str, int, float, dict | None]]:
+    """
+    Sama seperti _price_features_batch, tapi nilai bar terakhir diambil dari
+    IndicatorState per ticker yang hanya dimajukan dengan bar baru.
+    Histori indikator mulai dari seed state (bar pertama PriceStore), bukan
+    awal window, jadi EMA/RSI bisa beda sedikit dari jalur batch.
+    """
+    store = PriceStore()
+    states = []
+    for t, df in items:
+        try:
+            states.append(advance_state(store, t, df).values())
+        except Exception:
+            states.append(None)
+
+    ok = [v for v in states if v is not None]
+    if ok:
+        col = {k: np.array([[v[k]] for v in ok]) for k in ("MA20", "MA50", "MACD", "MACD_signal", "RSI", "Close")}
+        resistance = np.array([v["resistance"] for v in ok])
+        score, probability = calculate_score_panel(
+            col["MA20"], col["MA50"], col["MACD"], col["MACD_signal"], col["RSI"], col["Close"], resistance
+        )
+
+    out = []
+    j = 0
+    for (t, df), v in zip(items, states):
+        if v is None:
+            out.append((t, len(df), _last_close(df), None))
+            continue
+        out.append((t, len(df), float(v["Close"]), {
+            "ma20": float(v["MA20"]),
+            "ma50": float(v["MA50"]),
+            "resistance": float(v["resistance"]),
+            "tech_score": int(score[j]),
+            "probability": float(probability[j]),
+        }))
+        j += 1
+    return out
+
+
+def _price_features_batch(items: list[tuple[str, object]]) -> list[tuple[str, int, float, dict | None]]:
+    """
+    Indikator + score untuk satu batch ticker sekaligus lewat kernel NumPy
+    dan fungsi panel (1 call per batch, bukan per ticker).
+    Kalau batch gagal, jatuh ke jalur per-ticker supaya error tetap per ticker.
+    """
+    if not items:
+        return []
+    if _incremental_enabled():
+        return _price_features_incremental(items)
+    try:
+        frames = [df for _, df in items]
+        close = kernels.stack_panel(frames, "Close")
+        high = kernels.stack_panel(frames, "High")
+        low = kernels.stack_panel(frames, "Low")
+
+        ma20 = kernels.sma(close, 20)
+        ma50 = kernels.sma(close, 50)
+        rsi = kernels.rsi(close)
+        macd, macd_signal = kernels.macd(close)
+        _, resistance = support_resistance_panel(high, low)
+        score, probability = calculate_score_panel(ma20, ma50, macd, macd_signal, rsi, close, resistance)
+    except Exception:
+        return [(t, len(df), _last_close(df), _price_features(df)) for t, df in items]
+
+    out = []
+    for i, (t, df) in enumerate(items):
+        out.append((t, len(df), float(close[i, -1]), {
+            "ma20": float(ma20[i, -1]),
+            "ma50": float(ma50[i, -1]),
+            "resistance": float(resistance[i]),
+            "tech_score": int(score[i]),
+            "probability": float(probability[i]),
+        }))
+    return out
+
+
+def _last_close(df) -> float:
+    return float(np.asarray(df["Close"])[-1])
+
+
+def _apply_price(row: TickerSnapshot, df) -> None:
+    row.has_price = True
+    row.n_bars = len(df)
+    row.last_close = _last_close(df)
+
+
+def _apply_features(row: TickerSnapshot, features: dict | None) -> None:
+    if features is None:
+        row.tech_error = True
+        return
+    for k, v in features.items():
+        setattr(row, k, v)
+
+
+def _apply_fundamental(row: TickerSnapshot, f: dict) -> None:
+    row.pe = _safe_float(f.get("pe"))
+    row.roe = _safe_float(f.get("roe"))
+    row.fund_loaded = True
+
+
+def _chunks(items: list, size: int) -> list[list]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _fetch_prices(tickers: list[str], period: str) -> dict:
+    try:
+        # OHLCV ringkas (float32): snapshot memegang harga seluruh universe
+        return get_stock_data_bulk(tickers, period=period, compact=True)
+    except Exception:
+        return {}
+
+
+def _make_rows(
+    tickers: list[str],
+    prices: dict,
+    features: dict,
+    funds: dict,
+    technical: bool,
+    skip: dict,
+) -> list[TickerSnapshot]:
+    rows = []
+    for t in tickers:
+        row = TickerSnapshot(ticker=t, skip=skip.get(t))
+        if t in prices:
+            _apply_price(row, prices[t])
+            if technical:
+                _apply_features(row, features.get(t))
+        if t in funds:
+            _apply_fundamental(row, funds[t])
+        rows.append(row)
+    return rows
+
+
+def _sweep(
+    tickers: list[str],
     *,
-    period: str = "6mo",
-    top_n: int = 10,
-    max_universe: int | None = None,
-) -> tuple[list[FundamentalRank], dict]:
-    max_universe = _get_max_universe(max_universe)
+    period: str,
+    technical: bool,
+    prices: dict,
+    fetch_workers: int | None = None,
+    cpu_workers: int | None = None,
+    recheck: bool = False,
+):
+    """
+    Generator: yield list TickerSnapshot per chunk begitu chunk itu selesai
+    (urutan selesai, bukan urutan universe). Harga yang didapat dikumpulkan ke `prices`.
+    Ticker tanpa harga / basi yang masih dalam backoff ticker_health() tidak
+    di-fetch (row.skip diisi); recheck=True -> semua ticker di-fetch ulang.
+
+    Fetch harga per chunk jalan paralel di thread pool; begitu satu chunk
+    selesai, indikatornya langsung dihitung (di process pool kalau
+    cpu_workers > 0) sementara chunk lain masih di-download.
+    """
+    fetch_workers = _fetch_workers(fetch_workers)
+    cpu_workers = _cpu_workers(cpu_workers)
+    funds = get_fundamentals_bulk(tickers, recheck=recheck)
+    skip = {} if (recheck or not _skip_bad_enabled()) else ticker_health().known_bad(tickers)
+    skipped = [t for t in tickers if skip.get(t) in _PRICE_SKIP]
+    if skipped:
+        yield _make_rows(skipped, prices, {}, funds, technical, skip)
+    tickers = [t for t in tickers if skip.get(t) not in _PRICE_SKIP]
+
+    chunk_size = max(1, min(200, -(-len(tickers) // fetch_workers)))
+    cpu_pool = ProcessPoolExecutor(max_workers=cpu_workers) if (technical and cpu_workers > 0) else None
 
+    try:
+        with ThreadPoolExecutor(max_workers=fetch_workers, thread_name_prefix="scan-fetch") as io_pool:
+            pending = {
+                io_pool.submit(_fetch_prices, chunk, period): ("fetch", chunk)
+                for chunk in _chunks(tickers, chunk_size)
+            }
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    kind, chunk = pending.pop(fut)
+
+                    if kind == "compute":
+                        features = {t: feat for t, _n, _last, feat in fut.result()}
+                        yield _make_rows(chunk, prices, features, funds, technical, skip)
+                        continue
+
+                    chunk_prices = {t: df for t, df in fut.result().items() if df is not None and len(df)}
+                    prices.update(chunk_prices)
+                    items = [(t, chunk_prices[t]) for t in chunk if t in chunk_prices]
+
+                    if technical and cpu_pool is not None:
+                        # ticker tanpa harga langsung dilaporkan, sisanya menunggu worker
+                        no_price = [t for t in chunk if t not in chunk_prices]
+                        if no_price:
+                            yield _make_rows(no_price, prices, {}, funds, technical, skip)
+                        for batch in _chunks(items, 25):
+                            cf = cpu_pool.submit(_price_features_batch, batch)
+                            pending[cf] = ("compute", [t for t, _ in batch])
+                        continue
+
+                    features = {}
+                    if technical:
+                        features = {t: feat for t, _n, _last, feat in _price_features_batch(items)}
+                    yield _make_rows(chunk, prices, features, funds, technical, skip)
+    finally:
+        if cpu_pool is not None:
+            cpu_pool.shutdown(cancel_futures=True)
+
+
+def _universe(max_universe: int | None) -> tuple[list[str], int]:
     tickers = get_all_idx_tickers()
     total = len(tickers)
     if max_universe is not None:
         tickers = tickers[:max_universe]
+    return tickers, total
+
+
+def _assemble_snapshot(
+    period: str,
+    tickers: list[str],
+    total: int,
+    rows: list[TickerSnapshot],
+    prices: dict,
+    technical: bool,
+    t0: float,
+) -> ScanSnapshot:
+    # rows selalu disusun ulang mengikuti urutan universe
+    by_ticker = {r.ticker: r for r in rows}
+    last_bars = [df.index[-1] for df in prices.values() if len(df)]
+    return ScanSnapshot(
+        period=period,
+        universe_total=total,
+        rows=[by_ticker[t] for t in tickers],
+        created_at=time.time(),
+        build_s=round(time.time() - t0, 2),
+        prices=prices,
+        technical=technical,
+        data_date=max(last_bars).date().isoformat() if last_bars else None,
+    )
+
 
+def _sweep_flight(
+    *,
+    period: str,
+    max_universe: int | None,
+    technical: bool,
+    fetch_workers: int | None = None,
+    cpu_workers: int | None = None,
+    recheck: bool = False,
+):
+    """
+    Sweep universe lewat single-flight: sweep yang sama (period, max_universe,
+    technical) yang diminta bersamaan hanya jalan sekali, pemanggil lain ikut
+    menerima chunk yang sama.
+    Yield: (tickers, total), lalu list TickerSnapshot per chunk, terakhir ScanSnapshot
+    (yang juga sudah disimpan di _SNAPSHOTS).
+    """
+    def sweep():
+        tickers, total = _universe(max_universe)
+        yield tickers, total
+
+        t0 = time.time()
+        prices: dict = {}
+        rows: list[TickerSnapshot] = []
+        for chunk_rows in _sweep(
+            tickers,
+            period=period,
+            technical=technical,
+            prices=prices,
+            fetch_workers=fetch_workers,
+            cpu_workers=cpu_workers,
+            recheck=recheck,
+        ):
+            rows.extend(chunk_rows)
+            yield chunk_rows
+
+        snap = _assemble_snapshot(period, tickers, total, rows, prices, technical, t0)
+        with _SNAPSHOT_LOCK:
+            cur = _SNAPSHOTS.get((period, max_universe))
+            if cur is None or cur.created_at < snap.created_at:
+                _SNAPSHOTS[(period, max_universe)] = snap
+        _note_data_date(snap, max_universe)
+        yield snap
+
+    return _SWEEP_FLIGHT.stream((period, max_universe, technical, recheck), sweep)
+
+
+def build_scan_snapshot(
+    *,
+    period: str = "6mo",
+    max_universe: int | None = None,
+    fetch_workers: int | None = None,
+    cpu_workers: int | None = None,
+    technical: bool = True,
+    recheck: bool = False,
+) -> ScanSnapshot:
+    """
+    Sweep universe sekali: harga, indikator, score, dan fundamental yang sudah ada di cache.
+    technical=False -> indikator dilewati (cukup Close + fundamental).
+    recheck=True -> ticker di negative cache (data.ticker_health) ikut di-fetch ulang.
+    Urutan rows selalu mengikuti urutan universe, tidak tergantung urutan selesai.
+    """
+    item = None
+    for item in _sweep_flight(
+        period=period,
+        max_universe=max_universe,
+        technical=technical,
+        fetch_workers=fetch_workers,
+        cpu_workers=cpu_workers,
+        recheck=recheck,
+    ):
+        pass
+    return item
+
+
+def _compute_technical(snap: ScanSnapshot, cpu_workers: int | None = None) -> None:
+    """
+    Hitung indikator untuk snapshot yang tadinya dibangun tanpa indikator.
+    """
+    t0 = time.time()
+    items = [(r.ticker, snap.prices[r.ticker]) for r in snap.rows if r.has_price]
+    batches = _chunks(items, 200)
+    cpu_workers = _cpu_workers(cpu_workers)
+
+    if cpu_workers > 0:
+        with ProcessPoolExecutor(max_workers=cpu_workers) as pool:
+            results = list(pool.map(_price_features_batch, batches))
+    else:
+        results = [_price_features_batch(b) for b in batches]
+
+    features = {t: feat for res in results for t, _n, _last, feat in res}
+    for row in snap.rows:
+        if row.has_price:
+            _apply_features(row, features.get(row.ticker))
+    snap.technical = True
+    snap.build_s = round(snap.build_s + time.time() - t0, 2)
+
+
+def get_scan_snapshot(
+    *,
+    period: str = "6mo",
+    max_universe: int | None = None,
+    requires=_TECH_COLUMNS,
+    refresh: bool = False,
+    recheck: bool = False,
+) -> ScanSnapshot:
+    """
+    Snapshot bersama untuk semua scan; dipakai ulang selama SCAN_SNAPSHOT_SECONDS (default 5 menit).
+    requires = kolom yang dibutuhkan pemanggil (lihat SCAN_REQUIRES); indikator
+    hanya dihitung kalau diminta, dan hanya sekali per snapshot.
+    recheck=True -> snapshot dibangun ulang tanpa negative cache.
+    """
+    technical = needs_indicators(requires)
+    with _SNAPSHOT_LOCK:
+        snap = _SNAPSHOTS.get((period, max_universe))
+    # build tidak memegang lock: sweep yang sama sudah di-coalesce oleh _sweep_flight
+    if refresh or recheck or snap is None or time.time() - snap.created_at >= _snapshot_ttl():
+        return build_scan_snapshot(period=period, max_universe=max_universe, technical=technical, recheck=recheck)
+    if technical:
+        _ensure_technical(snap)
+    return snap
+
+
+def _ensure_technical(snap: ScanSnapshot) -> None:
+    with _SNAPSHOT_LOCK:
+        if not snap.technical:
+            _compute_technical(snap)
+
+
+def _ensure_fundamental(row: TickerSnapshot) -> None:
+    if row.fund_loaded or row.fund_error:
+        return
+    try:
+        _apply_fundamental(row, get_fundamental(row.ticker))
+    except Exception:
+        row.fund_error = True
+
+
+def _prefetch_fundamentals(rows: list[TickerSnapshot]) -> None:
+    """
+    Ambil fundamental yang belum ada di cache secara paralel sebelum ranking jalan.
+    """
+    pending = [r for r in rows if not (r.fund_loaded or r.fund_error or r.skip == "no_pe")]
+    if not pending:
+        return
+    with ThreadPoolExecutor(max_workers=_fetch_workers(), thread_name_prefix="scan-fund") as pool:
+        list(pool.map(_ensure_fundamental, pending))
+
+
+def _new_meta(universe_total: int, universe_scanned: int, *counters: str) -> dict:
     meta = {
-        "universe_total": total,
-        "universe_scanned": len(tickers),
+        "universe_total": universe_total,
+        "universe_scanned": universe_scanned,
         "ok": 0,
         "no_price": 0,
-        "no_pe": 0,
-        "errors": 0,
-        "duration_s": None,
     }
+    for c in counters:
+        meta[c] = 0
+    meta["errors"] = 0
+    # ticker di negative cache (tidak di-fetch ulang): jumlah + {ticker: alasan}
+    meta["skipped"] = 0
+    meta["skipped_tickers"] = {}
+    meta["duration_s"] = None
+    return meta
 
-    t0 = time.time()
-    out: list[FundamentalRank] = []
 
-    for t in tickers:
-        try:
-            df, _ = get_stock_data(t, period=period)
-            if df is None or df.empty:
-                meta["no_price"] += 1
-                continue
+def _finish_meta(meta: dict, snap: ScanSnapshot, t0: float, net0: dict) -> dict:
+    meta["duration_s"] = round(time.time() - t0, 2)
+    meta["snapshot_build_s"] = snap.build_s
+    meta["snapshot_age_s"] = round(time.time() - snap.created_at, 2)
+    meta["net"] = net_stats(since=net0)
+    meta["singleflight"] = singleflight.flight_stats()
+    return meta
 
-            f = get_fundamental(t)
-            pe = _safe_float(f.get("pe"))
-            roe = _safe_float(f.get("roe"))
 
-            if pe is None:
-                meta["no_pe"] += 1
-                continue
+# =========================
+# RANKINGS (view di atas snapshot)
+# Tiap ranking = pipeline filter. Stage "fixed" selalu jalan duluan
+# (harga, error indikator); sisanya diurutkan planner berdasarkan biaya
+# terukur dan pass rate, jadi fetch fundamental yang mahal hanya jalan
+# untuk ticker yang sudah lolos filter murah.
+# =========================
+@dataclass
+class Stage:
+    name: str
+    # None = lolos, selain itu nama counter meta yang dinaikkan
+    check: Callable[[TickerSnapshot], str | None]
+    # dipanggil sekali untuk semua survivor sebelum check (mis. fetch fundamental paralel)
+    prepare: Callable[[list[TickerSnapshot]], None] | None = None
+    fixed: bool = False
+    prior_cost_s: float = 1e-6
+
+
+_STAGE_STATS: dict[tuple[str, str], dict] = {}
+_STAGE_STATS_LOCK = threading.Lock()
+_STATS_DECAY = 0.3
+
+
+def _stage_stats(scan: str, stage: Stage) -> dict:
+    return _STAGE_STATS.get((scan, stage.name), {"cost_s": stage.prior_cost_s, "pass_rate": 0.5, "runs": 0})
+
+
+def plan_stages(scan: str, stages: list[Stage]) -> list[Stage]:
+    """
+    Urutan eksekusi: stage fixed sesuai urutan tulis, lalu sisanya dengan
+    rank = biaya per ticker / (1 - pass rate), terkecil dulu.
+    """
+    fixed = [s for s in stages if s.fixed]
+    free = [s for s in stages if not s.fixed]
+
+    def rank(stage: Stage) -> float:
+        st = _stage_stats(scan, stage)
+        return st["cost_s"] / max(1e-3, 1.0 - st["pass_rate"])
+
+    return fixed + sorted(free, key=rank)
+
+
+def _record_stage(scan: str, stage: Stage, n_in: int, n_pass: int, elapsed: float) -> None:
+    if n_in == 0:
+        return
+    with _STAGE_STATS_LOCK:
+        st = dict(_stage_stats(scan, stage))
+        cost = elapsed / n_in
+        rate = n_pass / n_in
+        if st["runs"] == 0:
+            st["cost_s"], st["pass_rate"] = cost, rate
+        else:
+            st["cost_s"] += _STATS_DECAY * (cost - st["cost_s"])
+            st["pass_rate"] += _STATS_DECAY * (rate - st["pass_rate"])
+        st["runs"] += 1
+        _STAGE_STATS[(scan, stage.name)] = st
+
+
+def run_pipeline(
+    scan: str,
+    rows: list[TickerSnapshot],
+    stages: list[Stage],
+    meta: dict,
+    *,
+    plan: bool = True,
+) -> list[TickerSnapshot]:
+    """
+    Jalankan stage satu per satu atas ticker yang masih lolos (urutan universe tetap).
+    Ticker yang gagal dihitung di counter stage pertama yang menolaknya.
+    Pass count per stage diakumulasi di meta["stages"] (bisa dipanggil per chunk).
+    plan=False -> stages dipakai sesuai urutan yang diberikan.
+    """
+    survivors = rows
+    report = {s["stage"]: s for s in meta.setdefault("stages", [])}
+    for stage in plan_stages(scan, stages) if plan else stages:
+        t0 = time.time()
+        if stage.prepare is not None:
+            stage.prepare(survivors)
+
+        kept = []
+        for row in survivors:
+            fail = stage.check(row)
+            if fail is None:
+                kept.append(row)
+            else:
+                meta[fail] += 1
+                if fail == "skipped":
+                    meta["skipped_tickers"][row.ticker] = row.skip
+
+        elapsed = time.time() - t0
+        _record_stage(scan, stage, len(survivors), len(kept), elapsed)
+        entry = report.get(stage.name)
+        if entry is None:
+            entry = report[stage.name] = {"stage": stage.name, "in": 0, "pass": 0, "ms": 0.0}
+            meta["stages"].append(entry)
+        entry["in"] += len(survivors)
+        entry["pass"] += len(kept)
+        entry["ms"] = round(entry["ms"] + elapsed * 1000, 2)
+        survivors = kept
+
+    return survivors
+
+
+# ---- stage builders ----
+def _stage_price(min_bars: int = 1) -> Stage:
+    def check(r: TickerSnapshot) -> str | None:
+        if r.skip in _PRICE_SKIP:
+            return "skipped"
+        return None if (r.has_price and r.n_bars >= min_bars) else "no_price"
+    return Stage("price", check, fixed=True)
+
+
+_STAGE_TECH_OK = Stage("tech_ok", lambda r: "errors" if r.tech_error else None, fixed=True)
+
+
+def _fund_check(pe_max: float | None = None):
+    def check(r: TickerSnapshot) -> str | None:
+        if r.skip == "no_pe" and r.pe is None:
+            return "skipped"
+        _ensure_fundamental(r)
+        if r.fund_error:
+            return "errors"
+        if r.pe is None or (pe_max is not None and r.pe > pe_max):
+            return "no_pe"
+        return None
+    return check
 
-            last_close = float(df["Close"].iloc[-1])
-            out.append(FundamentalRank(ticker=t, pe=pe, roe=roe, last_close=last_close))
-            meta["ok"] += 1
 
-        except Exception:
-            meta["errors"] += 1
-            continue
+def _stage_pe(pe_max: float | None = None) -> Stage:
+    return Stage(
+        "pe" if pe_max is None else "pe_max",
+        _fund_check(pe_max),
+        prepare=_prefetch_fundamentals,
+        prior_cost_s=0.05,
+    )
+
+
+def _stage_min_score(min_score: int) -> Stage:
+    return Stage("min_score", lambda r: None if r.tech_score >= min_score else "score_fail")
 
-    meta["duration_s"] = round(time.time() - t0, 2)
 
-    out.sort(key=lambda r: (r.pe, -(r.roe if r.roe is not None else -1e9)))
-    return out[:top_n], meta
+_STAGE_TREND = Stage("trend", lambda r: None if (r.ma20 > r.ma50 and r.last_close > r.ma20) else "trend_fail")
+
+
+def _stage_near_res(near_resistance: float) -> Stage:
+    # dekat resistance
+    return Stage(
+        "near_resistance",
+        lambda r: None if r.last_close >= r.resistance * near_resistance else "near_res_fail",
+    )
 
 
 # =========================
-# SCAN: Technical 4/4
+# TOP-N (bounded heap)
 # =========================
-def scan_top10_technical_4of4(
+class _Worst:
+    # pembungkus heap: elemen dengan key terbesar (= peringkat terburuk) ada di heap[0]
+    __slots__ = ("key", "item")
+
+    def __init__(self, key: tuple, item):
+        self.key = key
+        self.item = item
+
+    def __lt__(self, other: "_Worst") -> bool:
+        return self.key > other.key
+
+
+class _TopN:
+    """
+    Simpan top_n item dengan key terkecil; memori O(top_n).
+    Posisi universe ikut jadi bagian key, jadi hasil seri diurutkan
+    sama persis seperti sort stabil atas seluruh list.
+    """
+
+    def __init__(self, n: int):
+        self.n = n
+        self.heap: list[_Worst] = []
+
+    def push(self, key: tuple, pos: int, item) -> None:
+        if self.n <= 0:
+            return
+        entry = _Worst(key + (pos,), item)
+        if len(self.heap) < self.n:
+            heapq.heappush(self.heap, entry)
+        elif entry.key < self.heap[0].key:
+            heapq.heapreplace(self.heap, entry)
+
+    def items(self) -> list:
+        return [e.item for e in sorted(self.heap, key=lambda e: e.key)]
+
+
+# =========================
+# SCAN REGISTRY
+# =========================
+def _pe_score(pe: float) -> int:
+    # Fundamental score (lebih realistis)
+    if pe < 10:
+        return 4
+    elif pe < 15:
+        return 3
+    elif pe < 20:
+        return 2
+    return 1
+
+
+def _combo_rank(r: TickerSnapshot) -> ComboRank:
+    f_score = _pe_score(r.pe)
+    return ComboRank(
+        ticker=r.ticker,
+        total_score=int(f_score + r.tech_score),
+        pe=float(r.pe),
+        tech_score=int(r.tech_score),
+        f_score=int(f_score),
+    )
+
+
+@dataclass
+class ScanSpec:
+    title: str
+    row_type: type
+    counters: tuple[str, ...]
+    # parameter filter (dengan default) -> daftar stage
+    stages: Callable[..., list[Stage]]
+    make: Callable[[TickerSnapshot], object]
+    # key sort ascending; seri -> urutan universe
+    key: Callable[[object], tuple]
+    line: Callable[[object], str]
+    technical: bool = True
+
+
+SCANS: dict[str, ScanSpec] = {
+    "fundamental": ScanSpec(
+        title="🏷️ Top 10 Fundamental Termurah (PE terkecil)",
+        row_type=FundamentalRank,
+        counters=("no_pe",),
+        stages=lambda: [_stage_price(), _stage_pe()],
+        make=lambda r: FundamentalRank(ticker=r.ticker, pe=r.pe, roe=r.roe, last_close=r.last_close),
+        key=lambda r: (r.pe, -(r.roe if r.roe is not None else -1e9)),
+        line=lambda r: (
+            f"{r.ticker} | PE: {r.pe:.2f} | "
+            f"ROE: {f'{(r.roe * 100):.1f}%' if r.roe is not None else '-'} | Close: {r.last_close:.0f}"
+        ),
+        technical=False,
+    ),
+    "technical": ScanSpec(
+        title="📊 Top 10 Technical (Score 4/4)",
+        row_type=TechnicalRank,
+        counters=("score_not_4",),
+        stages=lambda: [
+            _stage_price(),
+            _STAGE_TECH_OK,
+            Stage("score_4", lambda r: None if r.tech_score == 4 else "score_not_4"),
+        ],
+        make=lambda r: TechnicalRank(ticker=r.ticker, score=r.tech_score, probability=r.probability, last_close=r.last_close),
+        key=lambda r: (-r.probability, r.ticker),
+        line=lambda r: f"{r.ticker} | Score: {r.score}/4 | Prob: {r.probability:.0f}% | Close: {r.last_close:.0f}",
+    ),
+    "combo": ScanSpec(
+        title="🏆 Top 10 Combo (Fundamental + Technical)",
+        row_type=ComboRank,
+        counters=("no_pe",),
+        stages=lambda: [_stage_price(), _STAGE_TECH_OK, _stage_pe()],
+        make=_combo_rank,
+        key=lambda r: (-r.total_score, r.pe),
+        line=lambda r: f"{r.ticker} | Total: {r.total_score} | F:{r.f_score}/4 | T:{r.tech_score}/4 | PE: {r.pe:.2f}",
+    ),
+    "undervalued": ScanSpec(
+        title="💎 Undervalued but Strong Trend",
+        row_type=UndervaluedRank,
+        counters=("no_pe", "score_fail", "trend_fail"),
+        stages=lambda pe_max=20.0, min_score=2: [
+            _stage_price(min_bars=60),
+            _STAGE_TECH_OK,
+            _stage_min_score(min_score),
+            _STAGE_TREND,
+            _stage_pe(pe_max),
+        ],
+        make=lambda r: UndervaluedRank(ticker=r.ticker, pe=float(r.pe), tech_score=r.tech_score, last_close=r.last_close),
+        key=lambda r: (r.pe, -r.tech_score),
+        line=lambda r: f"{r.ticker} | PE: {r.pe:.2f} | Score: {r.tech_score}/4 | Close: {r.last_close:.0f}",
+    ),
+    "breakout": ScanSpec(
+        title="🚀 Breakout Candidates",
+        row_type=BreakoutRank,
+        counters=("score_fail", "near_res_fail"),
+        stages=lambda near_resistance=0.95, min_score=2: [
+            _stage_price(min_bars=60),
+            _STAGE_TECH_OK,
+            _stage_min_score(min_score),
+            _stage_near_res(near_resistance),
+        ],
+        make=lambda r: BreakoutRank(
+            ticker=r.ticker,
+            probability=r.probability,
+            tech_score=r.tech_score,
+            last_close=r.last_close,
+            resistance=r.resistance,
+        ),
+        key=lambda r: (-r.probability, -r.tech_score),
+        line=lambda r: (
+            f"{r.ticker} | Prob: {r.probability:.0f}% | Score: {r.tech_score}/4 | "
+            f"Close: {r.last_close:.0f} | Res: {r.resistance:.0f}"
+        ),
+    ),
+}
+
+
+def _push_top(top: _TopN, spec: ScanSpec, rows: list[TickerSnapshot], pos: dict[str, int]) -> None:
+    for r in rows:
+        item = spec.make(r)
+        top.push(spec.key(item), pos[r.ticker], item)
+
+
+def _rank(snap: ScanSnapshot, name: str, *, top_n: int = 10, **params) -> tuple[list, dict]:
+    spec = SCANS[name]
+    if spec.technical:
+        _ensure_technical(snap)
+    meta = _new_meta(snap.universe_total, len(snap.rows), *spec.counters)
+    t0 = time.time()
+    net0 = net_stats()
+
+    rows = run_pipeline(name, snap.rows, spec.stages(**params), meta)
+    top = _TopN(top_n)
+    _push_top(top, spec, rows, {r.ticker: i for i, r in enumerate(rows)})
+    meta["ok"] = len(rows)
+    return top.items(), _finish_meta(meta, snap, t0, net0)
+
+
+def rank_fundamental_cheapest(snap: ScanSnapshot, *, top_n: int = 10) -> tuple[list[FundamentalRank], dict]:
+    return _rank(snap, "fundamental", top_n=top_n)
+
+
+def rank_technical_4of4(snap: ScanSnapshot, *, top_n: int = 10) -> tuple[list[TechnicalRank], dict]:
+    return _rank(snap, "technical", top_n=top_n)
+
+
+def rank_combo(snap: ScanSnapshot, *, top_n: int = 10) -> tuple[list[ComboRank], dict]:
+    return _rank(snap, "combo", top_n=top_n)
+
+
+def rank_undervalued_strong(
+    snap: ScanSnapshot,
     *,
-    period: str = "6mo",
     top_n: int = 10,
-    max_universe: int | None = None,
-) -> tuple[list[TechnicalRank], dict]:
-    max_universe = _get_max_universe(max_universe)
+    pe_max: float = 20.0,
+    min_score: int = 2,
+) -> tuple[list[UndervaluedRank], dict]:
+    return _rank(snap, "undervalued", top_n=top_n, pe_max=pe_max, min_score=min_score)
 
-    tickers = get_all_idx_tickers()
-    total = len(tickers)
-    if max_universe is not None:
-        tickers = tickers[:max_universe]
 
-    meta = {
-        "universe_total": total,
-        "universe_scanned": len(tickers),
-        "ok": 0,
-        "no_price": 0,
-        "score_not_4": 0,
-        "errors": 0,
-        "duration_s": None,
-    }
+def rank_breakout(
+    snap: ScanSnapshot,
+    *,
+    top_n: int = 10,
+    near_resistance: float = 0.95,
+    min_score: int = 2,
+) -> tuple[list[BreakoutRank], dict]:
+    return _rank(snap, "breakout", top_n=top_n, near_resistance=near_resistance, min_score=min_score)
 
-    t0 = time.time()
-    out: list[TechnicalRank] = []
 
-    for t in tickers:
-        try:
-            df, _ = get_stock_data(t, period=period)
-            if df is None or df.empty:
-                meta["no_price"] += 1
-                continue
+# =========================
+# RESULT CACHE
+# key = (scan, period, top_n, max_universe, parameter filter, sesi bursa terakhir).
+# Selama bar harian belum berubah, hasil scan yang sama tidak perlu sweep ulang.
+# Disimpan ke cache/scan_results.json supaya tetap ada setelah bot restart.
+# =========================
+_RESULTS_FILE = "scan_results.json"
+_RESULTS: dict[str, dict] | None = None
+_RESULTS_LOCK = threading.Lock()
 
-            df = add_indicators(df)
-            _, resistance = support_resistance(df)
-            score, probability = calculate_score(df, resistance)
 
-            if score != 4:
-                meta["score_not_4"] += 1
-                continue
+def _result_cache_enabled() -> bool:
+    return os.getenv("SCAN_RESULT_CACHE", "1") != "0"
 
-            last_close = float(df["Close"].iloc[-1])
-            out.append(TechnicalRank(ticker=t, score=int(score), probability=float(probability), last_close=last_close))
-            meta["ok"] += 1
 
-        except Exception:
-            meta["errors"] += 1
-            continue
+def _intraday_ttl() -> float:
+    # hasil yang dihitung saat bursa buka memakai bar yang masih berjalan
+    env_s = os.getenv("SCAN_RESULT_INTRADAY_SECONDS")
+    return float(env_s) if env_s and env_s.isdigit() else 900.0
 
-    meta["duration_s"] = round(time.time() - t0, 2)
 
-    out.sort(key=lambda r: (-r.probability, r.ticker))
-    return out[:top_n], meta
+def _result_key(name: str, period: str, top_n: int, max_universe: int | None, params: dict) -> str:
+    # parameter default ikut di key, jadi iter_scan("breakout") == scan_top10_breakout()
+    defaults = {
+        k: p.default for k, p in inspect.signature(SCANS[name].stages).parameters.items()
+        if p.default is not inspect.Parameter.empty
+    }
+    session = last_trading_date().date().isoformat()
+    return json.dumps([name, period, top_n, max_universe, sorted({**defaults, **params}.items()), session])
+
+
+def _results() -> dict[str, dict]:
+    # dipanggil dengan _RESULTS_LOCK dipegang
+    global _RESULTS
+    if _RESULTS is None:
+        session = last_trading_date().date().isoformat()
+        loaded = load_json(_RESULTS_FILE) or {}
+        # entry dari sesi sebelumnya tidak akan pernah kena lagi
+        _RESULTS = {k: v for k, v in loaded.items() if json.loads(k)[-1] == session}
+    return _RESULTS
+
+
+def _cached_result(name: str, key: str) -> tuple[list, dict] | None:
+    if not _result_cache_enabled():
+        return None
+    with _RESULTS_LOCK:
+        entry = _results().get(key)
+    if entry is None:
+        return None
+    if entry["intraday"] and time.time() - entry["computed_at"] >= _intraday_ttl():
+        return None
+
+    row_type = SCANS[name].row_type
+    meta = dict(entry["meta"])
+    meta["cache_hit"] = True
+    return [row_type(**r) for r in entry["top"]], meta
+
+
+def _store_result(name: str, key: str, top: list, meta: dict, snap: ScanSnapshot, max_universe: int | None) -> None:
+    meta["computed_at"] = time.time()
+    meta["cache_hit"] = False
+    if not _result_cache_enabled():
+        return
+    entry = {
+        "top": [asdict(r) for r in top],
+        "meta": meta,
+        "computed_at": meta["computed_at"],
+        "period": snap.period,
+        "max_universe": max_universe,
+        "data_date": snap.data_date,
+        "intraday": session_open(),
+    }
+    with _RESULTS_LOCK:
+        _results()[key] = entry
+        save_json(_RESULTS_FILE, _RESULTS)
+
+
+def invalidate_scan_results(
+    *,
+    period: str | None = None,
+    max_universe: int | None = None,
+    older_than: str | None = None,
+) -> int:
+    """
+    Hapus hasil scan dari cache. Tanpa argumen -> semua.
+    period/max_universe membatasi ke universe tertentu; older_than (tanggal ISO)
+    hanya menghapus hasil yang dihitung dari bar sebelum tanggal itu.
+    Return jumlah entry yang dihapus.
+    """
+    with _RESULTS_LOCK:
+        results = _results()
+        drop = [
+            k for k, e in results.items()
+            if (period is None or e["period"] == period)
+            and (period is None or e["max_universe"] == max_universe)
+            and (older_than is None or e["data_date"] is None or e["data_date"] < older_than)
+        ]
+        for k in drop:
+            del results[k]
+        if drop:
+            save_json(_RESULTS_FILE, results)
+    return len(drop)
+
+
+def _note_data_date(snap: ScanSnapshot, max_universe: int | None) -> None:
+    # snapshot baru membawa bar yang lebih baru -> hasil lama untuk universe ini basi
+    if snap.data_date is not None:
+        invalidate_scan_results(period=snap.period, max_universe=max_universe, older_than=snap.data_date)
+
+
+def run_scan(
+    name: str,
+    *,
+    period: str = "6mo",
+    top_n: int = 10,
+    max_universe: int | None = None,
+    recheck: bool = False,
+    **params,
+) -> tuple[list, dict]:
+    """
+    Jalankan satu scan dari registry SCANS lewat cache hasil.
+    meta berisi computed_at (epoch), cache_hit, dan ticker yang di-skip negative cache.
+    recheck=True -> abaikan cache hasil & negative cache, semua ticker di-fetch ulang.
+    """
+    progress = None
+    for progress in iter_scan(name, period=period, top_n=top_n, max_universe=max_universe, recheck=recheck, **params):
+        pass
+    return progress.top, progress.meta
 
 
 # =========================
-# SCAN: Combo Fundamental + Technical
+# STREAMING SCAN (hasil parsial selama sweep)
 # =========================
-def scan_top10_combo(
+@dataclass
+class ScanProgress:
+    name: str
+    done: int
+    total: int
+    top: list
+    meta: dict
+    finished: bool = False
+
+    @property
+    def pct(self) -> int:
+        return int(100 * self.done / self.total) if self.total else 100
+
+
+def iter_scan(
+    name: str,
     *,
     period: str = "6mo",
     top_n: int = 10,
     max_universe: int | None = None,
-) -> tuple[list[ComboRank], dict]:
+    recheck: bool = False,
+    **params,
+):
+    """
+    Versi generator dari scan_top10_*: yield ScanProgress tiap chunk universe
+    selesai (top-N sementara + counter meta), lalu sekali lagi dengan finished=True.
+    Hasil akhir sama dengan scan_top10_* untuk parameter yang sama. Kalau
+    snapshot yang masih segar sudah ada, langsung yield hasil akhir.
+    Snapshot yang terbangun selama sweep disimpan untuk scan berikutnya,
+    hasil akhirnya masuk cache hasil (lihat run_scan).
+    """
     max_universe = _get_max_universe(max_universe)
+    rkey = _result_key(name, period, top_n, max_universe, params)
 
-    tickers = get_all_idx_tickers()
-    total = len(tickers)
-    if max_universe is not None:
-        tickers = tickers[:max_universe]
+    hit = None if recheck else _cached_result(name, rkey)
+    if hit is not None:
+        top, meta = hit
+        yield ScanProgress(name, meta["universe_scanned"], meta["universe_scanned"], top, meta, finished=True)
+        return
+
+    # scan identik (key hasil sama) yang sedang jalan -> ikut menerima progress-nya
+    yield from _SCAN_FLIGHT.stream(
+        (rkey, recheck), lambda: _iter_scan(name, rkey, period, top_n, max_universe, params, recheck)
+    )
 
-    meta = {
-        "universe_total": total,
-        "universe_scanned": len(tickers),
-        "ok": 0,
-        "no_price": 0,
-        "no_pe": 0,
-        "errors": 0,
-        "duration_s": None,
-    }
+
+def _iter_scan(
+    name: str, rkey: str, period: str, top_n: int, max_universe: int | None, params: dict, recheck: bool = False
+):
+    spec = SCANS[name]
+    with _SNAPSHOT_LOCK:
+        snap = _SNAPSHOTS.get((period, max_universe))
+    if not recheck and snap is not None and time.time() - snap.created_at < _snapshot_ttl():
+        top, meta = _rank(snap, name, top_n=top_n, **params)
+        _store_result(name, rkey, top, meta, snap, max_universe)
+        yield ScanProgress(name, len(snap.rows), len(snap.rows), top, meta, finished=True)
+        return
 
     t0 = time.time()
-    out: list[ComboRank] = []
+    net0 = net_stats()
+    # urutan stage dikunci di awal supaya counter konsisten antar chunk
+    stages = plan_stages(name, spec.stages(**params))
+    top = _TopN(top_n)
+    done = 0
+
+    for item in _sweep_flight(period=period, max_universe=max_universe, technical=spec.technical, recheck=recheck):
+        if isinstance(item, ScanSnapshot):
+            snap = item
+        elif isinstance(item, tuple):
+            tickers, total = item
+            pos = {t: i for i, t in enumerate(tickers)}
+            meta = _new_meta(total, len(tickers), *spec.counters)
+        else:
+            passed = run_pipeline(name, item, stages, meta, plan=False)
+            _push_top(top, spec, passed, pos)
+            done += len(item)
+            meta["ok"] += len(passed)
+            meta["duration_s"] = round(time.time() - t0, 2)
+            yield ScanProgress(name, done, len(tickers), top.items(), dict(meta))
+
+    top = top.items()
+    meta = _finish_meta(meta, snap, t0, net0)
+    _store_result(name, rkey, top, meta, snap, max_universe)
+    yield ScanProgress(name, done, len(tickers), top, meta, finished=True)
+
+
+def format_progress(progress: ScanProgress, leaders: int = 5) -> str:
+    """
+    Pesan status singkat selama scan berjalan: persen universe + pemimpin sementara.
+    """
+    spec = SCANS[progress.name]
+    meta = progress.meta
+    lines = [
+        spec.title,
+        "",
+        f"⏳ Scanning {progress.pct}% ({progress.done}/{progress.total}) | "
+        f"Lolos: {meta.get('ok')} | {meta.get('duration_s')}s",
+    ]
+    if progress.top:
+        lines.append("")
+        lines.append("Sementara:")
+        for i, r in enumerate(progress.top[:leaders], 1):
+            lines.append(f"{i}. {spec.line(r)}")
+    return "\n".join(lines)
 
-    for t in tickers:
-        try:
-            df, _ = get_stock_data(t, period=period)
-            if df is None or df.empty:
-                meta["no_price"] += 1
-                continue
-
-            df = add_indicators(df)
-            _, resistance = support_resistance(df)
-            tech_score, _prob = calculate_score(df, resistance)
-
-            f = get_fundamental(t)
-            pe = _safe_float(f.get("pe"))
-            if pe is None:
-                meta["no_pe"] += 1
-                continue
-
-            # Fundamental score (lebih realistis)
-            if pe < 10:
-                f_score = 4
-            elif pe < 15:
-                f_score = 3
-            elif pe < 20:
-                f_score = 2
-            else:
-                f_score = 1
 
-            total_score = int(f_score + tech_score)
+def scan_all(
+    *,
+    period: str = "6mo",
+    top_n: int = 10,
+    max_universe: int | None = None,
+    recheck: bool = False,
+) -> dict[str, tuple[list, dict]]:
+    """
+    Kelima ranking dari satu snapshot universe (recheck=True -> tanpa negative cache).
+    """
+    requires = tuple({c for cols in SCAN_REQUIRES.values() for c in cols})
+    snap = get_scan_snapshot(
+        period=period, max_universe=_get_max_universe(max_universe), requires=requires, recheck=recheck
+    )
+    return {
+        "fundamental": rank_fundamental_cheapest(snap, top_n=top_n),
+        "technical": rank_technical_4of4(snap, top_n=top_n),
+        "combo": rank_combo(snap, top_n=top_n),
+        "undervalued": rank_undervalued_strong(snap, top_n=top_n),
+        "breakout": rank_breakout(snap, top_n=top_n),
+    }
 
-            out.append(
-                ComboRank(
-                    ticker=t,
-                    total_score=total_score,
-                    pe=float(pe),
-                    tech_score=int(tech_score),
-                    f_score=int(f_score),
-                )
-            )
-            meta["ok"] += 1
 
-        except Exception:
-            meta["errors"] += 1
-            continue
+# =========================
+# SCAN: Fundamental Cheapest
+# =========================
+def scan_top10_fundamental_cheapest(
+    *,
+    period: str = "6mo",
+    top_n: int = 10,
+    max_universe: int | None = None,
+) -> tuple[list[FundamentalRank], dict]:
+    return run_scan("fundamental", period=period, top_n=top_n, max_universe=max_universe)
 
-    meta["duration_s"] = round(time.time() - t0, 2)
 
-    out.sort(key=lambda r: (-r.total_score, r.pe))
-    return out[:top_n], meta
+# =========================
+# SCAN: Technical 4/4
+# =========================
+def scan_top10_technical_4of4(
+    *,
+    period: str = "6mo",
+    top_n: int = 10,
+    max_universe: int | None = None,
+) -> tuple[list[TechnicalRank], dict]:
+    return run_scan("technical", period=period, top_n=top_n, max_universe=max_universe)
+
+
+# =========================
+# SCAN: Combo Fundamental + Technical
+# =========================
+def scan_top10_combo(
+    *,
+    period: str = "6mo",
+    top_n: int = 10,
+    max_universe: int | None = None,
+) -> tuple[list[ComboRank], dict]:
+    return run_scan("combo", period=period, top_n=top_n, max_universe=max_universe)
 
 
 # =========================
@@ -303,76 +1313,9 @@ def scan_top10_undervalued_strong(
     min_score: int = 2,       # sebelumnya 3 (ketat)
     max_universe: int | None = None,
 ) -> tuple[list[UndervaluedRank], dict]:
-    max_universe = _get_max_universe(max_universe)
-
-    tickers = get_all_idx_tickers()
-    total = len(tickers)
-    if max_universe is not None:
-        tickers = tickers[:max_universe]
-
-    meta = {
-        "universe_total": total,
-        "universe_scanned": len(tickers),
-        "ok": 0,
-        "no_price": 0,
-        "no_pe": 0,
-        "score_fail": 0,
-        "trend_fail": 0,
-        "errors": 0,
-        "duration_s": None,
-    }
-
-    t0 = time.time()
-    out: list[UndervaluedRank] = []
-
-    for t in tickers:
-        try:
-            df, _ = get_stock_data(t, period=period)
-            if df is None or df.empty or len(df) < 60:
-                meta["no_price"] += 1
-                continue
-
-            df = add_indicators(df)
-            _, resistance = support_resistance(df)
-
-            tech_score, _prob = calculate_score(df, resistance)
-            if int(tech_score) < min_score:
-                meta["score_fail"] += 1
-                continue
-
-            latest = df.iloc[-1]
-            if not (latest["MA20"] > latest["MA50"] and latest["Close"] > latest["MA20"]):
-                meta["trend_fail"] += 1
-                continue
-
-            f = get_fundamental(t)
-            pe = _safe_float(f.get("pe"))
-            if pe is None:
-                meta["no_pe"] += 1
-                continue
-
-            if pe > pe_max:
-                meta["no_pe"] += 1
-                continue
-
-            out.append(
-                UndervaluedRank(
-                    ticker=t,
-                    pe=float(pe),
-                    tech_score=int(tech_score),
-                    last_close=float(latest["Close"]),
-                )
-            )
-            meta["ok"] += 1
-
-        except Exception:
-            meta["errors"] += 1
-            continue
-
-    meta["duration_s"] = round(time.time() - t0, 2)
-
-    out.sort(key=lambda r: (r.pe, -r.tech_score))
-    return out[:top_n], meta
+    return run_scan(
+        "undervalued", period=period, top_n=top_n, max_universe=max_universe, pe_max=pe_max, min_score=min_score
+    )
 
 
 # =========================
@@ -387,151 +1330,70 @@ def scan_top10_breakout(
     min_score: int = 2,             # sebelumnya 3 (ketat)
     max_universe: int | None = None,
 ) -> tuple[list[BreakoutRank], dict]:
-    max_universe = _get_max_universe(max_universe)
-
-    tickers = get_all_idx_tickers()
-    total = len(tickers)
-    if max_universe is not None:
-        tickers = tickers[:max_universe]
-
-    meta = {
-        "universe_total": total,
-        "universe_scanned": len(tickers),
-        "ok": 0,
-        "no_price": 0,
-        "score_fail": 0,
-        "near_res_fail": 0,
-        "errors": 0,
-        "duration_s": None,
-    }
-
-    t0 = time.time()
-    out: list[BreakoutRank] = []
-
-    for t in tickers:
-        try:
-            df, _ = get_stock_data(t, period=period)
-            if df is None or df.empty or len(df) < 60:
-                meta["no_price"] += 1
-                continue
-
-            df = add_indicators(df)
-            _, resistance = support_resistance(df)
-
-            latest = df.iloc[-1]
-            tech_score, probability = calculate_score(df, resistance)
-            if int(tech_score) < min_score:
-                meta["score_fail"] += 1
-                continue
-
-            # dekat resistance
-            if not (latest["Close"] >= resistance * near_resistance):
-                meta["near_res_fail"] += 1
-                continue
-
-            out.append(
-                BreakoutRank(
-                    ticker=t,
-                    probability=float(probability),
-                    tech_score=int(tech_score),
-                    last_close=float(latest["Close"]),
-                    resistance=float(resistance),
-                )
-            )
-            meta["ok"] += 1
-
-        except Exception:
-            meta["errors"] += 1
-            continue
-
-    meta["duration_s"] = round(time.time() - t0, 2)
-
-    out.sort(key=lambda r: (-r.probability, -r.tech_score))
-    return out[:top_n], meta
+    return run_scan(
+        "breakout",
+        period=period,
+        top_n=top_n,
+        max_universe=max_universe,
+        near_resistance=near_resistance,
+        min_score=min_score,
+    )
 
 
 # =========================
 # Formatters
 # =========================
-def format_fundamental_message(top: list[FundamentalRank], meta: dict) -> str:
-    title = "🏷️ Top 10 Fundamental Termurah (PE terkecil)"
+def _format_top(name: str, top: list, meta: dict, hint: str) -> str:
+    spec = SCANS[name]
     if not top:
-        return _format_empty(title, meta, "Coba naikkan MAX_UNIVERSE atau scan ulang beberapa menit lagi.")
+        return _format_empty(spec.title, meta, hint)
 
-    lines = [title, ""]
+    lines = [spec.title, ""]
     for i, r in enumerate(top, 1):
-        roe_txt = f"{(r.roe * 100):.1f}%" if r.roe is not None else "-"
-        lines.append(f"{i}. {r.ticker} | PE: {r.pe:.2f} | ROE: {roe_txt} | Close: {r.last_close:.0f}")
+        lines.append(f"{i}. {spec.line(r)}")
 
     lines.append("")
     lines.append(_split_meta_line(meta))
     return "\n".join(lines)
 
 
-def format_technical_message(top: list[TechnicalRank], meta: dict) -> str:
-    title = "📊 Top 10 Technical (Score 4/4)"
-    if not top:
-        return _format_empty(
-            title, meta,
-            "Tidak ada yang score 4/4 saat ini. Coba /technical dengan MAX_UNIVERSE lebih besar."
-        )
+def format_fundamental_message(top: list[FundamentalRank], meta: dict) -> str:
+    return _format_top(
+        "fundamental", top, meta,
+        "Coba naikkan MAX_UNIVERSE atau scan ulang beberapa menit lagi."
+    )
 
-    lines = [title, ""]
-    for i, r in enumerate(top, 1):
-        lines.append(f"{i}. {r.ticker} | Score: {r.score}/4 | Prob: {r.probability:.0f}% | Close: {r.last_close:.0f}")
 
-    lines.append("")
-    lines.append(_split_meta_line(meta))
-    return "\n".join(lines)
+def format_technical_message(top: list[TechnicalRank], meta: dict) -> str:
+    return _format_top(
+        "technical", top, meta,
+        "Tidak ada yang score 4/4 saat ini. Coba /technical dengan MAX_UNIVERSE lebih besar."
+    )
 
 
 def format_combo_message(top: list[ComboRank], meta: dict) -> str:
-    title = "🏆 Top 10 Combo (Fundamental + Technical)"
-    if not top:
-        return _format_empty(title, meta, "Tidak ada data cukup. Coba naikkan MAX_UNIVERSE.")
-
-    lines = [title, ""]
-    for i, r in enumerate(top, 1):
-        lines.append(
-            f"{i}. {r.ticker} | Total: {r.total_score} | F:{r.f_score}/4 | T:{r.tech_score}/4 | PE: {r.pe:.2f}"
-        )
-
-    lines.append("")
-    lines.append(_split_meta_line(meta))
-    return "\n".join(lines)
+    return _format_top("combo", top, meta, "Tidak ada data cukup. Coba naikkan MAX_UNIVERSE.")
 
 
 def format_undervalued_message(top: list[UndervaluedRank], meta: dict) -> str:
-    title = "💎 Undervalued but Strong Trend"
-    if not top:
-        return _format_empty(
-            title, meta,
-            "Filter mungkin terlalu ketat / banyak PE kosong. Coba longgarkan: pe_max=25 atau min_score=1."
-        )
-
-    lines = [title, ""]
-    for i, r in enumerate(top, 1):
-        lines.append(f"{i}. {r.ticker} | PE: {r.pe:.2f} | Score: {r.tech_score}/4 | Close: {r.last_close:.0f}")
-
-    lines.append("")
-    lines.append(_split_meta_line(meta))
-    return "\n".join(lines)
+    return _format_top(
+        "undervalued", top, meta,
+        "Filter mungkin terlalu ketat / banyak PE kosong. Coba longgarkan: pe_max=25 atau min_score=1."
+    )
 
 
 def format_breakout_message(top: list[BreakoutRank], meta: dict) -> str:
-    title = "🚀 Breakout Candidates"
-    if not top:
-        return _format_empty(
-            title, meta,
-            "Filter mungkin terlalu ketat. Coba near_resistance=0.93 atau min_score=1."
-        )
+    return _format_top(
+        "breakout", top, meta,
+        "Filter mungkin terlalu ketat. Coba near_resistance=0.93 atau min_score=1."
+    )
 
-    lines = [title, ""]
-    for i, r in enumerate(top, 1):
-        lines.append(
-            f"{i}. {r.ticker} | Prob: {r.probability:.0f}% | Score: {r.tech_score}/4 | Close: {r.last_close:.0f} | Res: {r.resistance:.0f}"
-        )
 
-    lines.append("")
-    lines.append(_split_meta_line(meta))
-    return "\n".join(lines)
\ No newline at end of file
+# nama scan -> formatter pesan akhir (dipakai bot untuk stream_scan)
+FORMATTERS = {
+    "fundamental": format_fundamental_message,
+    "technical": format_technical_message,
+    "combo": format_combo_message,
+    "undervalued": format_undervalued_message,
+    "breakout": format_breakout_message,
+}
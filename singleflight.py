@@ -0,0 +1,140 @@
+# singleflight.py
+"""
+Request coalescing: pemanggil pertama untuk sebuah key mengerjakan
+pekerjaannya, pemanggil lain yang datang selama pekerjaan itu masih
+berjalan ikut menunggu hasil yang sama (tidak menjalankan ulang).
+
+- SingleFlight.do(key, fn, ...)      -> satu hasil
+- SingleFlight.stream(key, factory)  -> generator; follower ikut menerima
+                                        semua item yang di-yield leader
+"""
+from __future__ import annotations
+
+import threading
+
+
+class _Flight:
+    __slots__ = ("items", "done", "error", "cond", "followers")
+
+    def __init__(self):
+        self.items: list = []
+        self.done = False
+        self.error: BaseException | None = None
+        self.cond = threading.Condition()
+        self.followers = 0
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._flights: dict = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.leaders = 0
+        self.deduped = 0
+
+    def _join(self, key) -> tuple[_Flight, bool]:
+        with self._lock:
+            self.calls += 1
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.deduped += 1
+                flight.followers += 1
+                return flight, False
+            flight = self._flights[key] = _Flight()
+            self.leaders += 1
+            return flight, True
+
+    def _finish(self, key, flight: _Flight, error: BaseException | None = None) -> None:
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        with flight.cond:
+            flight.error = error
+            flight.done = True
+            flight.cond.notify_all()
+
+    def stream(self, key, factory):
+        """
+        Generator. Leader menjalankan factory() dan meneruskan tiap item;
+        follower menerima item yang sama (dari awal) sampai leader selesai.
+        Error di leader diteruskan ke semua follower.
+        """
+        flight, leader = self._join(key)
+        if leader:
+            yield from self._lead(key, flight, factory)
+        else:
+            yield from self._follow(flight)
+
+    def _lead(self, key, flight: _Flight, factory):
+        error = None
+        try:
+            for item in factory():
+                with flight.cond:
+                    flight.items.append(item)
+                    flight.cond.notify_all()
+                yield item
+        except GeneratorExit:
+            # konsumen leader berhenti di tengah jalan; follower tidak boleh menunggu selamanya
+            error = RuntimeError(f"{self.name}: pekerjaan dibatalkan oleh pemanggil pertama")
+            raise
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self._finish(key, flight, error)
+
+    def _follow(self, flight: _Flight):
+        i = 0
+        while True:
+            with flight.cond:
+                while i >= len(flight.items) and not flight.done:
+                    flight.cond.wait()
+                pending = flight.items[i:]
+                done, error = flight.done, flight.error
+            for item in pending:
+                yield item
+            i += len(pending)
+            if done and i >= len(flight.items):
+                if error is not None:
+                    raise error
+                return
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Jalankan fn(*args, **kwargs) sekali untuk semua pemanggil key yang sama
+        yang datang bersamaan.
+        """
+        result = None
+        for result in self.stream(key, lambda: iter((fn(*args, **kwargs),))):
+            pass
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "leaders": self.leaders,
+                "deduped": self.deduped,
+                "in_flight": len(self._flights),
+            }
+
+
+_GROUPS: dict[str, SingleFlight] = {}
+_GROUPS_LOCK = threading.Lock()
+
+
+def group(name: str) -> SingleFlight:
+    with _GROUPS_LOCK:
+        if name not in _GROUPS:
+            _GROUPS[name] = SingleFlight(name)
+        return _GROUPS[name]
+
+
+def flight_stats() -> dict[str, dict]:
+    """
+    Counter per grup (untuk meta scanner / log bot).
+    """
+    with _GROUPS_LOCK:
+        groups = list(_GROUPS.values())
+    return {g.name: g.stats() for g in groups}
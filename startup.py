@@ -0,0 +1,111 @@
+# startup.py
+"""
+Startup bot: warm-up di background + benchmark waktu import.
+
+- start_warm_up(): thread daemon yang memuat universe, modul berat
+  (pandas, yfinance, scanner, main) dan harga ticker populer, supaya
+  request pertama tidak membayar cold start. Bot tidak menunggu thread ini.
+- python startup.py: ukur waktu import tiap modul di proses Python baru.
+"""
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+
+# ticker yang paling sering dianalisa (env HOT_TICKERS, pisah koma)
+DEFAULT_HOT_TICKERS = "BBCA,BBRI,BMRI,BBNI,TLKM,ASII,ADRO,GOTO"
+
+_WARM = {"started": False, "done": False, "steps": {}}
+_WARM_LOCK = threading.Lock()
+
+
+def hot_tickers() -> list[str]:
+    raw = os.getenv("HOT_TICKERS", DEFAULT_HOT_TICKERS)
+    return [t.strip().upper() for t in raw.split(",") if t.strip()]
+
+
+def _step(name: str, fn) -> None:
+    t0 = time.perf_counter()
+    try:
+        fn()
+        _WARM["steps"][name] = round(time.perf_counter() - t0, 2)
+    except Exception:
+        logging.exception(f"Warm-up {name} gagal")
+        _WARM["steps"][name] = None
+
+
+def warm_up(tickers: list[str] | None = None) -> dict:
+    """
+    Muat universe, modul berat, dan harga ticker populer. Return durasi per langkah.
+    """
+    tickers = hot_tickers() if tickers is None else tickers
+
+    def universe():
+        from data import get_all_idx_tickers
+        get_all_idx_tickers()
+
+    def modules():
+        import main  # noqa: F401  (strategy, grafik, data)
+        import scanner  # noqa: F401
+
+    def prices():
+        from data import get_stock_data_bulk
+        get_stock_data_bulk(tickers)
+
+    _step("universe", universe)
+    _step("modules", modules)
+    if tickers:
+        _step("hot_prices", prices)
+
+    _WARM["done"] = True
+    logging.info("Warm-up selesai: %s", _WARM["steps"])
+    return dict(_WARM["steps"])
+
+
+def start_warm_up(tickers: list[str] | None = None) -> threading.Thread | None:
+    """
+    Jalankan warm_up di thread daemon (sekali per proses). WARM_UP=0 untuk mematikan.
+    """
+    if os.getenv("WARM_UP", "1") == "0":
+        return None
+    with _WARM_LOCK:
+        if _WARM["started"]:
+            return None
+        _WARM["started"] = True
+    th = threading.Thread(target=warm_up, args=(tickers,), name="warm-up", daemon=True)
+    th.start()
+    return th
+
+
+def warm_status() -> dict:
+    return {"done": _WARM["done"], "steps": dict(_WARM["steps"])}
+
+
+# =========================
+# IMPORT BENCHMARK
+# =========================
+BENCH_MODULES = ("telegram_bot", "main", "scanner", "data", "grafik", "strategy", "pandas", "yfinance", "matplotlib.pyplot")
+
+
+def import_time(module: str, repeat: int = 3) -> float | None:
+    """
+    Waktu import modul (detik, median dari beberapa proses baru), None kalau gagal.
+    """
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    here = os.path.dirname(os.path.abspath(__file__))
+    samples = []
+    for _ in range(repeat):
+        r = subprocess.run([sys.executable, "-c", code], cwd=here, capture_output=True, text=True)
+        if r.returncode != 0:
+            return None
+        samples.append(float(r.stdout.strip().splitlines()[-1]))
+    return sorted(samples)[len(samples) // 2]
+
+
+if __name__ == "__main__":
+    # python startup.py [modul ...]
+    for mod in sys.argv[1:] or BENCH_MODULES:
+        t = import_time(mod)
+        print(f"{mod:20s} {'gagal' if t is None else f'{t * 1000:8.1f} ms'}")
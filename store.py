@@ -0,0 +1,601 @@
+# store.py
+from __future__ import annotations
+
+import json
+import math
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+
+# =========================
+# CACHE DIRECTORY
+# =========================
+def cache_dir() -> str:
+    """
+    Folder cache lokal (default ./.cache, bisa diganti via env CACHE_DIR).
+    """
+    path = os.getenv("CACHE_DIR", ".cache")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def load_json(name: str) -> object | None:
+    """
+    Baca snapshot JSON dari folder cache; None kalau belum ada / rusak.
+    """
+    path = os.path.join(cache_dir(), name)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_json(name: str, obj: object) -> None:
+    """
+    Tulis snapshot JSON secara atomik (tmp file + os.replace).
+    """
+    path = os.path.join(cache_dir(), name)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f)
+    os.replace(tmp, path)
+
+
+# =========================
+# PERIOD HELPERS
+# =========================
+_PERIOD_OFFSETS = {
+    "d": lambda n: pd.DateOffset(days=n),
+    "wk": lambda n: pd.DateOffset(weeks=n),
+    "mo": lambda n: pd.DateOffset(months=n),
+    "y": lambda n: pd.DateOffset(years=n),
+}
+
+
+def period_start(period: str, now: pd.Timestamp | None = None) -> pd.Timestamp | None:
+    """
+    Tanggal awal untuk period gaya yfinance ("6mo", "1y", "5d", "ytd").
+    Return None untuk "max" (artinya seluruh histori).
+    """
+    now = (now or pd.Timestamp.now()).normalize()
+    p = period.strip().lower()
+
+    if p == "max":
+        return None
+    if p == "ytd":
+        return pd.Timestamp(year=now.year, month=1, day=1)
+
+    for suffix in ("wk", "mo", "d", "y"):
+        if p.endswith(suffix) and p[: -len(suffix)].isdigit():
+            return now - _PERIOD_OFFSETS[suffix](int(p[: -len(suffix)]))
+
+    raise ValueError(f"Period tidak dikenali: {period}")
+
+
+# =========================
+# KALENDER BURSA (IDX, WIB)
+# Libur bursa tidak dihitung; hari libur dianggap hari bursa biasa.
+# =========================
+IDX_TZ = "Asia/Jakarta"
+_IDX_OPEN = pd.Timedelta(hours=9)
+_IDX_CLOSE = pd.Timedelta(hours=16, minutes=15)  # setelah post-closing
+
+
+def idx_now() -> pd.Timestamp:
+    return pd.Timestamp.now(tz=IDX_TZ).tz_localize(None)
+
+
+def last_trading_date(now: pd.Timestamp | None = None) -> pd.Timestamp:
+    """
+    Tanggal sesi bursa terakhir yang sudah tutup (waktu WIB).
+    """
+    now = now or idx_now()
+    day = now.normalize()
+    if day.weekday() < 5 and now >= day + _IDX_CLOSE:
+        return day
+    day -= pd.Timedelta(days=1)
+    while day.weekday() >= 5:
+        day -= pd.Timedelta(days=1)
+    return day
+
+
+def session_open(now: pd.Timestamp | None = None) -> bool:
+    """
+    True selama jam bursa (bar harian hari ini masih berjalan).
+    """
+    now = now or idx_now()
+    day = now.normalize()
+    return day.weekday() < 5 and day + _IDX_OPEN <= now < day + _IDX_CLOSE
+
+
+def covers_last_session(written_at: float, now: pd.Timestamp | None = None) -> bool:
+    """
+    True kalau data yang ditulis pada written_at (epoch detik) sudah berisi
+    bar final sesi terakhir dan belum ada sesi baru yang berjalan.
+    """
+    now = now or idx_now()
+    if session_open(now):
+        return False
+    written = pd.Timestamp(written_at, unit="s", tz="UTC").tz_convert(IDX_TZ).tz_localize(None)
+    return written >= last_trading_date(now) + _IDX_CLOSE
+
+
+# =========================
+# PRICE STORE (NumPy file per ticker)
+# =========================
+OHLCV_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+# covered_from untuk period="max" (histori penuh)
+_FULL_HISTORY = np.iinfo("int64").min
+
+
+def normalize_ohlcv(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Rapikan frame yfinance jadi OHLCV dengan index tanggal tanpa timezone.
+    """
+    out = df[OHLCV_COLUMNS].astype("float64")
+    idx = pd.DatetimeIndex(out.index)
+    if idx.tz is not None:
+        idx = idx.tz_localize(None)
+    out.index = idx.normalize()
+    out = out[~out.index.duplicated(keep="last")].sort_index()
+    return out.dropna(subset=["Close"])
+
+
+# =========================
+# OHLCV RINGKAS (1 ticker)
+# =========================
+_EPOCH_DAY = np.datetime64("1970-01-01", "D")
+
+
+class OHLCV:
+    """
+    OHLCV 1 ticker dalam array kontigu: ohlc float32 (4 x bar),
+    volume int64, tanggal int32 (hari sejak 1970-01-01).
+    Kira-kira 3-5x lebih kecil dari DataFrame float64 dengan index tanggal.
+
+    df["Close"] dsb. -> array float64; len(df); df.index -> DatetimeIndex.
+    DataFrame (float64) baru dibuat lewat frame() saat pandas benar-benar
+    dibutuhkan, lalu disimpan (indikator dari require ikut tersimpan di sana).
+    float32 tepat untuk harga IDX (kelipatan tick); harga adjusted bisa
+    bergeser di digit ke-7.
+    """
+    __slots__ = ("dates", "ohlc", "volume", "_frame")
+
+    _ROWS = {"Open": 0, "High": 1, "Low": 2, "Close": 3}
+
+    def __init__(self, dates: np.ndarray, ohlc: np.ndarray, volume: np.ndarray):
+        self.dates = np.ascontiguousarray(dates, dtype="int32")
+        self.ohlc = np.ascontiguousarray(ohlc, dtype="float32")
+        self.volume = np.ascontiguousarray(volume, dtype="int64")
+        self._frame = None
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "OHLCV":
+        days = df.index.values.astype("datetime64[D]") - _EPOCH_DAY
+        ohlc = np.stack([df[c].to_numpy(dtype="float32") for c in ("Open", "High", "Low", "Close")])
+        volume = np.nan_to_num(df["Volume"].to_numpy(dtype="float64")).astype("int64")
+        return cls(days.astype("int32"), ohlc, volume)
+
+    @property
+    def close(self) -> np.ndarray:
+        return self.ohlc[3]
+
+    @property
+    def index(self) -> pd.DatetimeIndex:
+        return pd.DatetimeIndex((_EPOCH_DAY + self.dates.astype("int64")).astype("datetime64[ns]"))
+
+    @property
+    def empty(self) -> bool:
+        return len(self.dates) == 0
+
+    @property
+    def nbytes(self) -> int:
+        return self.dates.nbytes + self.ohlc.nbytes + self.volume.nbytes
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        if column == "Volume":
+            return self.volume.astype("float64")
+        if column in self._ROWS:
+            return self.ohlc[self._ROWS[column]].astype("float64")
+        if self._frame is not None and column in self._frame.columns:
+            return self._frame[column].to_numpy()
+        raise KeyError(column)
+
+    def frame(self) -> pd.DataFrame:
+        if self._frame is None:
+            cols = {c: self.ohlc[i].astype("float64") for c, i in self._ROWS.items()}
+            cols["Volume"] = self.volume.astype("float64")
+            self._frame = pd.DataFrame(cols, index=self.index, copy=False)
+        return self._frame
+
+    def __getstate__(self):
+        # frame tidak ikut di-pickle (mis. ke worker process)
+        return self.dates, self.ohlc, self.volume
+
+    def __setstate__(self, state):
+        self.dates, self.ohlc, self.volume = state
+        self._frame = None
+
+
+def as_frame(df) -> pd.DataFrame:
+    """
+    DataFrame dari OHLCV ringkas (lazy) atau DataFrame apa adanya.
+    """
+    return df.frame() if isinstance(df, OHLCV) else df
+
+
+# selisih relatif Close bar overlap yang dianggap adjustment (split / dividen), bukan noise
+ADJUST_REL_TOL = 1e-4
+
+
+class PriceStore:
+    """
+    Simpan OHLCV harian per ticker sebagai file .npz kolumnar:
+    dates (int64 ns), ohlcv (float64 n x 5), fetched_at, covered_from.
+    """
+
+    def __init__(self, root: str | None = None):
+        self.root = root or os.path.join(cache_dir(), "prices")
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, ticker: str) -> str:
+        return os.path.join(self.root, f"{ticker.upper()}.npz")
+
+    def load(self, ticker: str) -> tuple[pd.DataFrame, dict] | None:
+        path = self._path(ticker)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as z:
+                dates = z["dates"]
+                ohlcv = z["ohlcv"]
+                info = {
+                    "fetched_at": float(z["fetched_at"]),
+                    "covered_from": int(z["covered_from"]),
+                }
+        except Exception:
+            return None
+
+        df = pd.DataFrame(ohlcv, index=pd.DatetimeIndex(dates.astype("datetime64[ns]")), columns=OHLCV_COLUMNS)
+        return df, info
+
+    def save(self, ticker: str, df: pd.DataFrame, covered_from: pd.Timestamp | None) -> None:
+        path = self._path(ticker)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp.npz"
+        np.savez(
+            tmp,
+            dates=df.index.values.astype("datetime64[ns]").astype("int64"),
+            ohlcv=df[OHLCV_COLUMNS].to_numpy(dtype="float64"),
+            fetched_at=np.float64(time.time()),
+            covered_from=np.int64(covered_from.value if covered_from is not None else _FULL_HISTORY),
+        )
+        os.replace(tmp, path)
+
+    @staticmethod
+    def overlap_start(old: pd.DataFrame) -> pd.Timestamp:
+        """
+        Tanggal awal fetch bar baru: 1 bar tersimpan sebelum bar terakhir
+        (bar terakhir bisa masih berjalan), dipakai readjusted() sebagai pembanding.
+        """
+        return old.index[-2] if len(old) > 1 else old.index[-1]
+
+    @staticmethod
+    def readjusted(old: pd.DataFrame, new_bars: pd.DataFrame | None, rel_tol: float = ADJUST_REL_TOL) -> bool:
+        """
+        True kalau Close bar overlap (lihat overlap_start) berbeda dari yang tersimpan:
+        Yahoo sudah meng-adjust ulang histori (split / dividen), jadi bar baru
+        tidak boleh di-append ke histori lama -> download ulang penuh.
+        """
+        if new_bars is None or new_bars.empty or len(old) < 2:
+            return False
+        new_bars = normalize_ohlcv(new_bars)
+        day = old.index[-2]
+        if day not in new_bars.index:
+            return False
+        return not math.isclose(float(old["Close"].iloc[-2]), float(new_bars.at[day, "Close"]), rel_tol=rel_tol)
+
+    def append(self, ticker: str, new_bars: pd.DataFrame) -> pd.DataFrame | None:
+        """
+        Gabungkan bar baru ke data tersimpan (bar tanggal sama ditimpa,
+        karena bar terakhir bisa masih berjalan saat sesi buka).
+        """
+        loaded = self.load(ticker)
+        if loaded is None:
+            return None
+        old, info = loaded
+
+        if new_bars is None or new_bars.empty:
+            merged = old
+        else:
+            new_bars = normalize_ohlcv(new_bars)
+            merged = pd.concat([old[~old.index.isin(new_bars.index)], new_bars]).sort_index()
+
+        covered_from = pd.Timestamp(info["covered_from"]) if info["covered_from"] != _FULL_HISTORY else None
+        self.save(ticker, merged, covered_from)
+        return merged
+
+    @staticmethod
+    def covers(info: dict, start: pd.Timestamp | None) -> bool:
+        lo = info["covered_from"]
+        if lo == _FULL_HISTORY:
+            return True
+        if start is None:
+            return False
+        return lo <= start.value
+
+    @staticmethod
+    def is_fresh(info: dict, max_age_s: float) -> bool:
+        return (time.time() - info["fetched_at"]) < max_age_s
+
+
+# =========================
+# PRICE PANEL (ticker x tanggal, sejajar per tanggal)
+# =========================
+@dataclass
+class PricePanel:
+    """
+    OHLCV banyak ticker sebagai array 2-D (ticker x tanggal) di atas
+    kalender gabungan. Tanggal tanpa bar (belum listing / suspensi) = NaN.
+    """
+    tickers: list[str]
+    dates: np.ndarray  # datetime64[ns]
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+    # ticker -> baris
+    index: dict[str, int] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.index = {t: i for i, t in enumerate(self.tickers)}
+
+    @classmethod
+    def from_frames(cls, frames: dict[str, pd.DataFrame]) -> "PricePanel":
+        tickers = list(frames)
+        dates = pd.DatetimeIndex([])
+        for df in frames.values():
+            dates = dates.union(df.index)
+        arrays = {c: np.full((len(tickers), len(dates)), np.nan) for c in OHLCV_COLUMNS}
+        for i, df in enumerate(frames.values()):
+            pos = dates.get_indexer(df.index)
+            for c in OHLCV_COLUMNS:
+                arrays[c][i, pos] = df[c].to_numpy(dtype="float64")
+        return cls(
+            tickers=tickers,
+            dates=dates.values.astype("datetime64[ns]"),
+            **{c.lower(): arrays[c] for c in OHLCV_COLUMNS},
+        )
+
+    def select(self, rows) -> "PricePanel":
+        """
+        Sub-panel untuk index/slice ticker tertentu.
+        """
+        idx = np.arange(len(self.tickers))[rows]
+        return PricePanel(
+            tickers=[self.tickers[i] for i in idx],
+            dates=self.dates,
+            **{c.lower(): getattr(self, c.lower())[idx] for c in OHLCV_COLUMNS},
+        )
+
+    def window(self, start: int, end: int) -> "PricePanel":
+        """
+        Sub-panel bar [start, end) (view, tanpa copy).
+        """
+        return PricePanel(
+            tickers=self.tickers,
+            dates=self.dates[start:end],
+            **{c.lower(): getattr(self, c.lower())[:, start:end] for c in OHLCV_COLUMNS},
+        )
+
+    def frame(self, ticker: str) -> pd.DataFrame | None:
+        """
+        DataFrame OHLCV 1 ticker (mulai bar pertamanya). Kolom berupa view
+        ke array panel (tanpa copy) kalau tidak ada tanggal kosong di tengah.
+        """
+        i = self.index.get(ticker.upper())
+        if i is None:
+            return None
+        valid = ~np.isnan(self.close[i])
+        if not valid.any():
+            return None
+        a = int(valid.argmax())
+        rows = slice(a, None) if valid[a:].all() else np.flatnonzero(valid)
+        cols = {c: getattr(self, c.lower())[i, rows] for c in OHLCV_COLUMNS}
+        return pd.DataFrame(cols, index=pd.DatetimeIndex(self.dates[rows]), copy=False)
+
+    def __len__(self) -> int:
+        return len(self.tickers)
+
+
+# =========================
+# PANEL FILE (memory-mapped, 1 penulis, banyak pembaca)
+# Layout folder cache/panel:
+#   CURRENT             -> nama versi aktif (diganti atomik)
+#   <versi>/ohlcv.npy   -> float64 (field x ticker x tanggal), urutan field = OHLCV_COLUMNS
+#   <versi>/dates.npy   -> int64 ns
+#   <versi>/index.json  -> {"tickers", "written_at", "covered_from"}
+# Pembaca membuka file dengan mmap read-only: semua proses berbagi
+# page cache yang sama. Versi lama dihapus updater; proses yang masih
+# memetakannya tetap aman (file baru benar-benar hilang saat di-unmap).
+# =========================
+class PanelFile:
+
+    def __init__(self, root: str | None = None):
+        self.root = root or os.path.join(cache_dir(), "panel")
+        os.makedirs(self.root, exist_ok=True)
+
+    def version(self) -> str | None:
+        try:
+            with open(os.path.join(self.root, "CURRENT"), "r", encoding="utf-8") as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+    def write(self, panel: PricePanel, covered_from: pd.Timestamp | None, keep: int = 2) -> str:
+        """
+        Tulis versi baru lalu aktifkan (dipanggil oleh 1 proses updater saja).
+        """
+        version = f"{time.time_ns()}"
+        tmp_dir = os.path.join(self.root, f".{version}.tmp")
+        os.makedirs(tmp_dir)
+        np.save(
+            os.path.join(tmp_dir, "ohlcv.npy"),
+            np.stack([getattr(panel, c.lower()) for c in OHLCV_COLUMNS]).astype("float64"),
+        )
+        np.save(os.path.join(tmp_dir, "dates.npy"), panel.dates.astype("datetime64[ns]").astype("int64"))
+        with open(os.path.join(tmp_dir, "index.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "tickers": list(panel.tickers),
+                "written_at": time.time(),
+                "covered_from": covered_from.value if covered_from is not None else _FULL_HISTORY,
+            }, f)
+        os.replace(tmp_dir, os.path.join(self.root, version))
+
+        pointer = os.path.join(self.root, f"CURRENT.{os.getpid()}.tmp")
+        with open(pointer, "w", encoding="utf-8") as f:
+            f.write(version)
+        os.replace(pointer, os.path.join(self.root, "CURRENT"))
+        self._cleanup(keep)
+        return version
+
+    def _cleanup(self, keep: int) -> None:
+        versions = sorted(d for d in os.listdir(self.root) if d.isdigit())
+        for d in versions[:-keep]:
+            shutil.rmtree(os.path.join(self.root, d), ignore_errors=True)
+
+    def open(self, version: str | None = None) -> tuple[PricePanel, dict] | None:
+        """
+        Buka versi aktif read-only (np.memmap, tanpa copy). None kalau belum ada.
+        """
+        version = version or self.version()
+        if version is None:
+            return None
+        path = os.path.join(self.root, version)
+        try:
+            ohlcv = np.load(os.path.join(path, "ohlcv.npy"), mmap_mode="r")
+            dates = np.load(os.path.join(path, "dates.npy"), mmap_mode="r")
+            with open(os.path.join(path, "index.json"), "r", encoding="utf-8") as f:
+                info = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        panel = PricePanel(
+            tickers=info["tickers"],
+            dates=dates.view("datetime64[ns]"),
+            **{c.lower(): ohlcv[i] for i, c in enumerate(OHLCV_COLUMNS)},
+        )
+        info["version"] = version
+        return panel, info
+
+
+# =========================
+# FUNDAMENTAL STORE (SQLite, TTL per field)
+# =========================
+# TTL default per field (detik). Field yang ikut harga berubah harian,
+# field laporan keuangan cukup dicek mingguan.
+FUNDAMENTAL_TTL = {
+    "trailingPE": 24 * 3600,
+    "forwardPE": 24 * 3600,
+    "priceToBook": 24 * 3600,
+    "marketCap": 24 * 3600,
+    "dividendYield": 24 * 3600,
+    "returnOnEquity": 7 * 24 * 3600,
+    "returnOnAssets": 7 * 24 * 3600,
+    "debtToEquity": 7 * 24 * 3600,
+}
+DEFAULT_FUNDAMENTAL_TTL = 3 * 24 * 3600
+
+
+def _json_scalar(v):
+    if v is None or isinstance(v, (bool, int, float, str)):
+        return v
+    if isinstance(v, np.generic):
+        return v.item()
+    return None
+
+
+class FundamentalStore:
+    """
+    Cache fundamental (semua field scalar dari yfinance .info) di SQLite.
+    Satu baris per (ticker, field) dengan timestamp sendiri, jadi TTL bisa beda per field.
+    """
+
+    def __init__(self, path: str | None = None):
+        self.path = path or os.path.join(cache_dir(), "fundamentals.sqlite")
+        with closing(self._connect()) as con, con:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute(
+                "CREATE TABLE IF NOT EXISTS fundamentals ("
+                " ticker TEXT NOT NULL,"
+                " field TEXT NOT NULL,"
+                " value TEXT,"
+                " fetched_at REAL NOT NULL,"
+                " PRIMARY KEY (ticker, field))"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        # koneksi per pemanggilan: aman dipakai dari banyak thread
+        return sqlite3.connect(self.path, timeout=30)
+
+    def put(self, ticker: str, info: dict, fetched_at: float | None = None) -> None:
+        ts = fetched_at or time.time()
+        rows = []
+        for field, value in info.items():
+            value = _json_scalar(value)
+            if value is None and field not in FUNDAMENTAL_TTL:
+                continue
+            rows.append((ticker.upper(), str(field), json.dumps(value), ts))
+
+        # field utama tetap dicatat walau kosong, supaya "tidak ada PE" juga ter-cache
+        for field in FUNDAMENTAL_TTL:
+            if field not in info:
+                rows.append((ticker.upper(), field, json.dumps(None), ts))
+
+        with closing(self._connect()) as con, con:
+            con.executemany(
+                "INSERT OR REPLACE INTO fundamentals (ticker, field, value, fetched_at) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+
+    def get_many(self, tickers: list[str]) -> dict[str, dict[str, tuple[object, float]]]:
+        """
+        Bulk read: {ticker: {field: (value, fetched_at)}} untuk ticker yang ada di cache.
+        """
+        out: dict[str, dict[str, tuple[object, float]]] = {}
+        symbols = [t.upper() for t in tickers]
+        with closing(self._connect()) as con, con:
+            for i in range(0, len(symbols), 500):
+                chunk = symbols[i:i + 500]
+                marks = ",".join("?" * len(chunk))
+                cur = con.execute(
+                    f"SELECT ticker, field, value, fetched_at FROM fundamentals WHERE ticker IN ({marks})",
+                    chunk,
+                )
+                for ticker, field, value, fetched_at in cur:
+                    out.setdefault(ticker, {})[field] = (json.loads(value), fetched_at)
+        return out
+
+    @staticmethod
+    def is_stale(record: dict[str, tuple[object, float]], fields: list[str], now: float | None = None) -> bool:
+        now = now or time.time()
+        for field in fields:
+            if field not in record:
+                return True
+            _, fetched_at = record[field]
+            if now - fetched_at >= FUNDAMENTAL_TTL.get(field, DEFAULT_FUNDAMENTAL_TTL):
+                return True
+        return False
@@ -1,4 +1,10 @@
 # strategy.py
+import warnings
+
+import numpy as np
+
+from indicators import require
+
 
 def valuation_status(pe):
     if pe is None:
@@ -11,8 +17,16 @@ def valuation_status(pe):
         return "Mahal"
 
 
+# kolom yang dibutuhkan tiap fungsi (dihitung lazy lewat indicators.require)
+SCORE_REQUIRES = ("Close", "MA20", "MA50", "MACD", "MACD_signal", "RSI")
+REGIME_REQUIRES = ("MA50", "MA200", "RSI")
+BREAKOUT_REQUIRES = ("Close", "Volume", "MA20", "MACD", "MACD_signal", "RSI")
+PANEL_REQUIRES = ("Close", "Volume", "MA20", "MA50", "MACD", "MACD_signal", "RSI")
+
+
 def calculate_score(df, resistance):
 
+    df = require(df, SCORE_REQUIRES)
     latest = df.iloc[-1]
     score = 0
 
@@ -35,8 +49,7 @@ def calculate_score(df, resistance):
 
 def market_regime(df):
 
-    df['MA200'] = df['Close'].rolling(200).mean()
-
+    df = require(df, REGIME_REQUIRES)
     latest = df.iloc[-1]
 
     if latest['MA50'] > latest['MA200'] and latest['RSI'] > 50:
@@ -49,6 +62,7 @@ def market_regime(df):
 
 def breakout_pullback_probability(df, resistance):
 
+    df = require(df, BREAKOUT_REQUIRES)
     latest = df.iloc[-1]
 
     breakout_score = 0
@@ -77,135 +91,239 @@ def breakout_pullback_probability(df, resistance):
     return breakout_prob, pullback_prob
 
 
-def analisa_panel(df, support, resistance, valuation):
+# =========================================
+# PANEL (VECTORIZED) VARIANTS
+# Input array 2-D (ticker x bar), bar terakhir di kolom -1.
+# Ticker dengan histori lebih pendek di-pad NaN di kiri.
+# Perbandingan dengan NaN = False, sama seperti versi per-DataFrame.
+# =========================================
+def _last(a):
+    return np.asarray(a, dtype="float64")[:, -1]
+
+
+def calculate_score_panel(ma20, ma50, macd, macd_signal, rsi, close, resistance, rsi_band=(40, 65), res_ratio=0.98):
+    """
+    Versi panel dari calculate_score. resistance: array 1-D per ticker.
+    rsi_band / res_ratio: ambang calculate_score (bisa diubah untuk tuning/backtest).
+    Return (score int array, probability float array).
+    """
+    rsi_lo, rsi_hi = rsi_band
+    with np.errstate(invalid="ignore"):
+        rsi_last = _last(rsi)
+        score = (
+            (_last(ma20) > _last(ma50)).astype("int64")
+            + (_last(macd) > _last(macd_signal))
+            + ((rsi_last > rsi_lo) & (rsi_last < rsi_hi))
+            + (_last(close) > np.asarray(resistance, dtype="float64") * res_ratio)
+        )
+
+    probability = (score / 4) * 100
+    return score, probability
 
+
+def market_regime_panel(close, ma50, rsi):
+    """
+    Versi panel dari market_regime (MA200 dihitung dari 200 bar terakhir close).
+    Return array string "Bull Market" / "Bear Market" / "Sideways Market".
+    """
+    close = np.asarray(close, dtype="float64")
+    if close.shape[1] >= 200:
+        tail = close[:, -200:]
+        ma200 = np.where(np.isnan(tail).any(axis=1), np.nan, tail.mean(axis=1))
+    else:
+        ma200 = np.full(close.shape[0], np.nan)
+
+    ma50_last = _last(ma50)
+    rsi_last = _last(rsi)
+
+    with np.errstate(invalid="ignore"):
+        bull = (ma50_last > ma200) & (rsi_last > 50)
+        bear = (ma50_last < ma200) & (rsi_last < 50)
+
+    return np.where(bull, "Bull Market", np.where(bear, "Bear Market", "Sideways Market"))
+
+
+def breakout_pullback_probability_panel(close, volume, ma20, macd, macd_signal, rsi, resistance):
+    """
+    Versi panel dari breakout_pullback_probability.
+    Return (breakout_prob, pullback_prob) float array per ticker.
+    """
+    close_last = _last(close)
+    rsi_last = _last(rsi)
+    ma20_last = _last(ma20)
+    volume = np.asarray(volume, dtype="float64")
+
+    with np.errstate(invalid="ignore", divide="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        avg_vol = np.nanmean(volume[:, -20:], axis=1)
+
+        breakout_score = (
+            (close_last > np.asarray(resistance, dtype="float64") * 0.98).astype("int64")
+            + (volume[:, -1] > avg_vol)
+            + (rsi_last > 55)
+        )
+
+        distance = np.abs(close_last - ma20_last) / ma20_last
+        pullback_score = (
+            (distance < 0.02).astype("int64")
+            + ((rsi_last > 40) & (rsi_last < 55))
+            + (_last(macd) > _last(macd_signal))
+        )
+
+    breakout_prob = np.round((breakout_score / 3) * 100, 2)
+    pullback_prob = np.round((pullback_score / 3) * 100, 2)
+    return breakout_prob, pullback_prob
+
+
+# judul & label kesimpulan tiap panel (urutan = urutan tampil)
+PANEL_TITLES = {
+    "harga": ("Panel 1 - Struktur Harga & Tren", "Kesimpulan Panel Harga"),
+    "volume": ("Panel 2 - Volume", "Kesimpulan Panel Volume"),
+    "macd": ("Panel 3 - MACD (Momentum)", "Kesimpulan Panel MACD"),
+    "rsi": ("Panel 4 - RSI (Kekuatan Relatif)", "Kesimpulan Panel RSI"),
+    "fundamental": ("Panel Fundamental", None),
+}
+
+
+def panel_conclusions(df, support, resistance, valuation):
+    """
+    Kesimpulan per panel grafik dalam bentuk data:
+    {panel: {"catatan": [...], "kesimpulan": str}, ..., "gabungan": str}.
+    Teksnya dibuat oleh render_panel.
+    """
+    df = require(df, PANEL_REQUIRES)
     latest = df.iloc[-1]
-    hasil = "\n================= ANALISA PER PANEL =================\n\n"
 
     # =========================================
     # PANEL 1 - HARGA & TREND
     # =========================================
-    hasil += "Panel 1 - Struktur Harga & Tren:\n"
-
+    harga = []
     distance_to_res = (resistance - latest['Close']) / latest['Close'] * 100
     distance_to_sup = (latest['Close'] - support) / latest['Close'] * 100
 
     if latest['Close'] > latest['MA20'] and latest['MA20'] > latest['MA50']:
-        hasil += "- Harga berada di atas MA20 dan MA50 → Struktur tren naik sehat.\n"
-        hasil += "- Buyer masih mengendalikan pergerakan harga.\n"
+        harga.append("Harga berada di atas MA20 dan MA50 → Struktur tren naik sehat.")
+        harga.append("Buyer masih mengendalikan pergerakan harga.")
         kesimpulan_harga = "Bullish"
 
     elif latest['Close'] < latest['MA20']:
-        hasil += "- Harga berada di bawah MA20 → Momentum jangka pendek melemah.\n"
-        hasil += "- Potensi koreksi atau pullback lebih besar.\n"
+        harga.append("Harga berada di bawah MA20 → Momentum jangka pendek melemah.")
+        harga.append("Potensi koreksi atau pullback lebih besar.")
         kesimpulan_harga = "Bearish"
 
     else:
-        hasil += "- Harga berada di area konsolidasi antara MA20 dan MA50.\n"
+        harga.append("Harga berada di area konsolidasi antara MA20 dan MA50.")
         kesimpulan_harga = "Sideways"
 
-    hasil += f"- Jarak ke resistance: {round(distance_to_res,2)} %\n"
-    hasil += f"- Jarak ke support: {round(distance_to_sup,2)} %\n"
-
-    hasil += f"Kesimpulan Panel Harga: {kesimpulan_harga}\n\n"
+    harga.append(f"Jarak ke resistance: {round(distance_to_res,2)} %")
+    harga.append(f"Jarak ke support: {round(distance_to_sup,2)} %")
 
     # =========================================
     # PANEL 2 - VOLUME
     # =========================================
-    hasil += "Panel 2 - Volume:\n"
-
     avg_vol = df['Volume'][-20:].mean()
 
     if latest['Volume'] > avg_vol and latest['Close'] > df['Close'].iloc[-2]:
-        hasil += "- Volume tinggi disertai kenaikan harga → Akumulasi kuat.\n"
+        volume = ["Volume tinggi disertai kenaikan harga → Akumulasi kuat."]
         kesimpulan_vol = "Bullish Confirmation"
 
     elif latest['Volume'] > avg_vol and latest['Close'] < df['Close'].iloc[-2]:
-        hasil += "- Volume tinggi saat harga turun → Potensi distribusi.\n"
+        volume = ["Volume tinggi saat harga turun → Potensi distribusi."]
         kesimpulan_vol = "Bearish Pressure"
 
     else:
-        hasil += "- Volume normal → Tidak ada tekanan signifikan.\n"
+        volume = ["Volume normal → Tidak ada tekanan signifikan."]
         kesimpulan_vol = "Netral"
 
-    hasil += f"Kesimpulan Panel Volume: {kesimpulan_vol}\n\n"
-
     # =========================================
     # PANEL 3 - MACD
     # =========================================
-    hasil += "Panel 3 - MACD (Momentum):\n"
-
     if latest['MACD'] > latest['MACD_signal'] and latest['MACD'] > 0:
-        hasil += "- MACD di atas signal dan di atas nol → Momentum bullish kuat.\n"
+        macd = ["MACD di atas signal dan di atas nol → Momentum bullish kuat."]
         kesimpulan_macd = "Bullish Strong"
 
     elif latest['MACD'] > latest['MACD_signal']:
-        hasil += "- MACD cross up namun masih di bawah nol → Awal pembalikan.\n"
+        macd = ["MACD cross up namun masih di bawah nol → Awal pembalikan."]
         kesimpulan_macd = "Bullish Weak"
 
     else:
-        hasil += "- MACD di bawah signal → Momentum melemah.\n"
+        macd = ["MACD di bawah signal → Momentum melemah."]
         kesimpulan_macd = "Bearish"
 
-    hasil += f"Kesimpulan Panel MACD: {kesimpulan_macd}\n\n"
-
     # =========================================
     # PANEL 4 - RSI
     # =========================================
-    hasil += "Panel 4 - RSI (Kekuatan Relatif):\n"
-
     if latest['RSI'] > 70:
-        hasil += "- RSI > 70 → Overbought, rawan koreksi jangka pendek.\n"
+        rsi = ["RSI > 70 → Overbought, rawan koreksi jangka pendek."]
         kesimpulan_rsi = "Overbought"
 
     elif latest['RSI'] < 30:
-        hasil += "- RSI < 30 → Oversold, potensi rebound.\n"
+        rsi = ["RSI < 30 → Oversold, potensi rebound."]
         kesimpulan_rsi = "Oversold"
 
     elif latest['RSI'] > 55:
-        hasil += "- RSI di atas 55 → Zona bullish sehat.\n"
+        rsi = ["RSI di atas 55 → Zona bullish sehat."]
         kesimpulan_rsi = "Bullish"
 
     else:
-        hasil += "- RSI netral → Tidak ada tekanan ekstrem.\n"
+        rsi = ["RSI netral → Tidak ada tekanan ekstrem."]
         kesimpulan_rsi = "Netral"
 
-    hasil += f"Kesimpulan Panel RSI: {kesimpulan_rsi}\n\n"
-
     # =========================================
     # FUNDAMENTAL CHECK
     # =========================================
-    hasil += "Panel Fundamental:\n"
-
     if valuation == "Mahal":
-        hasil += "- Valuasi mahal → Risiko koreksi lebih tinggi jika momentum berhenti.\n"
+        fund = ["Valuasi mahal → Risiko koreksi lebih tinggi jika momentum berhenti."]
         fund_status = "Risky"
 
     elif valuation == "Murah":
-        hasil += "- Valuasi murah → Potensi kenaikan jangka panjang lebih sehat.\n"
+        fund = ["Valuasi murah → Potensi kenaikan jangka panjang lebih sehat."]
         fund_status = "Supportive"
 
     else:
-        hasil += "- Valuasi wajar → Tidak menjadi penghambat utama.\n"
+        fund = ["Valuasi wajar → Tidak menjadi penghambat utama."]
         fund_status = "Neutral"
 
-    hasil += "\n"
-
     # =========================================
     # KESIMPULAN GABUNGAN
     # =========================================
-    hasil += "================= KESIMPULAN GABUNGAN =================\n"
-
     if kesimpulan_harga == "Bullish" and kesimpulan_macd.startswith("Bullish"):
         if fund_status == "Risky":
-            hasil += "Teknikal kuat namun valuasi mahal → Cocok untuk swing, hati-hati jangka panjang.\n"
+            gabungan = "Teknikal kuat namun valuasi mahal → Cocok untuk swing, hati-hati jangka panjang."
         else:
-            hasil += "Teknikal dan fundamental mendukung → Potensi kenaikan relatif sehat.\n"
+            gabungan = "Teknikal dan fundamental mendukung → Potensi kenaikan relatif sehat."
 
     elif kesimpulan_harga == "Bearish":
-        hasil += "Struktur harga melemah → Risiko penurunan lebih besar.\n"
+        gabungan = "Struktur harga melemah → Risiko penurunan lebih besar."
 
     else:
-        hasil += "Sinyal campuran → Sebaiknya tunggu konfirmasi tambahan.\n"
+        gabungan = "Sinyal campuran → Sebaiknya tunggu konfirmasi tambahan."
+
+    return {
+        "harga": {"catatan": harga, "kesimpulan": kesimpulan_harga},
+        "volume": {"catatan": volume, "kesimpulan": kesimpulan_vol},
+        "macd": {"catatan": macd, "kesimpulan": kesimpulan_macd},
+        "rsi": {"catatan": rsi, "kesimpulan": kesimpulan_rsi},
+        "fundamental": {"catatan": fund, "kesimpulan": fund_status},
+        "gabungan": gabungan,
+    }
+
+
+def render_panel(panels):
+    hasil = "\n================= ANALISA PER PANEL =================\n\n"
+    for key, (title, label) in PANEL_TITLES.items():
+        panel = panels[key]
+        hasil += f"{title}:\n"
+        for note in panel["catatan"]:
+            hasil += f"- {note}\n"
+        if label:
+            hasil += f"{label}: {panel['kesimpulan']}\n"
+        hasil += "\n"
 
+    hasil += "================= KESIMPULAN GABUNGAN =================\n"
+    hasil += panels["gabungan"] + "\n"
     return hasil
+
+
+def analisa_panel(df, support, resistance, valuation):
+    return render_panel(panel_conclusions(df, support, resistance, valuation))
@@ -0,0 +1,330 @@
+# streaming.py
+"""
+Indikator incremental O(1) per bar.
+
+IndicatorState menyimpan running state (ring buffer MA20/MA50/MA200,
+rata-rata Wilder untuk RSI, state EMA untuk MACD/signal, ATR, dan
+window High/Low 30 bar untuk support/resistance). Bar baru cukup
+di-update satu per satu; tidak perlu hitung ulang seluruh histori.
+Nilainya sama dengan kernels.py / `ta` atas histori sejak bar seed state.
+Seed diambil dari bar pertama di PriceStore (anchor tetap), bukan dari awal
+window scan (period="6mo" bergeser tiap hari), jadi EMA/RSI/ATR bisa beda
+sedikit dari hitung ulang penuh atas window saja (warm-up lebih panjang).
+
+State disimpan di samping PriceStore (<TICKER>.state.npz).
+"""
+from __future__ import annotations
+
+import math
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from store import PriceStore, as_frame
+
+
+_RING = 200          # cukup untuk MA200
+_SR_WINDOW = 30      # support/resistance (patterns.support_resistance)
+_RSI_WINDOW = 14
+_ATR_WINDOW = 14
+_MACD_FAST, _MACD_SLOW, _MACD_SIGNAL = 12, 26, 9
+
+_SCALARS = (
+    "n", "first_date", "last_date", "sum20", "sum50", "sum200", "prev_close",
+    "rsi_up", "rsi_down", "ema_fast", "ema_slow", "signal", "signal_n",
+    "tr_sum", "atr",
+)
+_INT_SCALARS = ("n", "first_date", "last_date", "signal_n")
+
+
+def _alpha_span(span: int) -> float:
+    return 2.0 / (span + 1.0)
+
+
+class IndicatorState:
+    __slots__ = _SCALARS + ("closes", "highs", "lows", "_checkpoint")
+
+    def __init__(self):
+        self.n = 0
+        self.first_date = 0
+        self.last_date = 0
+        self.sum20 = 0.0
+        self.sum50 = 0.0
+        self.sum200 = 0.0
+        self.prev_close = math.nan
+        self.rsi_up = math.nan
+        self.rsi_down = math.nan
+        self.ema_fast = math.nan
+        self.ema_slow = math.nan
+        self.signal = math.nan
+        self.signal_n = 0
+        self.tr_sum = 0.0
+        self.atr = math.nan
+        self.closes = np.full(_RING, np.nan)
+        self.highs = np.full(_SR_WINDOW, np.nan)
+        self.lows = np.full(_SR_WINDOW, np.nan)
+        self._checkpoint = None
+
+    # =========================
+    # CHECKPOINT (revisi bar terakhir)
+    # =========================
+    def _dump(self) -> tuple:
+        return (
+            tuple(getattr(self, k) for k in _SCALARS),
+            self.closes.copy(), self.highs.copy(), self.lows.copy(),
+        )
+
+    def _restore(self, dumped: tuple) -> None:
+        scalars, closes, highs, lows = dumped
+        for k, v in zip(_SCALARS, scalars):
+            setattr(self, k, v)
+        self.closes, self.highs, self.lows = closes, highs, lows
+
+    # =========================
+    # UPDATE
+    # =========================
+    def update(self, date: int, high: float, low: float, close: float) -> None:
+        """
+        Tambah 1 bar (date = int64 ns). Kalau date sama dengan bar terakhir
+        (bar harian yang masih berjalan), bar itu diganti, bukan ditambah.
+        """
+        if self.n and date == self.last_date and self._checkpoint is not None:
+            self._restore(self._checkpoint)
+        elif self.n and date <= self.last_date:
+            raise ValueError("Bar harus urut maju tanggalnya.")
+        self._checkpoint = self._dump()
+
+        n = self.n
+        # ---- SMA ring buffer ----
+        for w, attr in ((20, "sum20"), (50, "sum50"), (200, "sum200")):
+            leaving = self.closes[(n - w) % _RING] if n >= w else 0.0
+            setattr(self, attr, getattr(self, attr) + close - leaving)
+        self.closes[n % _RING] = close
+        self.highs[n % _SR_WINDOW] = high
+        self.lows[n % _SR_WINDOW] = low
+
+        # ---- RSI (Wilder, seed dari diff pertama = 0 seperti `ta`) ----
+        if n == 0:
+            up = down = 0.0
+        else:
+            diff = close - self.prev_close
+            up, down = max(diff, 0.0), max(-diff, 0.0)
+        a = 1.0 / _RSI_WINDOW
+        if n == 0:
+            self.rsi_up, self.rsi_down = up, down
+        else:
+            self.rsi_up = (1.0 - a) * self.rsi_up + a * up
+            self.rsi_down = (1.0 - a) * self.rsi_down + a * down
+
+        # ---- MACD ----
+        if n == 0:
+            self.ema_fast = self.ema_slow = close
+        else:
+            af, as_ = _alpha_span(_MACD_FAST), _alpha_span(_MACD_SLOW)
+            self.ema_fast = (1.0 - af) * self.ema_fast + af * close
+            self.ema_slow = (1.0 - as_) * self.ema_slow + as_ * close
+        if n + 1 >= _MACD_SLOW:
+            line = self.ema_fast - self.ema_slow
+            if self.signal_n == 0:
+                self.signal = line
+            else:
+                asg = _alpha_span(_MACD_SIGNAL)
+                self.signal = (1.0 - asg) * self.signal + asg * line
+            self.signal_n += 1
+
+        # ---- ATR (Wilder, seed = mean TR 14 bar pertama) ----
+        if n == 0:
+            tr = high - low
+        else:
+            pc = self.prev_close
+            tr = max(high - low, abs(high - pc), abs(low - pc))
+        if n + 1 < _ATR_WINDOW:
+            self.tr_sum += tr
+            self.atr = 0.0
+        elif n + 1 == _ATR_WINDOW:
+            self.tr_sum += tr
+            self.atr = self.tr_sum / _ATR_WINDOW
+        else:
+            self.atr = (self.atr * (_ATR_WINDOW - 1) + tr) / _ATR_WINDOW
+
+        self.prev_close = close
+        if n == 0:
+            self.first_date = date
+        self.last_date = date
+        self.n = n + 1
+
+    # =========================
+    # VALUES
+    # =========================
+    @property
+    def last_close(self) -> float:
+        return float(self.closes[(self.n - 1) % _RING]) if self.n else math.nan
+
+    @property
+    def last_high(self) -> float:
+        return float(self.highs[(self.n - 1) % _SR_WINDOW]) if self.n else math.nan
+
+    @property
+    def last_low(self) -> float:
+        return float(self.lows[(self.n - 1) % _SR_WINDOW]) if self.n else math.nan
+
+    def close_at(self, bars_ago: int) -> float:
+        if bars_ago >= min(self.n, _RING):
+            return math.nan
+        return float(self.closes[(self.n - 1 - bars_ago) % _RING])
+
+    def values(self) -> dict[str, float]:
+        n = self.n
+        nan = math.nan
+        macd = self.ema_fast - self.ema_slow if n >= _MACD_SLOW else nan
+        if n < _RSI_WINDOW:
+            rsi = nan
+        elif self.rsi_down == 0:
+            rsi = 100.0
+        else:
+            rsi = 100.0 - 100.0 / (1.0 + self.rsi_up / self.rsi_down)
+
+        return {
+            "Close": self.last_close,
+            "MA20": self.sum20 / 20 if n >= 20 else nan,
+            "MA50": self.sum50 / 50 if n >= 50 else nan,
+            "MA200": self.sum200 / 200 if n >= 200 else nan,
+            "RSI": rsi,
+            "MACD": macd,
+            "MACD_signal": self.signal if self.signal_n >= _MACD_SIGNAL else nan,
+            "ATR": self.atr if n else nan,
+            "support": float(np.nanmin(self.lows)) if n else nan,
+            "resistance": float(np.nanmax(self.highs)) if n else nan,
+        }
+
+    # =========================
+    # BUILD / SERIALIZE
+    # =========================
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "IndicatorState":
+        st = cls()
+        st.extend(df)
+        return st
+
+    def extend(self, df: pd.DataFrame) -> None:
+        dates = _date_ns(df.index)
+        highs = df["High"].to_numpy(dtype="float64")
+        lows = df["Low"].to_numpy(dtype="float64")
+        closes = df["Close"].to_numpy(dtype="float64")
+        for i in range(len(dates)):
+            self.update(int(dates[i]), float(highs[i]), float(lows[i]), float(closes[i]))
+
+    def to_arrays(self) -> dict[str, np.ndarray]:
+        out = {k: np.asarray(getattr(self, k)) for k in _SCALARS}
+        out.update(closes=self.closes, highs=self.highs, lows=self.lows)
+        if self._checkpoint is not None:
+            scalars, closes, highs, lows = self._checkpoint
+            out["cp_scalars"] = np.asarray(scalars, dtype="float64")
+            out.update(cp_closes=closes, cp_highs=highs, cp_lows=lows)
+        return out
+
+    @classmethod
+    def from_arrays(cls, z) -> "IndicatorState":
+        st = cls()
+        for k in _SCALARS:
+            v = z[k].item()
+            setattr(st, k, int(v) if k in _INT_SCALARS else float(v))
+        st.closes = np.array(z["closes"])
+        st.highs = np.array(z["highs"])
+        st.lows = np.array(z["lows"])
+        if "cp_scalars" in z:
+            scalars = [
+                int(v) if k in _INT_SCALARS else float(v)
+                for k, v in zip(_SCALARS, z["cp_scalars"].tolist())
+            ]
+            st._checkpoint = (tuple(scalars), np.array(z["cp_closes"]), np.array(z["cp_highs"]), np.array(z["cp_lows"]))
+        return st
+
+
+def _date_ns(index) -> np.ndarray:
+    idx = pd.DatetimeIndex(index)
+    if idx.tz is not None:
+        idx = idx.tz_localize(None)
+    return idx.values.astype("datetime64[ns]").astype("int64")
+
+
+# =========================
+# PERSISTENCE (di samping PriceStore)
+# =========================
+def _state_path(store: PriceStore, ticker: str) -> str:
+    return os.path.join(store.root, f"{ticker.upper()}.state.npz")
+
+
+def load_state(store: PriceStore, ticker: str) -> IndicatorState | None:
+    path = _state_path(store, ticker)
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path) as z:
+            return IndicatorState.from_arrays(z)
+    except Exception:
+        return None
+
+
+def save_state(store: PriceStore, ticker: str, st: IndicatorState) -> None:
+    path = _state_path(store, ticker)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp.npz"
+    np.savez(tmp, **st.to_arrays())
+    os.replace(tmp, path)
+
+
+def _seed_frame(store: PriceStore, ticker: str, df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Histori untuk membangun state: bar PriceStore sebelum awal df, lalu df.
+    Seed = bar pertama tersimpan, tidak ikut bergeser dengan window scan.
+    """
+    cached = store.load(ticker)
+    if cached is None or df.empty:
+        return df
+    older = cached[0]
+    older = older[_date_ns(older.index) < _date_ns(df.index[:1])[0]]
+    if older.empty:
+        return df
+    return pd.concat([older[["High", "Low", "Close"]], df[["High", "Low", "Close"]]])
+
+
+def advance_state(store: PriceStore, ticker: str, df: pd.DataFrame) -> IndicatorState:
+    """
+    Ambil state tersimpan lalu majukan dengan bar di df setelah tanggal terakhir state.
+    Biasanya hanya 0-1 bar yang disentuh; awal window df boleh bergeser.
+    Kalau state tidak cocok dengan df (histori berubah, seed lebih baru dari
+    awal df, belum ada), state dibangun ulang dari histori PriceStore + df.
+    """
+    df = as_frame(df)
+    dates = _date_ns(df.index)
+    closes = df["Close"].to_numpy(dtype="float64")
+
+    st = load_state(store, ticker)
+    pos = -1
+    if st is not None and st.n and len(dates) and st.first_date <= dates[0]:
+        pos = int(np.searchsorted(dates, st.last_date))
+        if pos >= len(dates) or dates[pos] != st.last_date:
+            pos = -1
+        elif pos >= 1 and not math.isclose(st.close_at(1), closes[pos - 1], rel_tol=1e-9):
+            pos = -1
+
+    if pos < 0:
+        st = IndicatorState.from_frame(_seed_frame(store, ticker, df))
+    else:
+        # bar terakhir state tidak berubah -> mulai dari bar sesudahnya (High/Low ikut
+        # dicek: revisi bar berjalan bisa mengubah support/resistance & ATR tanpa mengubah Close)
+        last = df.iloc[pos]
+        if all(
+            math.isclose(a, float(b), rel_tol=1e-12)
+            for a, b in ((st.last_close, closes[pos]), (st.last_high, last["High"]), (st.last_low, last["Low"]))
+        ):
+            pos += 1
+        tail = df.iloc[pos:]
+        if tail.empty:
+            return st
+        st.extend(tail)
+
+    save_state(store, ticker, st)
+    return st
@@ -1,22 +1,16 @@
 import logging
 import os
 import asyncio
+import time
 from telegram import Update
+from telegram.error import BadRequest
 from telegram.ext import ApplicationBuilder, CommandHandler, MessageHandler, filters, ContextTypes
 
-from main import run_analysis
-from scanner import (
-    scan_top10_fundamental_cheapest,
-    scan_top10_technical_4of4,
-    scan_top10_combo,
-    scan_top10_undervalued_strong,
-    scan_top10_breakout,
-    format_fundamental_message,
-    format_technical_message,
-    format_combo_message,
-    format_undervalued_message,
-    format_breakout_message,
-)
+# main / scanner / grafik (pandas, matplotlib, yfinance) sengaja tidak di-import
+# di sini: dimuat di thread executor saat dipakai pertama kali atau oleh warm-up,
+# jadi bot langsung bisa polling.
+from singleflight import flight_stats, group
+from startup import start_warm_up
 
 from dotenv import load_dotenv
 
@@ -33,6 +27,10 @@ logging.basicConfig(
 )
 
 TELEGRAM_MAX = 3800  # aman di bawah limit Telegram 4096
+PROGRESS_EDIT_SECONDS = float(os.getenv("PROGRESS_EDIT_SECONDS", "2"))  # jeda minimal antar edit status
+
+# user berbeda yang minta ticker sama bersamaan -> 1 analisa
+ANALYSIS_FLIGHT = group("analysis")
 
 
 async def send_long(update: Update, text: str):
@@ -71,6 +69,8 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "/breakout\n"
         "🚀Top 10 Breakout Candidate\n\n"
 
+        "Tambahkan `recheck` (mis. /breakout recheck) untuk cek ulang saham yang sedang di-skip\n\n"
+
         "━━━━━━━━━━━━━━━━━━━━━━\n"
         "⚡ Data harga & fundamental real-time\n"
         "📌 Gunakan dengan bijak untuk keputusan investasi\n"
@@ -79,82 +79,137 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
 
 
-async def fundamental(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    await update.message.reply_text("🔎 Scanning Top 10 Fundamental termurah (PE), Butuh waktu selama 1-2 menit")
-    loop = asyncio.get_running_loop()
-
+async def _edit_status(status, text: str):
     try:
-        top, meta = await loop.run_in_executor(None, scan_top10_fundamental_cheapest)
-        msg = format_fundamental_message(top, meta)
-        await send_long(update, msg)
+        await status.edit_text(text[:TELEGRAM_MAX])
+    except BadRequest as e:
+        # teks sama persis dengan sebelumnya -> abaikan
+        if "not modified" not in str(e).lower():
+            raise
 
-    except Exception as e:
-        logging.exception("Error saat scan fundamental")
-        await update.message.reply_text(f"❌ Error saat scan fundamental:\n{repr(e)}")
 
+def _wants_recheck(context: ContextTypes.DEFAULT_TYPE) -> bool:
+    # /breakout recheck -> ticker di negative cache ikut di-fetch ulang
+    return "recheck" in [a.lower() for a in (context.args or [])]
 
-async def technical(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    await update.message.reply_text("🔎 Scanning Top 10 Technical (Score 4/4), Butuh waktu selama 1-2 menit")
+
+async def stream_scan(update: Update, name: str, intro: str, recheck: bool = False):
+    """
+    Jalankan iter_scan di thread terpisah dan edit 1 pesan status selama scan
+    berjalan (persen + pemimpin sementara), lalu kirim hasil akhir.
+    Teks dibuat di thread worker; event loop hanya menerima (selesai?, teks).
+    """
+    status = await update.message.reply_text(intro)
     loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+
+    def worker():
+        try:
+            import scanner
+
+            for progress in scanner.iter_scan(name, recheck=recheck):
+                if progress.finished:
+                    text = scanner.FORMATTERS[name](progress.top, progress.meta)
+                else:
+                    text = scanner.format_progress(progress)
+                loop.call_soon_threadsafe(queue.put_nowait, (progress.finished, text))
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, e)
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, None)
 
     try:
-        top, meta = await loop.run_in_executor(None, scan_top10_technical_4of4)
-        msg = format_technical_message(top, meta)
-        await send_long(update, msg)
+        task = loop.run_in_executor(None, worker)
+        last_edit = 0.0
+        final = None
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            if isinstance(item, Exception):
+                raise item
+            finished, text = item
+            if finished:
+                final = text
+            elif time.monotonic() - last_edit >= PROGRESS_EDIT_SECONDS:
+                last_edit = time.monotonic()
+                await _edit_status(status, f"{intro}\n\n{text}")
+        await task
+
+        await _edit_status(status, f"{intro}\n\n✅ Selesai.")
+        await send_long(update, final)
+        logging.info("singleflight: %s", flight_stats())
 
     except Exception as e:
-        logging.exception("Error saat scan technical")
-        await update.message.reply_text(f"❌ Error saat scan technical:\n{repr(e)}")
+        logging.exception(f"Error saat scan {name}")
+        await update.message.reply_text(f"❌ Error saat scan {name}:\n{repr(e)}")
+
+
+async def fundamental(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await stream_scan(
+        update, "fundamental",
+        "🔎 Scanning Top 10 Fundamental termurah (PE)...",
+        recheck=_wants_recheck(context),
+    )
+
+
+async def technical(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await stream_scan(
+        update, "technical",
+        "🔎 Scanning Top 10 Technical (Score 4/4)...",
+        recheck=_wants_recheck(context),
+    )
+
 
 async def combo(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    await update.message.reply_text("🏆 Ranking Gabungan Fundamental + Teknikal... (1-2 menit)")
-    loop = asyncio.get_running_loop()
-    try:
-        top, meta = await loop.run_in_executor(None, scan_top10_combo)
-        msg = format_combo_message(top, meta)
-        await send_long(update, msg)
-    except Exception as e:
-        logging.exception("Error saat scan combo")
-        await update.message.reply_text(f"❌ Error saat scan combo:\n{repr(e)}")
+    await stream_scan(
+        update, "combo",
+        "🏆 Ranking Gabungan Fundamental + Teknikal...",
+        recheck=_wants_recheck(context),
+    )
 
 
 async def undervalued(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    await update.message.reply_text("💎 Top 10 Undervalued + Strong Trend... (1-2 menit)")
-    loop = asyncio.get_running_loop()
-    try:
-        top, meta = await loop.run_in_executor(None, scan_top10_undervalued_strong)
-        msg = format_undervalued_message(top, meta)
-        await send_long(update, msg)
-    except Exception as e:
-        logging.exception("Error saat scan undervalued")
-        await update.message.reply_text(f"❌ Error saat scan undervalued:\n{repr(e)}")
+    await stream_scan(
+        update, "undervalued",
+        "💎 Top 10 Undervalued + Strong Trend...",
+        recheck=_wants_recheck(context),
+    )
 
 
 async def breakout(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    await update.message.reply_text("🚀 Top 10 Breakout Candidate... (1-2 menit)")
-    loop = asyncio.get_running_loop()
-    try:
-        top, meta = await loop.run_in_executor(None, scan_top10_breakout)
-        msg = format_breakout_message(top, meta)
-        await send_long(update, msg)
-    except Exception as e:
-        logging.exception("Error saat scan breakout")
-        await update.message.reply_text(f"❌ Error saat scan breakout:\n{repr(e)}")
+    await stream_scan(
+        update, "breakout",
+        "🚀 Top 10 Breakout Candidate...",
+        recheck=_wants_recheck(context),
+    )
+
+
+def _analyze(ticker: str) -> tuple[str, bytes | None]:
+    # jalan di thread executor; analyze tidak memakai state global.
+    # chart_png diambil dari chart cache kalau bar terakhir belum berubah.
+    from grafik import chart_cache
+    from main import analyze, render_analysis
+
+    result = analyze(ticker)
+    logging.info("chart cache: %s", chart_cache().stats())
+    return render_analysis(result), (result.chart_png if result else None)
 
 
 async def analyze_stock(update: Update, context: ContextTypes.DEFAULT_TYPE):
     ticker = update.message.text.strip().upper()
     await update.message.reply_text(f"🔎 Menganalisa {ticker} ...")
+    loop = asyncio.get_running_loop()
 
     try:
-        hasil = run_analysis(ticker)
+        hasil, chart = await loop.run_in_executor(None, ANALYSIS_FLIGHT.do, ticker, _analyze, ticker)
         await send_long(update, hasil)
 
-        if os.path.exists("chart.png"):
-            with open("chart.png", "rb") as f:
-                await update.message.reply_photo(photo=f)
+        if chart:
+            await update.message.reply_photo(photo=chart)
 
         await update.message.reply_text("✅ Analisa selesai.")
+        logging.info("singleflight: %s", flight_stats())
 
     except Exception as e:
         logging.exception("Error saat analisa saham")
@@ -171,5 +226,8 @@ if __name__ == "__main__":
     app.add_handler(CommandHandler("breakout", breakout))
     app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, analyze_stock))
 
+    # universe + harga ticker populer dimuat di background; bot langsung polling
+    start_warm_up()
+
     print("Bot berjalan...")
     app.run_polling()
\ No newline at end of file
@@ -0,0 +1,94 @@
+# tests/test_backtest.py
+"""
+Replay scan vs ranking scanner.SCANS (tuple key + urutan universe) per tanggal rebalance.
+
+python -m pytest -q tests
+"""
+import os
+import sys
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import backtest  # noqa: E402
+import scanner  # noqa: E402
+from store import PricePanel  # noqa: E402
+
+TOP_N = 5
+
+
+def _panel(n_tickers: int = 40, n_bars: int = 160, seed: int = 0) -> PricePanel:
+    rng = np.random.default_rng(seed)
+    frames = {}
+    for i in range(n_tickers):
+        n = int(rng.integers(n_bars // 2, n_bars))
+        idx = pd.bdate_range(end="2026-10-16", periods=n)
+        close = 1000 * np.exp(np.cumsum(rng.normal(0.001, 0.02, n)))
+        frames[f"T{i:03d}"] = pd.DataFrame({
+            "Open": close,
+            "High": close * (1 + rng.uniform(0, 0.02, n)),
+            "Low": close * (1 - rng.uniform(0, 0.02, n)),
+            "Close": close,
+            "Volume": 1e6,
+        }, index=idx)
+    return PricePanel.from_frames(frames)
+
+
+def _fundamentals(tickers, seed: int = 0) -> dict:
+    # PE sengaja banyak yang seri supaya key kedua (ROE / tech_score) menentukan
+    rng = np.random.default_rng(seed)
+    return {
+        t: {
+            "pe": float(rng.choice([5.0, 6.0, 7.0])) if i % 7 else None,
+            "roe": float(rng.uniform(0, 0.3)) if i % 5 else None,
+        }
+        for i, t in enumerate(tickers)
+    }
+
+
+def _expected(name: str, at: dict, ok: np.ndarray, tickers: list, k: int) -> set:
+    spec = scanner.SCANS[name]
+    rows = []
+    for i in np.flatnonzero(ok[:, k]):
+        r = SimpleNamespace(
+            ticker=tickers[i],
+            pe=at["pe"][i, k],
+            roe=None if np.isnan(at["roe"][i, k]) else at["roe"][i, k],
+            tech_score=int(at["tech_score"][i, k]),
+            probability=at["probability"][i, k],
+            last_close=at["close"][i, k],
+            resistance=at["resistance"][i, k],
+        )
+        rows.append(spec.make(r))
+    # sorted stabil -> seri penuh urut posisi (universe) seperti _TopN di scanner
+    return {r.ticker for r in sorted(rows, key=spec.key)[:TOP_N]}
+
+
+@pytest.mark.parametrize("name", list(backtest.REPLAY_SCANS))
+def test_replay_matches_scanner_ranking(name):
+    panel = _panel()
+    funds = _fundamentals(panel.tickers)
+    f = backtest.replay_features(panel, funds)
+    res = backtest.replay_scan(panel, name, top_n=TOP_N, hold=5, warmup=60, features=f)
+
+    rebalance = np.searchsorted(panel.dates, res.rebalance_dates)
+    at = {k: (v[:, rebalance] if isinstance(v, np.ndarray) and v.ndim == 2 else v) for k, v in f.items()}
+    with np.errstate(invalid="ignore"):
+        ok = backtest.REPLAY_SCANS[name].select(at)
+    assert sum(map(len, res.picks)) > 0
+    for k, picks in enumerate(res.picks):
+        assert set(picks) == _expected(name, at, ok, list(panel.tickers), k), f"{name} rebalance {k}"
+
+
+def test_top_n_mask_tiebreak_only_at_boundary():
+    key = np.array([[1.0, 2.0, 2.0, 2.0, np.inf, 0.5]])
+    second = np.array([[0.0, 3.0, 1.0, 2.0, 0.0, 0.0]])
+    mask = backtest._top_n_mask(key, 3, (second,))
+    # 0.5 & 1.0 lolos langsung; 1 slot untuk 3 yang seri di 2.0 -> key kedua terkecil
+    assert mask.tolist() == [[True, False, True, False, False, True]]
+    # tanpa tiebreak: urut posisi
+    assert backtest._top_n_mask(key, 3).tolist() == [[True, True, False, False, False, True]]
@@ -0,0 +1,155 @@
+# tests/test_kernels.py
+"""
+Parity kernel NumPy vs pandas rolling / `ta` (formula asli add_indicators).
+
+python -m pytest -q tests
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import kernels  # noqa: E402
+
+ta = pytest.importorskip("ta")
+
+ATOL = 1e-8
+# termasuk histori yang lebih pendek dari tiap window (14, 20, 26, 34 = MACD signal, 50)
+LENGTHS = (1, 2, 5, 13, 14, 19, 20, 26, 33, 34, 49, 50, 60, 125, 250)
+
+
+def _frame(n: int, seed: int, volume_gaps: bool = False) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    idx = pd.bdate_range(end="2026-10-16", periods=n)
+    close = 1000 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    volume = rng.integers(1e5, 1e7, n).astype(float)
+    if volume_gaps and n > 3:
+        volume[rng.choice(np.arange(1, n), size=max(1, n // 10), replace=False)] = np.nan
+    return pd.DataFrame({
+        "Open": close * (1 + rng.normal(0, 0.005, n)),
+        "High": close * (1 + rng.uniform(0, 0.02, n)),
+        "Low": close * (1 - rng.uniform(0, 0.02, n)),
+        "Close": close,
+        "Volume": volume,
+    }, index=idx)
+
+
+FRAMES = [_frame(n, seed=i, volume_gaps=i % 2 == 1) for i, n in enumerate(LENGTHS)]
+
+
+def _panel(column: str) -> np.ndarray:
+    # ticker x bar, histori pendek di-pad NaN di kiri
+    return kernels.stack_panel(FRAMES, column)
+
+
+def _assert_rows(panel_out: np.ndarray, reference) -> None:
+    """
+    Tiap baris panel (bagian kanan sepanjang frame-nya) == reference(df).
+    NaN harus di posisi yang sama.
+    """
+    for i, df in enumerate(FRAMES):
+        n = len(df)
+        mine = panel_out[i, -n:]
+        theirs = np.asarray(reference(df), dtype="float64")
+        np.testing.assert_allclose(mine, theirs, rtol=0, atol=ATOL, equal_nan=True, err_msg=f"frame {i} (n={n})")
+        # sebelum bar valid pertama (padding) tetap NaN
+        assert np.isnan(panel_out[i, :-n]).all()
+
+
+def _ta_safe(fn, df: pd.DataFrame) -> np.ndarray:
+    # `ta` melempar IndexError untuk seri yang lebih pendek dari window
+    # (mis. ATR); nilai yang setara adalah semua 0 sebelum window pertama
+    try:
+        return np.asarray(fn(df), dtype="float64")
+    except IndexError:
+        return np.zeros(len(df))
+
+
+# =========================
+# ROLLING
+# =========================
+@pytest.mark.parametrize("window", [1, 5, 20, 50])
+def test_sma(window):
+    _assert_rows(kernels.sma(_panel("Close"), window), lambda df: df["Close"].rolling(window).mean())
+
+
+@pytest.mark.parametrize("window", [1, 20, 30])
+def test_rolling_max_min(window):
+    _assert_rows(kernels.rolling_max(_panel("High"), window), lambda df: df["High"].rolling(window).max())
+    _assert_rows(kernels.rolling_min(_panel("Low"), window), lambda df: df["Low"].rolling(window).min())
+
+
+def test_rolling_interior_nan():
+    # NaN di tengah seri: window yang memuatnya ikut NaN (sama dengan pandas)
+    s = FRAMES[-1]["Close"].copy()
+    s.iloc[[10, 11, 100]] = np.nan
+    for window in (5, 20):
+        np.testing.assert_allclose(kernels.sma(s, window), s.rolling(window).mean(), atol=ATOL, equal_nan=True)
+        np.testing.assert_allclose(kernels.rolling_max(s, window), s.rolling(window).max(), atol=ATOL, equal_nan=True)
+        np.testing.assert_allclose(kernels.rolling_min(s, window), s.rolling(window).min(), atol=ATOL, equal_nan=True)
+
+
+# =========================
+# EXPONENTIAL
+# =========================
+@pytest.mark.parametrize("span", [9, 12, 26])
+def test_ema(span):
+    _assert_rows(
+        kernels.ema(_panel("Close"), span),
+        lambda df: ta.trend.EMAIndicator(df["Close"], window=span).ema_indicator(),
+    )
+
+
+def test_rsi():
+    _assert_rows(kernels.rsi(_panel("Close")), lambda df: ta.momentum.RSIIndicator(df["Close"], window=14).rsi())
+
+
+def test_macd():
+    line, signal = kernels.macd(_panel("Close"))
+    _assert_rows(line, lambda df: ta.trend.MACD(df["Close"]).macd())
+    _assert_rows(signal, lambda df: ta.trend.MACD(df["Close"]).macd_signal())
+
+
+# =========================
+# VOLATILITY / VOLUME
+# =========================
+def test_atr():
+    _assert_rows(
+        kernels.atr(_panel("High"), _panel("Low"), _panel("Close")),
+        lambda df: _ta_safe(
+            lambda d: ta.volatility.AverageTrueRange(d["High"], d["Low"], d["Close"]).average_true_range(), df
+        ),
+    )
+
+
+def test_vwap():
+    # formula app.py: cumsum pandas melewati Volume NaN
+    _assert_rows(
+        kernels.vwap(_panel("Close"), _panel("Volume")),
+        lambda df: (df["Close"] * df["Volume"]).cumsum() / df["Volume"].cumsum(),
+    )
+
+
+# =========================
+# 1-D == baris panel
+# =========================
+def test_single_series_matches_panel():
+    df = FRAMES[-2]
+    n = len(df)
+    i = len(FRAMES) - 2
+    close = df["Close"].to_numpy()
+    np.testing.assert_array_equal(kernels.sma(close, 20), kernels.sma(_panel("Close"), 20)[i, -n:])
+    np.testing.assert_array_equal(kernels.rsi(close), kernels.rsi(_panel("Close"))[i, -n:])
+    np.testing.assert_array_equal(
+        kernels.atr(df["High"], df["Low"], close),
+        kernels.atr(_panel("High"), _panel("Low"), _panel("Close"))[i, -n:],
+    )
+
+
+def test_check_parity_helper():
+    worst = kernels.check_parity(FRAMES[5:])
+    assert all(v <= 1e-6 for v in worst.values())
@@ -0,0 +1,79 @@
+# tests/test_strategy.py
+"""
+Parity versi panel strategy.py vs versi per-DataFrame (bar terakhir tiap ticker).
+
+python -m pytest -q tests
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import kernels  # noqa: E402
+import strategy  # noqa: E402
+from indicators import require  # noqa: E402
+from patterns import support_resistance  # noqa: E402
+
+# termasuk histori yang lebih pendek dari MA200 / window volume 20
+LENGTHS = (1, 5, 19, 20, 21, 50, 120, 199, 200, 201, 260, 300)
+DRIFTS = (-0.004, 0.0, 0.004)
+
+
+def _frame(n: int, seed: int, drift: float, volume_gaps: bool) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    idx = pd.bdate_range(end="2026-10-16", periods=n)
+    close = 1000 * np.exp(np.cumsum(rng.normal(drift, 0.015, n)))
+    volume = rng.integers(1e5, 1e7, n).astype(float)
+    if volume_gaps and n > 3:
+        volume[rng.choice(np.arange(n), size=max(1, n // 8), replace=False)] = np.nan
+    return pd.DataFrame({
+        "Open": close,
+        "High": close * (1 + rng.uniform(0, 0.02, n)),
+        "Low": close * (1 - rng.uniform(0, 0.02, n)),
+        "Close": close,
+        "Volume": volume,
+    }, index=idx)
+
+
+FRAMES = [
+    require(_frame(n, seed=i * 7 + j, drift=d, volume_gaps=(i + j) % 2 == 1), strategy.PANEL_REQUIRES + ("MA200",))
+    for i, n in enumerate(LENGTHS)
+    for j, d in enumerate(DRIFTS)
+]
+RESISTANCE = np.array([support_resistance(df)[1] for df in FRAMES])
+
+
+def _panel(column: str) -> np.ndarray:
+    return kernels.stack_panel(FRAMES, column)
+
+
+def test_market_regime_panel():
+    got = strategy.market_regime_panel(_panel("Close"), _panel("MA50"), _panel("RSI"))
+    expected = [strategy.market_regime(df) for df in FRAMES]
+    assert got.tolist() == expected
+    # data uji mencakup ketiga kondisi
+    assert set(expected) == {"Bull Market", "Bear Market", "Sideways Market"}
+
+
+def test_breakout_pullback_probability_panel():
+    breakout, pullback = strategy.breakout_pullback_probability_panel(
+        _panel("Close"), _panel("Volume"), _panel("MA20"), _panel("MACD"), _panel("MACD_signal"), _panel("RSI"),
+        RESISTANCE,
+    )
+    expected = [strategy.breakout_pullback_probability(df, r) for df, r in zip(FRAMES, RESISTANCE)]
+    np.testing.assert_array_equal(breakout, [b for b, _ in expected])
+    np.testing.assert_array_equal(pullback, [p for _, p in expected])
+    assert len({b for b, _ in expected}) > 1 and len({p for _, p in expected}) > 1
+
+
+def test_calculate_score_panel():
+    score, probability = strategy.calculate_score_panel(
+        _panel("MA20"), _panel("MA50"), _panel("MACD"), _panel("MACD_signal"), _panel("RSI"), _panel("Close"),
+        RESISTANCE,
+    )
+    expected = [strategy.calculate_score(df, r) for df, r in zip(FRAMES, RESISTANCE)]
+    np.testing.assert_array_equal(score, [s for s, _ in expected])
+    np.testing.assert_array_equal(probability, [p for _, p in expected])
@@ -0,0 +1,109 @@
+# tests/test_streaming.py
+"""
+IndicatorState incremental: window scan bergeser tidak memicu rebuild.
+
+python -m pytest -q tests
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import streaming  # noqa: E402
+from store import PriceStore  # noqa: E402
+
+
+def _frame(n: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    idx = pd.bdate_range(end="2026-10-16", periods=n)
+    close = 1000 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    return pd.DataFrame({
+        "Open": close,
+        "High": close * (1 + rng.uniform(0, 0.02, n)),
+        "Low": close * (1 - rng.uniform(0, 0.02, n)),
+        "Close": close,
+        "Volume": rng.integers(1e5, 1e7, n).astype(float),
+    }, index=idx)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return PriceStore(str(tmp_path))
+
+
+@pytest.fixture
+def count_updates(monkeypatch):
+    calls = []
+    update = streaming.IndicatorState.update
+
+    def counted(self, *args):
+        calls.append(args[0])
+        return update(self, *args)
+
+    monkeypatch.setattr(streaming.IndicatorState, "update", counted)
+    return calls
+
+
+def _assert_values(st, df):
+    ref = streaming.IndicatorState.from_frame(df).values()
+    for k, v in st.values().items():
+        np.testing.assert_allclose(v, ref[k], rtol=1e-9, equal_nan=True, err_msg=k)
+
+
+# =========================
+# WINDOW BERGESER
+# =========================
+def test_rolling_window_touches_one_bar(store, count_updates):
+    full = _frame(300)
+    store.save("AAAA", full.iloc[:-1], None)
+
+    # hari 1: window 130 bar, state di-seed dari bar pertama PriceStore
+    streaming.advance_state(store, "AAAA", full.iloc[-131:-1])
+    _assert_values(streaming.load_state(store, "AAAA"), full.iloc[:-1])
+
+    # hari 2: awal window ikut maju 1 bar, bar baru cuma 1
+    count_updates.clear()
+    st = streaming.advance_state(store, "AAAA", full.iloc[-130:])
+    assert len(count_updates) == 1
+    _assert_values(st, full)
+
+
+def test_seed_without_store_history(store, count_updates):
+    full = _frame(200, seed=1)
+    streaming.advance_state(store, "BBBB", full.iloc[:150])
+    count_updates.clear()
+    st = streaming.advance_state(store, "BBBB", full.iloc[5:152])
+    assert len(count_updates) == 2
+    assert st.first_date == streaming._date_ns(full.index[:1])[0]
+    _assert_values(st, full.iloc[:152])
+
+
+def test_unchanged_last_bar_is_noop(store, count_updates):
+    df = _frame(80, seed=2)
+    streaming.advance_state(store, "CCCC", df)
+    count_updates.clear()
+    streaming.advance_state(store, "CCCC", df.iloc[1:])
+    assert count_updates == []
+
+
+def test_revised_last_bar_high(store):
+    df = _frame(80, seed=3)
+    streaming.advance_state(store, "DDDD", df)
+    rev = df.copy()
+    rev.iloc[-1, rev.columns.get_loc("High")] *= 1.5
+    st = streaming.advance_state(store, "DDDD", rev)
+    assert st.values()["resistance"] == pytest.approx(rev["High"].iloc[-30:].max())
+    _assert_values(st, rev)
+
+
+def test_changed_history_rebuilds(store):
+    df = _frame(80, seed=4)
+    streaming.advance_state(store, "EEEE", df.iloc[:-1])
+    adj = df.copy()
+    adj[["Open", "High", "Low", "Close"]] *= 0.5  # mis. split 2:1
+    st = streaming.advance_state(store, "EEEE", adj)
+    _assert_values(st, adj)
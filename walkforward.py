@@ -0,0 +1,312 @@
+# walkforward.py
+"""
+Walk-forward optimisation ambang calculate_score & scanner di atas backtest.replay_scan.
+
+- Panel OHLCV ditaruh sekali di shared memory (SharedPanel); worker
+  process attach tanpa copy, jadi RAM tidak naik per worker.
+- Indikator (MA, RSI, MACD, resistance) dihitung sekali per worker.
+- Tiap task = 1 kombinasi parameter, dievaluasi di semua fold
+  (train lalu test). Parent memilih kombinasi terbaik per fold dari
+  metrik train dan melaporkan hasil out-of-sample di fold test.
+
+python walkforward.py [scan] [period]
+"""
+from __future__ import annotations
+
+import inspect
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from backtest import REPLAY_SCANS, replay_features, replay_indicators, replay_scan
+from store import OHLCV_COLUMNS, PricePanel
+
+# parameter yang masuk ke calculate_score_panel; sisanya ke filter scan
+SCORE_PARAMS = ("rsi_band", "res_ratio")
+
+# nilai yang sekarang hard-coded (baseline pembanding)
+DEFAULT_PARAMS = {
+    "rsi_band": (40, 65),
+    "res_ratio": 0.98,
+    "near_resistance": 0.95,
+    "pe_max": 20.0,
+    "min_score": 2,
+}
+
+_SCORE_GRID = {
+    "rsi_band": [(40, 65), (35, 70), (45, 60), (50, 70)],
+    "res_ratio": [0.95, 0.98, 1.0],
+}
+GRIDS = {
+    "technical": dict(_SCORE_GRID),
+    "combo": dict(_SCORE_GRID),
+    "fundamental": {},
+    "breakout": {**_SCORE_GRID, "near_resistance": [0.9, 0.95, 0.98], "min_score": [2, 3]},
+    "undervalued": {**_SCORE_GRID, "pe_max": [10.0, 15.0, 20.0, 25.0], "min_score": [2, 3]},
+}
+
+_METRICS = ("total_return", "max_drawdown", "hit_rate")
+
+
+def _workers(default: int | None = None) -> int:
+    """
+    Jumlah proses (env WALKFORWARD_WORKERS, default jumlah core; 0 = di proses ini).
+    """
+    if default is not None:
+        return max(0, default)
+    env_w = os.getenv("WALKFORWARD_WORKERS")
+    return int(env_w) if env_w and env_w.isdigit() else (os.cpu_count() or 1)
+
+
+# =========================
+# SHARED MEMORY PANEL
+# =========================
+class SharedPanel:
+    """
+    OHLCV panel (5 x ticker x tanggal, float64) di 1 blok shared memory.
+    Pemilik (create) wajib close() -> blok di-unlink.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, meta: dict, owner: bool):
+        self.shm = shm
+        self.meta = meta
+        self.owner = owner
+        arr = np.ndarray(meta["shape"], dtype="float64", buffer=shm.buf)
+        self.panel = PricePanel(
+            tickers=meta["tickers"],
+            dates=meta["dates"],
+            **{c.lower(): arr[i] for i, c in enumerate(OHLCV_COLUMNS)},
+        )
+
+    @classmethod
+    def create(cls, panel: PricePanel) -> "SharedPanel":
+        shape = (len(OHLCV_COLUMNS),) + panel.close.shape
+        shm = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape)) * 8))
+        arr = np.ndarray(shape, dtype="float64", buffer=shm.buf)
+        for i, c in enumerate(OHLCV_COLUMNS):
+            arr[i] = getattr(panel, c.lower())
+        meta = {"name": shm.name, "shape": shape, "tickers": list(panel.tickers), "dates": panel.dates}
+        return cls(shm, meta, owner=True)
+
+    @classmethod
+    def attach(cls, meta: dict) -> "SharedPanel":
+        try:
+            shm = shared_memory.SharedMemory(name=meta["name"], track=False)
+        except TypeError:
+            # Python < 3.13: worker memakai resource tracker milik parent,
+            # jadi pendaftaran ulang di sini tidak membuat blok di-unlink dua kali
+            shm = shared_memory.SharedMemory(name=meta["name"])
+        return cls(shm, meta, owner=False)
+
+    def close(self) -> None:
+        self.panel = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# =========================
+# FOLDS & WORKER
+# =========================
+def make_folds(n_bars: int, train: int, test: int, start: int = 60) -> list[tuple[tuple[int, int], tuple[int, int]]]:
+    """
+    Fold rolling: ([a, a+train), [a+train, a+train+test)), maju sejauh test.
+    start: bar pertama yang boleh dipakai (indikator sudah terisi).
+    """
+    folds = []
+    a = start
+    while a + train + test <= n_bars:
+        folds.append(((a, a + train), (a + train, a + train + test)))
+        a += test
+    return folds
+
+
+# state per worker process (diisi initializer)
+_JOB: dict = {}
+
+
+def _init_worker(meta, job: dict) -> None:
+    shared = SharedPanel.attach(meta) if meta is not None else None
+    panel = shared.panel if shared is not None else job.pop("panel")
+    _JOB.clear()
+    _JOB.update(job, shared=shared, panel=panel, indicators=replay_indicators(panel))
+
+
+def _window(features: dict, a: int, b: int) -> dict:
+    return {k: (v[:, a:b] if isinstance(v, np.ndarray) and v.ndim == 2 else v) for k, v in features.items()}
+
+
+def _evaluate_combo(params: dict) -> np.ndarray:
+    """
+    1 kombinasi di semua fold -> array (fold, train/test, metrik).
+    """
+    panel = _JOB["panel"]
+    score_params = {k: v for k, v in params.items() if k in SCORE_PARAMS}
+    scan_params = {k: v for k, v in params.items() if k not in SCORE_PARAMS}
+    f = replay_features(panel, _JOB["fundamentals"], indicators=_JOB["indicators"], **score_params)
+
+    out = np.full((len(_JOB["folds"]), 2, len(_METRICS)), np.nan)
+    for i, fold in enumerate(_JOB["folds"]):
+        for j, (a, b) in enumerate(fold):
+            r = replay_scan(
+                panel.window(a, b),
+                _JOB["name"],
+                features=_window(f, a, b),
+                warmup=0,
+                top_n=_JOB["top_n"],
+                hold=_JOB["hold"],
+                fee=_JOB["fee"],
+                **scan_params,
+            )
+            out[i, j] = [np.nan if r.stats[m] is None else r.stats[m] for m in _METRICS]
+    return out
+
+
+# =========================
+# WALK-FORWARD
+# =========================
+@dataclass
+class WalkForwardResult:
+    name: str
+    combos: list[dict]
+    folds: list[dict]                 # per fold: tanggal, parameter terpilih, metrik train & test
+    scores: np.ndarray                # (kombinasi, fold, train/test, metrik)
+    stats: dict = field(default_factory=dict)
+
+
+def _accepted_params(name: str) -> tuple[str, ...]:
+    # param score + keyword filter scan (argumen pertama select = fitur)
+    select = list(inspect.signature(REPLAY_SCANS[name].select).parameters)[1:]
+    return SCORE_PARAMS + tuple(select)
+
+
+def _combos(name: str, grid: dict | None) -> list[dict]:
+    grid = GRIDS.get(name, {}) if grid is None else grid
+    keys = list(grid)
+    combos = [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+    # baseline (nilai hard-coded sekarang) selalu ikut dievaluasi
+    baseline = {k: DEFAULT_PARAMS[k] for k in keys}
+    if baseline not in combos:
+        combos.append(baseline)
+    return combos
+
+
+def walk_forward(
+    panel: PricePanel,
+    name: str = "breakout",
+    grid: dict | None = None,
+    *,
+    train: int = 120,
+    test: int = 20,
+    warmup: int = 60,
+    top_n: int = 10,
+    hold: int = 5,
+    fee: float = 0.0,
+    metric: str = "total_return",
+    fundamentals: dict[str, dict] | None = None,
+    workers: int | None = None,
+) -> WalkForwardResult:
+    """
+    Pilih parameter terbaik di tiap fold train (menurut metric), ukur di fold test.
+    grid: {param: [nilai, ...]}; default GRIDS[name]. Param rsi_band/res_ratio
+    mengubah calculate_score, sisanya diteruskan ke filter scan.
+    """
+    if name not in REPLAY_SCANS:
+        raise ValueError(f"Scan tidak dikenal: {name}")
+    accepted = _accepted_params(name)
+    unknown = [k for k in (grid or {}) if k not in accepted]
+    if unknown:
+        raise ValueError(
+            f"Parameter grid tidak dikenal untuk scan {name}: {', '.join(unknown)} (tersedia: {', '.join(accepted)})"
+        )
+    t0 = time.perf_counter()
+    folds = make_folds(panel.close.shape[1], train, test, start=warmup)
+    if not folds:
+        raise ValueError(f"Histori terlalu pendek: {panel.close.shape[1]} bar < {warmup}+{train}+{test}")
+
+    combos = _combos(name, grid)
+    job = {"name": name, "folds": folds, "top_n": top_n, "hold": hold, "fee": fee, "fundamentals": fundamentals or {}}
+    workers = min(_workers(workers), len(combos))
+
+    if workers > 0:
+        with SharedPanel.create(panel) as shared:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(shared.meta, job)) as pool:
+                scores = np.stack(list(pool.map(_evaluate_combo, combos)))
+    else:
+        _init_worker(None, {**job, "panel": panel})
+        try:
+            scores = np.stack([_evaluate_combo(c) for c in combos])
+        finally:
+            _JOB.clear()
+
+    m = _METRICS.index(metric)
+    train_score = np.where(np.isnan(scores[:, :, 0, m]), -np.inf, scores[:, :, 0, m])
+    best = train_score.argmax(axis=0)  # kombinasi terbaik per fold
+    base = combos.index({k: DEFAULT_PARAMS[k] for k in combos[0]})
+
+    dates = np.datetime_as_string(panel.dates, unit="D")
+    fold_rows = []
+    for i, ((a, b), (c, d)) in enumerate(folds):
+        k = best[i]
+        fold_rows.append({
+            "train": (dates[a], dates[b - 1]),
+            "test": (dates[c], dates[d - 1]),
+            "params": combos[k],
+            **{f"train_{n}": float(scores[k, i, 0, j]) for j, n in enumerate(_METRICS)},
+            **{f"test_{n}": float(scores[k, i, 1, j]) for j, n in enumerate(_METRICS)},
+        })
+
+    oos = scores[best, np.arange(len(folds)), 1, 0]
+    oos_base = scores[base, :, 1, 0]
+    stats = {
+        "folds": len(folds),
+        "combos": len(combos),
+        "workers": workers,
+        "oos_total_return": float(np.prod(1 + np.nan_to_num(oos)) - 1),
+        "oos_mean_return": float(np.nanmean(oos)),
+        "oos_hit_rate": float(np.mean(oos > 0)),
+        "is_mean_return": float(np.nanmean(scores[best, np.arange(len(folds)), 0, 0])),
+        "baseline_oos_total_return": float(np.prod(1 + np.nan_to_num(oos_base)) - 1),
+        "duration_s": round(time.perf_counter() - t0, 2),
+    }
+    return WalkForwardResult(name=name, combos=combos, folds=fold_rows, scores=scores, stats=stats)
+
+
+def format_walk_forward(result: WalkForwardResult) -> str:
+    s = result.stats
+    lines = [
+        f"🔁 Walk-forward {result.name}: {s['folds']} fold x {s['combos']} kombinasi"
+        f" ({s['workers']} worker, {s['duration_s']}s)",
+        f"OOS total {s['oos_total_return'] * 100:.2f}% (baseline {s['baseline_oos_total_return'] * 100:.2f}%)"
+        f" | OOS rata-rata {s['oos_mean_return'] * 100:.2f}% vs train {s['is_mean_return'] * 100:.2f}%"
+        f" | Fold untung {s['oos_hit_rate'] * 100:.0f}%\n",
+    ]
+    for f in result.folds:
+        params = ", ".join(f"{k}={v}" for k, v in f["params"].items()) or "-"
+        lines.append(
+            f"{f['test'][0]}..{f['test'][1]} | {params}"
+            f" | Train {f['train_total_return'] * 100:.2f}% | Test {f['test_total_return'] * 100:.2f}%"
+        )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import sys
+
+    from backtest import load_fundamentals, load_panel
+
+    scan = sys.argv[1] if len(sys.argv) > 1 else "breakout"
+    panel = load_panel(period=sys.argv[2] if len(sys.argv) > 2 else "2y")
+    funds = load_fundamentals(panel.tickers) if REPLAY_SCANS[scan].needs_pe else None
+    print(format_walk_forward(walk_forward(panel, scan, fundamentals=funds)))